@@ -28,12 +28,15 @@ django_asgi_app = get_asgi_application()
 
 # Import routing here to avoid circular imports
 from hirethon_template.managers.routing import websocket_urlpatterns
+from hirethon_template.managers.websocket_auth import JWTAuthMiddleware
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            websocket_urlpatterns
+        JWTAuthMiddleware(
+            URLRouter(
+                websocket_urlpatterns
+            )
         )
     ),
 })
@@ -138,6 +138,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "hirethon_template.utils.query_budget.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -425,8 +426,69 @@ CORS_ALLOW_HEADERS = [
 # https://channels.readthedocs.io/en/stable/
 ASGI_APPLICATION = "config.asgi.application"
 
+# The in-memory layer only reaches consumers in the same process; production
+# uses the Redis layer so Celery workers and several ASGI workers share groups.
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels.layers.InMemoryChannelLayer"
     }
 }
+
+# ON-CALL ROSTER
+# ------------------------------------------------------------------------------
+# Where the on-call team listing reads the current and upcoming slots from:
+# "cache" keeps a precomputed roster per team in the default cache, "database"
+# ranks the slots of every team on the page in a single windowed query instead
+# (for deployments without a shared cache).
+ONCALL_ROSTER_SOURCE = env("DJANGO_ONCALL_ROSTER_SOURCE", default="cache")
+
+# NOTIFICATION STORE
+# ------------------------------------------------------------------------------
+# Backend of the empty slot notifications keyed by slot_id
+# (hirethon_template.managers.notification_store). The process-local store suits
+# development and tests; production uses the Redis hash/sorted-set store.
+NOTIFICATION_STORE_BACKEND = "hirethon_template.managers.notification_store.LocMemNotificationStore"
+
+# QUERY BUDGETS
+# ------------------------------------------------------------------------------
+# hirethon_template.utils.query_budget.QueryBudgetMiddleware counts SQL queries per
+# request and logs views that exceed their budget. Budgets are keyed by namespaced
+# URL name and enforced by managers/tests/test_query_budgets.py, whose fixture they
+# were measured against; lower them when a view gets cheaper.
+QUERY_BUDGET_HEADERS = env.bool("DJANGO_QUERY_BUDGET_HEADERS", default=True)
+QUERY_BUDGET_DEFAULT = 20
+QUERY_BUDGETS = {
+    "managers:create-user": 4,
+    "managers:create-team": 5,
+    "managers:teams-list": 3,
+    "managers:users-list": 3,
+    "managers:create-team-member": 12,
+    "managers:teams-management": 4,
+    "managers:toggle-team-status": 5,
+    "managers:add-member-to-team": 14,
+    "managers:users-management": 4,
+    "managers:toggle-user-status": 5,
+    "managers:create-slots": 2,
+    "managers:revalidate-slots": 2,
+    "managers:rebalance-job-status": 2,
+    "managers:get-notifications": 5,
+    "managers:mark-notification-read": 4,
+    "managers:get-leave-requests": 4,
+    "managers:approve-reject-leave-request": 13,
+    "managers:get-available-users-for-slot": 4,
+    "managers:assign-user-to-slot": 8,
+    "managers:get-team-members-with-schedule": 7,
+    "managers:get-dashboard-stats": 8,
+    "managers:get-admin-swap-requests": 4,
+    "managers:admin-reject-swap-request": 4,
+    "members:user-dashboard": 4,
+    "members:user-schedule": 5,
+    "members:day-slots": 5,
+    "members:request-leave": 6,
+    "members:request-swap": 8,
+    "members:swap-requests": 3,
+    "members:respond-swap-request": 11,
+    "members:user-teams-oncall": 5,
+    "members:all-teams-oncall": 7,
+}
+CORS_EXPOSE_HEADERS = ["X-DB-Query-Count", "X-DB-Time-Ms"]
@@ -28,6 +28,37 @@ CACHES = {
     }
 }
 
+# NOTIFICATION STORE
+# ------------------------------------------------------------------------------
+# Shared by every web and worker process through the default Redis cache connection
+NOTIFICATION_STORE_BACKEND = "hirethon_template.managers.notification_store.RedisNotificationStore"
+
+# CHANNELS
+# ------------------------------------------------------------------------------
+# https://github.com/django/channels_redis
+# Redis carries group messages between processes, so Celery workers and every ASGI
+# worker reach the same consumers. Each process keeps a bounded connection pool per
+# event loop. Group memberships lapse after group_expiry seconds unless renewed;
+# NotificationConsumer renews its membership on every client ping, so only channels
+# abandoned by a crashed worker linger in the group until then.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": [
+                {
+                    "address": env("CHANNEL_LAYER_REDIS_URL", default=env("REDIS_URL")),
+                    "max_connections": env.int("CHANNEL_LAYER_MAX_CONNECTIONS", default=100),
+                }
+            ],
+            "prefix": "hirethon_channels",
+            "expiry": 60,
+            "group_expiry": env.int("CHANNEL_LAYER_GROUP_EXPIRY", default=4 * 60 * 60),
+            "capacity": env.int("CHANNEL_LAYER_CAPACITY", default=200),
+        },
+    }
+}
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#secure-proxy-ssl-header
@@ -170,5 +201,7 @@ LOGGING = {
 SPECTACULAR_SETTINGS["SERVERS"] = [  # noqa: F405
     {"url": "https://example.com", "description": "Production server"},
 ]
+# Query counts per request are only logged in production, not exposed as headers
+QUERY_BUDGET_HEADERS = False
 # Your stuff...
 # ------------------------------------------------------------------------------
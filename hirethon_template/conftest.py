@@ -9,6 +9,49 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def notification_store():
+    """The configured notification store, emptied around every test"""
+    from hirethon_template.managers.notification_store import get_notification_store
+
+    store = get_notification_store()
+    store.clear()
+    yield store
+    store.clear()
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def assert_query_budget():
+    """
+    Request a URL by name and assert it runs no more SQL queries than its budget
+    The budget defaults to settings.QUERY_BUDGETS for the URL name
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    from hirethon_template.utils.query_budget import get_query_budget
+
+    def _assert_query_budget(client, url_name, method="get", kwargs=None, data=None, budget=None):
+        if budget is None:
+            budget = get_query_budget(url_name)
+        url = reverse(url_name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            if method == "get":
+                response = client.get(url, data)
+            else:
+                response = getattr(client, method)(url, data, format="json")
+
+        assert response.status_code < 500, f"{url_name} failed with {response.status_code}"
+        assert len(queries) <= budget, (
+            f"{url_name} ran {len(queries)} queries (budget {budget}):\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries)
+        )
+        return response
+
+    return _assert_query_budget
@@ -1,11 +1,5 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-
-User = get_user_model()
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -13,7 +7,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         """
         Handle WebSocket connection
         """
-        # Get the user from the query parameters or headers
+        # Get the user authenticated by the session or the token query parameter
         self.user = await self.get_user_from_scope()
         
         if self.user and self.user.is_manager and self.user.is_active:
@@ -52,6 +46,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             message_type = text_data_json.get('type')
 
             if message_type == 'ping':
+                # Renew the group membership before it expires in the channel layer
+                await self.channel_layer.group_add(self.admin_group_name, self.channel_name)
                 # Respond to ping with pong
                 await self.send(text_data=json.dumps({
                     'type': 'pong',
@@ -90,39 +86,111 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'timestamp': event.get('timestamp')
         }))
 
-    @database_sync_to_async
-    def get_user_from_scope(self):
+    async def send_alert_batch(self, event):
+        """
+        Send a batch of alert notifications to WebSocket as a single frame
+        """
+        alerts = event.get('alerts', [])
+
+        await self.send(text_data=json.dumps({
+            'type': 'empty_slot_alert_batch',
+            'alerts': alerts,
+            'count': len(alerts),
+            'timestamp': event.get('timestamp')
+        }))
+
+    async def get_user_from_scope(self):
+        """
+        The authenticated user of the connection
+        Set from the session by AuthMiddlewareStack, or from the token query
+        parameter by JWTAuthMiddleware, which caches the user's flags
+        """
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
+            return user
+        return None
+
+
+class ScheduleConsumer(AsyncWebsocketConsumer):
+    """
+    Live slot changes of the teams a member belongs to
+    Memberships are read once on connect; clients reconnect after joining or leaving a team
+    """
+
+    async def connect(self):
+        """
+        Handle WebSocket connection
+        """
+        from .models import TeamMember
+        from .schedule_stream import team_schedule_group
+
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or not user.is_active:
+            await self.close()
+            return
+
+        self.team_ids = [
+            team_id async for team_id in TeamMember.objects.filter(
+                user_id=user.id, is_active=True
+            ).values_list('team_id', flat=True)
+        ]
+        self.schedule_groups = [team_schedule_group(team_id) for team_id in self.team_ids]
+        for group in self.schedule_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        await self.accept()
+        await self.send(text_data=json.dumps({
+            'type': 'schedule_subscribed',
+            'team_ids': self.team_ids
+        }))
+
+    async def disconnect(self, close_code):
+        """
+        Handle WebSocket disconnection
+        """
+        for group in getattr(self, 'schedule_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data):
         """
-        Extract and verify user from WebSocket scope
+        Answer pings, renewing the group memberships before they expire
         """
         try:
-            # Get user from session if available
-            if 'user' in self.scope and self.scope['user'].is_authenticated:
-                return self.scope['user']
-            
-            # Try to get token from query parameters
-            query_string = self.scope.get('query_string', b'').decode()
-            if query_string:
-                # Parse query parameters
-                params = {}
-                for param in query_string.split('&'):
-                    if '=' in param:
-                        key, value = param.split('=', 1)
-                        params[key] = value
-                
-                # Check for token in query params
-                token = params.get('token')
-                if token:
-                    try:
-                        # Validate JWT token
-                        access_token = AccessToken(token)
-                        user_id = access_token['user_id']
-                        user = User.objects.get(id=user_id)
-                        return user
-                    except (InvalidToken, TokenError, User.DoesNotExist):
-                        pass
-            
-            return None
-        except Exception as e:
-            print(f"Error getting user from scope: {e}")
-            return None
+            message_type = json.loads(text_data).get('type')
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Invalid JSON'
+            }))
+            return
+
+        if message_type == 'ping':
+            for group in self.schedule_groups:
+                await self.channel_layer.group_add(group, self.channel_name)
+            await self.send(text_data=json.dumps({
+                'type': 'pong',
+                'status': 'connected'
+            }))
+
+    async def schedule_slots(self, event):
+        """
+        Send the deltas of changed slots of a team
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'schedule_delta',
+            'team_id': event['team_id'],
+            'slots': event['slots']
+        }))
+
+    async def schedule_range(self, event):
+        """
+        Send a bulk change to a team's slots in a date range
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'schedule_range',
+            'team_id': event['team_id'],
+            'start_date': event['start_date'],
+            'end_date': event['end_date'],
+            'change': event['change'],
+            'version': event['version']
+        }))
@@ -0,0 +1,114 @@
+"""
+Aggregated, briefly cached statistics for the manager dashboard
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import LeaveRequest, Slot, Team
+
+User = get_user_model()
+
+DASHBOARD_STATS_KEY = "dashboard_stats"
+# Entries are dropped when users, teams, slots or leave requests change; the
+# timeout bounds staleness of the "this week" window and of any writes that
+# bypass signals
+DASHBOARD_STATS_TIMEOUT = 60
+RECENT_ACTIVITY_LIMIT = 10
+
+
+def _build_dashboard_stats(now: datetime) -> Dict:
+    """Statistics and recent activity in six queries, independent of slot volume"""
+    today = now.date()
+    week_ago = today - timedelta(days=7)
+
+    user_counts = User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        total_managers=Count('id', filter=Q(is_manager=True)),
+        active_managers=Count('id', filter=Q(is_manager=True, is_active=True)),
+    )
+    team_counts = Team.objects.aggregate(
+        total_teams=Count('id'),
+        active_teams=Count('id', filter=Q(is_active=True)),
+    )
+
+    # Assigned hours this week, summed in the database
+    start_of_week = today - timedelta(days=today.weekday())
+    weekly_duration = Slot.objects.filter(
+        start_time__date__gte=start_of_week,
+        start_time__date__lte=start_of_week + timedelta(days=6),
+        assigned_member__isnull=False
+    ).aggregate(
+        total=Sum(ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField()))
+    )['total']
+
+    stats = {
+        'total_users': user_counts['total_users'],
+        'active_users': user_counts['active_users'],
+        'total_teams': team_counts['total_teams'],
+        'active_teams': team_counts['active_teams'],
+        'total_managers': user_counts['total_managers'],
+        'active_managers': user_counts['active_managers'],
+        'avg_hours_per_week': round(weekly_duration.total_seconds() / 3600, 1) if weekly_duration else 0
+    }
+
+    activities = []
+    for team in Team.objects.filter(created_at__gte=week_ago).order_by('-created_at')[:5]:
+        activities.append({
+            'type': 'team_created',
+            'team_name': team.name,
+            'created_at': team.created_at.isoformat(),
+            'created_by': 'System',  # We don't track who created teams currently
+        })
+    for user in User.objects.filter(date_joined__gte=week_ago).order_by('-date_joined')[:5]:
+        activities.append({
+            'type': 'user_created',
+            'user_name': user.name,
+            'created_at': user.date_joined.isoformat(),
+            'created_by': 'System',
+        })
+    leave_requests = LeaveRequest.objects.filter(
+        requested_at__gte=week_ago
+    ).select_related('user', 'team').order_by('-requested_at')[:5]
+    for leave_request in leave_requests:
+        activities.append({
+            'type': 'leave_requested',
+            'user_name': leave_request.user.name,
+            'team_name': leave_request.team.name,
+            'date': leave_request.date.isoformat(),
+            'status': leave_request.status,
+            'created_at': leave_request.requested_at.isoformat(),
+        })
+    activities.sort(key=lambda activity: activity['created_at'], reverse=True)
+
+    return {
+        'stats': stats,
+        'recent_activities': activities[:RECENT_ACTIVITY_LIMIT],
+        'generated_at': now.isoformat(),
+    }
+
+
+def get_dashboard_stats(now: Optional[datetime] = None) -> Dict:
+    """
+    Dashboard statistics and recent activity (without time_ago, which depends on
+    when the page is viewed); served from the cache when a recent entry exists
+    """
+    dashboard = cache.get(DASHBOARD_STATS_KEY)
+    if dashboard is None:
+        dashboard = _build_dashboard_stats(now or timezone.now())
+        cache.set(DASHBOARD_STATS_KEY, dashboard, timeout=DASHBOARD_STATS_TIMEOUT)
+    return dashboard
+
+
+def invalidate_dashboard_stats():
+    """
+    Drop the cached dashboard statistics once the current transaction commits,
+    so statistics computed in between are dropped too
+    """
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_STATS_KEY))
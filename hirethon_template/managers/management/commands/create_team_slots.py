@@ -24,11 +24,18 @@ class Command(BaseCommand):
             action='store_true',
             help='Force slot creation even if team is inactive'
         )
+        parser.add_argument(
+            '--strategy',
+            choices=SlotScheduler.STRATEGIES,
+            default='greedy',
+            help='Assignment strategy: greedy (default) or optimal (min-cost flow per day)'
+        )
 
     def handle(self, *args, **options):
         team_id = options.get('team_id')
         team_name = options.get('team_name')
         force = options.get('force', False)
+        strategy = options.get('strategy', 'greedy')
 
         # Find the team
         if team_id:
@@ -80,7 +87,7 @@ class Command(BaseCommand):
         # Create slots
         self.stdout.write('Creating slots...')
         
-        scheduler = SlotScheduler()
+        scheduler = SlotScheduler(strategy=strategy)
         today = timezone.now().date()
         end_date = today + timedelta(days=7)
         
@@ -106,8 +113,16 @@ class Command(BaseCommand):
                         total_slots = assignments.get('total_slots', 0)
                         
                         self.stdout.write(f'  Slots created: {team_result.get("slots_created", 0)}')
+                        self.stdout.write(f'  Slots skipped: {team_result.get("slots_skipped", 0)}')
                         self.stdout.write(f'  Assignments made: {assignments_made}/{total_slots}')
                         
+                        solver = assignments.get('solver')
+                        if solver:
+                            self.stdout.write(
+                                f'  Solver: {solver["status"]} in {solver["time_seconds"]}s, '
+                                f'{solver["iterations"]} iterations, objective {solver["objective_value"]}'
+                            )
+                        
                         violations = assignments.get('violations', [])
                         if violations:
                             self.stdout.write(f'  Constraint violations: {len(violations)}')
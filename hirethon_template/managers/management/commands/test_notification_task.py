@@ -129,36 +129,17 @@ class Command(BaseCommand):
             )
 
     def check_notifications(self):
-        """Check current notifications in cache"""
-        from django.core.cache import cache
-        from datetime import datetime, timedelta
-        from django.utils import timezone
+        """Check current notifications in the notification store"""
+        from hirethon_template.managers.notification_store import get_notification_store
         
-        notifications = cache.get("empty_slots_notifications", [])
-        
-        # Filter out old notifications (same logic as API view)
-        cutoff_time = timezone.now() - timedelta(hours=24)
-        recent_notifications = []
-        
-        for notification in notifications:
-            try:
-                notification_time = datetime.fromisoformat(
-                    notification.get('notification_time', '').replace('Z', '+00:00')
-                )
-                if timezone.is_naive(notification_time):
-                    notification_time = timezone.make_aware(notification_time)
-                
-                if notification_time >= cutoff_time:
-                    recent_notifications.append(notification)
-            except (ValueError, TypeError):
-                # Skip invalid timestamps
-                continue
+        # The store expires entries after 24 hours, so everything it returns is recent
+        notifications = get_notification_store().range()
         
         if notifications:
             self.stdout.write(
-                self.style.SUCCESS(f'Found {len(notifications)} total notifications, {len(recent_notifications)} recent:')
+                self.style.SUCCESS(f'Found {len(notifications)} recent notifications:')
             )
-            for i, notification in enumerate(recent_notifications, 1):
+            for i, notification in enumerate(notifications, 1):
                 self.stdout.write(
                     f'  {i}. Slot ID {notification.get("slot_id")} - '
                     f'Team: {notification.get("team_name")} - '
@@ -167,7 +148,7 @@ class Command(BaseCommand):
                 )
         else:
             self.stdout.write(
-                self.style.WARNING('No notifications found in cache.')
+                self.style.WARNING('No notifications found in the notification store.')
             )
 
     def show_slots(self):
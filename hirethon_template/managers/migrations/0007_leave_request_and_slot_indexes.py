@@ -0,0 +1,24 @@
+# Generated manually to index leave request filters and per-member slot lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managers', '0006_update_swaprequest_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['status', '-requested_at'], name='leave_status_requested_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['team', 'date'], name='leave_team_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(fields=['assigned_member', 'start_time'], name='slot_member_start_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated manually to store each team's active member count
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_active_member_count(apps, schema_editor):
+    Team = apps.get_model('managers', 'Team')
+    TeamMember = apps.get_model('managers', 'TeamMember')
+    active_members = TeamMember.objects.filter(team=OuterRef('pk'), is_active=True).order_by().values('team')
+    Team.objects.update(
+        active_member_count=Coalesce(Subquery(active_members.annotate(count=Count('id')).values('count')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managers', '0007_leave_request_and_slot_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='active_member_count',
+            field=models.PositiveIntegerField(
+                default=0, help_text='Active memberships, maintained by TeamMember save/delete signals'
+            ),
+        ),
+        migrations.RunPython(populate_active_member_count, migrations.RunPython.noop),
+    ]
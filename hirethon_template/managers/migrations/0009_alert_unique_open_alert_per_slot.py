@@ -0,0 +1,35 @@
+# Generated manually to allow a single open alert per slot
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def resolve_duplicate_open_alerts(apps, schema_editor):
+    """Keep the newest open alert of each slot and resolve the older duplicates"""
+    Alert = apps.get_model('managers', 'Alert')
+    newest_open = (
+        Alert.objects.filter(resolved=False).values('slot').annotate(newest=Max('id')).values_list('newest', flat=True)
+    )
+    Alert.objects.filter(resolved=False).exclude(id__in=list(newest_open)).update(resolved=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managers', '0008_team_active_member_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicate_open_alerts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(resolved=False), fields=['slot'], name='unique_open_alert_per_slot'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(
+                condition=models.Q(assigned_member__isnull=True), fields=['start_time'], name='slot_open_start_idx'
+            ),
+        ),
+    ]
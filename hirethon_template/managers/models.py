@@ -15,6 +15,9 @@ class Team(models.Model):
     min_rest_hours = models.FloatField(default=8)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=False)
+    active_member_count = models.PositiveIntegerField(
+        default=0, help_text="Active memberships, maintained by TeamMember save/delete signals"
+    )
 
     def __str__(self):
         return self.name
@@ -61,6 +64,20 @@ class Team(models.Model):
         """Get the number of active members in this team"""
         return self.members.filter(is_active=True).count()
     
+    def adjust_active_member_count(self, delta):
+        """
+        Apply a change in active memberships to the stored counter with an atomic F() update
+        The counter is then read back, so it includes concurrent changes this instance has
+        not seen and update_active_status decides from the real count
+        """
+        Team.objects.filter(pk=self.pk).update(active_member_count=models.F('active_member_count') + delta)
+        self.refresh_from_db(fields=['active_member_count'])
+    
+    def recount_active_members(self):
+        """Store a fresh count of active memberships, e.g. after bulk membership writes"""
+        self.active_member_count = self.get_active_member_count()
+        Team.objects.filter(pk=self.pk).update(active_member_count=self.active_member_count)
+    
     def update_active_status(self):
         """
         Update the team's is_active status based on whether it has enough members
@@ -70,7 +87,8 @@ class Team(models.Model):
         from datetime import timedelta
         
         min_required = self.calculate_minimum_members()
-        active_count = self.get_active_member_count()
+        # Maintained by the TeamMember signals, so no recount on every membership change
+        active_count = self.active_member_count
         
         should_be_active = active_count >= min_required
         was_inactive = not self.is_active
@@ -124,10 +142,11 @@ class Team(models.Model):
         
         return False  # Status was already correct
     
-    def reassign_slots_from_next_day(self):
+    def reassign_slots_from_next_day(self, added_user=None, removed_user_id=None):
         """
-        Comprehensive slot recalculation when new members are added to an active team
-        Uses the new recalculate_slots_for_new_member method that properly considers leave requests
+        Rebalance slots from tomorrow when the team's membership changes
+        With added_user or removed_user_id only the slots needed to restore fairness
+        change hands; without either the whole week is recalculated
         """
         from django.utils import timezone
         from datetime import timedelta
@@ -144,35 +163,46 @@ class Team(models.Model):
             
             scheduler = SlotScheduler()
             
-            # Use the comprehensive recalculation method that considers leave requests
-            result = scheduler.recalculate_slots_for_new_member(self, tomorrow, end_date)
+            if added_user is not None:
+                result = scheduler.rebalance_for_new_member(self, added_user, tomorrow, end_date)
+                change = "new member addition"
+            elif removed_user_id is not None:
+                result = scheduler.rebalance_for_removed_member(self, removed_user_id, tomorrow, end_date)
+                change = "member removal"
+            else:
+                # Use the comprehensive recalculation method that considers leave requests
+                result = scheduler.recalculate_slots_for_new_member(self, tomorrow, end_date)
+                change = "membership change"
             
             # Log the recalculation result with enhanced details
             import logging
             logger = logging.getLogger(__name__)
             if result.get('success', False):
+                slots_changed_hands = result.get('slots_changed_hands', 0)
                 slots_reassigned = result.get('slots_reassigned', 0)
                 slots_created = result.get('slots_created', 0)
-                new_assignments = result.get('new_assignments', 0)
+                new_assignments = result.get('new_assignments', 0) + result.get('slots_filled', 0)
+                slots_unfilled = result.get('slots_unfilled', 0)
                 members_count = result.get('members_count', 0)
                 leave_summary = result.get('leave_summary', {})
-                total_slots = result.get('total_slots', 0)
                 
                 log_parts = []
                 if slots_created > 0:
                     log_parts.append(f"created {slots_created} new slots")
+                if slots_changed_hands > 0:
+                    log_parts.append(f"moved {slots_changed_hands} slots between members")
                 if slots_reassigned > 0:
                     log_parts.append(f"reassigned {slots_reassigned} existing slots")
                 if new_assignments > 0:
                     log_parts.append(f"made {new_assignments} new assignments")
+                if slots_unfilled > 0:
+                    log_parts.append(f"left {slots_unfilled} slots uncovered")
                 
-                action_summary = ", ".join(log_parts) if log_parts else "processed slots"
-                logger.info(f"🔄 {action_summary} from {tomorrow} for team '{self.name}' ({members_count} members, {total_slots} total slots) after new member addition")
+                action_summary = ", ".join(log_parts) if log_parts else "no slots changed"
+                logger.info(f"🔄 {action_summary} from {tomorrow} for team '{self.name}' ({members_count} members) after {change}")
                 
                 if leave_summary:
                     logger.info(f"🏖️ Leave requests considered: {leave_summary}")
-                
-                logger.info(f"✅ New member integrated successfully into rotation")
             else:
                 logger.warning(f"⚠️  Failed to recalculate slots for team '{self.name}': {result.get('error', 'Unknown error')}")
                 
@@ -197,6 +227,13 @@ class TeamMember(models.Model):
     
     class Meta:
         unique_together = ('user', 'team')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored status, so a save can adjust Team.active_member_count by the difference
+        instance._stored_is_active = instance.is_active if 'is_active' in field_names else None
+        return instance
 
 class Holiday(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="holidays")
@@ -239,6 +276,14 @@ class Slot(models.Model):
     class Meta:
         unique_together = ('team', 'start_time')
         ordering = ['start_time']
+        indexes = [
+            # A member's slots on a date (leave request slot counts, member schedules)
+            models.Index(fields=['assigned_member', 'start_time'], name='slot_member_start_idx'),
+            # Upcoming empty slots (the per-minute empty slot scan)
+            models.Index(
+                fields=['start_time'], condition=models.Q(assigned_member__isnull=True), name='slot_open_start_idx'
+            ),
+        ]
     
     def __str__(self):
         if self.assigned_member:
@@ -260,6 +305,24 @@ class Slot(models.Model):
         from django.utils import timezone
         now = timezone.now()
         return self.start_time <= now <= self.end_time
+    
+    def delete(self, *args, **kwargs):
+        """
+        Delete the slot, dropping its cached schedules and pushing its removal to the team
+        Queryset deletes skip this and stay fast deletes; their callers invalidate what they delete
+        """
+        from django.db import transaction
+        from .dashboard_stats import invalidate_dashboard_stats
+        from .oncall_roster import invalidate_oncall_rosters
+        from .schedule_cache import invalidate_schedule_for_slots
+        from .schedule_stream import publish_slot_changes
+        
+        with transaction.atomic():
+            invalidate_schedule_for_slots([self])
+            invalidate_oncall_rosters([self.team_id])
+            invalidate_dashboard_stats()
+            publish_slot_changes([self], deleted=True)
+            return super().delete(*args, **kwargs)
 
 class SwapRequest(models.Model):
     from_slot = models.ForeignKey(Slot, on_delete=models.CASCADE, related_name='swap_requests_from', help_text="The slot the user wants to swap FROM")
@@ -292,6 +355,14 @@ class Alert(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     resolved = models.BooleanField(default=False)
+    
+    class Meta:
+        constraints = [
+            # At most one open alert per slot, even when two empty-slot scans overlap
+            models.UniqueConstraint(
+                fields=['slot'], condition=models.Q(resolved=False), name='unique_open_alert_per_slot'
+            ),
+        ]
 
 
 class LeaveRequest(models.Model):
@@ -313,17 +384,49 @@ class LeaveRequest(models.Model):
     class Meta:
         unique_together = ('user', 'team', 'date')
         ordering = ['-requested_at']
+        indexes = [
+            # Approval queue: requests of a status, newest first
+            models.Index(fields=['status', '-requested_at'], name='leave_status_requested_idx'),
+            # Requests of a team over a date range; user filters use the unique (user, team, date) index
+            models.Index(fields=['team', 'date'], name='leave_team_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.name} - {self.date} ({self.status})"
 
 
+# Keep Team.active_member_count in step with memberships; registered before the status
+# signals below, which read the counter
+@receiver(post_save, sender=TeamMember)
+def maintain_active_member_count_on_member_save(sender, instance, created, **kwargs):
+    """
+    Adjust the team's active member counter when a membership is created or its status changes
+    """
+    stored_is_active = False if created else getattr(instance, '_stored_is_active', None)
+    if stored_is_active is None:
+        # Saved without being loaded first, so the previous status is unknown
+        instance.team.recount_active_members()
+    elif stored_is_active != instance.is_active:
+        instance.team.adjust_active_member_count(1 if instance.is_active else -1)
+    instance._stored_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=TeamMember)
+def maintain_active_member_count_on_member_delete(sender, instance, **kwargs):
+    """
+    Decrement the team's active member counter when an active membership is deleted
+    """
+    if instance.is_active:
+        instance.team.adjust_active_member_count(-1)
+
+
 # Signals to automatically update team active status when members are added/removed/modified
 @receiver(post_save, sender=TeamMember)
 def update_team_status_on_member_change(sender, instance, **kwargs):
     """
     Update team active status whenever a team member is saved (created or updated)
-    Also reassign slots from next day when a new member is added to an active team
+    Also schedule a debounced slot rebalance when a new member is added to an active team;
+    the job id is left on the instance as rebalance_job_id so callers can report it
     """
     import logging
     logger = logging.getLogger(__name__)
@@ -348,8 +451,10 @@ def update_team_status_on_member_change(sender, instance, **kwargs):
                 logger.info(f"🔍 Checking slot reassignment - Is new member: {is_new_member}")
                 
                 if is_new_member:
-                    logger.info(f"🔧 Triggering slot reassignment for team '{instance.team.name}' due to new member addition")
-                    instance.team.reassign_slots_from_next_day()
+                    from .tasks import enqueue_team_rebalance
+                    
+                    instance.rebalance_job_id = enqueue_team_rebalance(instance.team_id, added_user_id=instance.user_id)
+                    logger.info(f"🔧 Scheduled slot rebalance {instance.rebalance_job_id} for team '{instance.team.name}' due to new member addition")
                 else:
                     logger.info(f"⏭️ Skipping slot reassignment - not a new member creation")
             else:
@@ -365,12 +470,78 @@ def update_team_status_on_member_change(sender, instance, **kwargs):
 def update_team_status_on_member_delete(sender, instance, **kwargs):
     """
     Update team active status whenever a team member is deleted
-    Also reassign slots from next day when a member is removed from an active team
+    Also schedule a debounced slot rebalance when a member is removed from an active team
     """
     if instance.team:
         # Update team status first
         team_status_changed = instance.team.update_active_status()
         
-        # If team remains active after member deletion, reassign slots from tomorrow
+        # If team remains active after member deletion, rebalance slots from tomorrow
         if instance.team.is_active and not team_status_changed:
-            instance.team.reassign_slots_from_next_day()
+            from .tasks import enqueue_team_rebalance
+            
+            instance.rebalance_job_id = enqueue_team_rebalance(instance.team_id, removed_user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Slot)
+def invalidate_schedule_cache_on_slot_change(sender, instance, **kwargs):
+    """
+    Drop the cached schedule week and on-call roster of a slot's team whenever it is saved
+    Slot.delete and bulk writes in SlotScheduler invalidate them explicitly; a post_delete
+    receiver would turn every queryset delete of slots into a per-row delete
+    """
+    from .oncall_roster import invalidate_oncall_rosters
+    from .schedule_cache import invalidate_schedule_for_slots
+    
+    invalidate_schedule_for_slots([instance])
+    invalidate_oncall_rosters([instance.team_id])
+
+
+@receiver(post_save, sender=Slot)
+def publish_slot_change(sender, instance, **kwargs):
+    """
+    Push the saved slot's delta to the members of its team
+    Slot.delete and bulk writes in SlotScheduler publish their changes explicitly
+    """
+    from .schedule_stream import publish_slot_changes
+    
+    publish_slot_changes([instance])
+
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def invalidate_oncall_roster_on_member_change(sender, instance, **kwargs):
+    """
+    Drop the on-call roster of a team whose membership changed (it holds the member count)
+    """
+    from .oncall_roster import invalidate_oncall_rosters
+    
+    invalidate_oncall_rosters([instance.team_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_websocket_user_on_change(sender, instance, **kwargs):
+    """
+    Drop the user's flags cached for WebSocket authentication
+    """
+    from .websocket_auth import invalidate_websocket_user
+    
+    invalidate_websocket_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+@receiver(post_save, sender=Slot)
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def invalidate_dashboard_stats_on_change(sender, instance, **kwargs):
+    """
+    Drop the cached manager dashboard statistics when anything they count changes
+    Slot deletes and bulk writes in SlotScheduler invalidate them explicitly
+    """
+    from .dashboard_stats import invalidate_dashboard_stats
+    
+    invalidate_dashboard_stats()
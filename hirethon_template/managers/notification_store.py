@@ -0,0 +1,179 @@
+"""
+Empty slot notifications keyed by slot_id
+
+Entries are added, removed and read by time range atomically, without
+rewriting a shared list. Each entry expires NOTIFICATION_TTL after its
+notification_time. The backend is chosen with NOTIFICATION_STORE_BACKEND:
+RedisNotificationStore in production, LocMemNotificationStore in a single
+process (local development and tests).
+"""
+import json
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+NOTIFICATION_TTL = timedelta(hours=24)
+
+
+def _timestamp(notification: Dict) -> float:
+    return datetime.fromisoformat(notification['notification_time']).timestamp()
+
+
+class NotificationStore(ABC):
+    """
+    Interface of the notification stores
+    - add: store notifications whose slot has none yet; returns how many were added
+    - remove: drop the notifications of slot_ids; returns how many were removed
+    - range: unexpired notifications from since (inclusive), oldest first
+    - count: number of unexpired notifications
+    """
+
+    @abstractmethod
+    def add(self, notifications: Iterable[Dict]) -> int:
+        ...
+
+    @abstractmethod
+    def remove(self, slot_ids: Iterable[int]) -> int:
+        ...
+
+    @abstractmethod
+    def range(self, since: Optional[datetime] = None) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class LocMemNotificationStore(NotificationStore):
+    """Process-local store, shared by every instance in the process"""
+
+    _entries: Dict[str, tuple] = {}
+    _lock = threading.Lock()
+
+    def _purge(self):
+        expired_before = (timezone.now() - NOTIFICATION_TTL).timestamp()
+        for key in [key for key, (score, _) in self._entries.items() if score < expired_before]:
+            del self._entries[key]
+
+    def add(self, notifications: Iterable[Dict]) -> int:
+        added = 0
+        with self._lock:
+            for notification in notifications:
+                key = str(notification['slot_id'])
+                if key not in self._entries:
+                    self._entries[key] = (_timestamp(notification), dict(notification))
+                    added += 1
+        return added
+
+    def remove(self, slot_ids: Iterable[int]) -> int:
+        with self._lock:
+            return sum(self._entries.pop(str(slot_id), None) is not None for slot_id in slot_ids)
+
+    def range(self, since: Optional[datetime] = None) -> List[Dict]:
+        with self._lock:
+            self._purge()
+            min_score = since.timestamp() if since else float('-inf')
+            entries = sorted(
+                ((score, notification) for score, notification in self._entries.values() if score >= min_score),
+                key=lambda entry: entry[0]
+            )
+        return [dict(notification) for _, notification in entries]
+
+    def count(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisNotificationStore(NotificationStore):
+    """
+    Redis store: a hash of slot_id -> notification JSON and a sorted set of
+    slot_id scored by notification time, changed together in MULTI blocks
+    """
+
+    ENTRIES_KEY = "empty_slot_notifications:entries"
+    TIMES_KEY = "empty_slot_notifications:times"
+
+    # Drops the expired entries from both keys in one atomic step, so a concurrent
+    # add of the same slot cannot land between reading and deleting them
+    PURGE_SCRIPT = """
+    local unpack = unpack or table.unpack
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[1])
+    for i = 1, #expired, 1000 do
+        redis.call('HDEL', KEYS[1], unpack(expired, i, math.min(i + 999, #expired)))
+    end
+    if #expired > 0 then
+        redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[1])
+    end
+    return #expired
+    """
+
+    def __init__(self, redis=None):
+        if redis is None:
+            from django_redis import get_redis_connection
+
+            redis = get_redis_connection("default")
+        self.redis = redis
+        self._purge_script = self.redis.register_script(self.PURGE_SCRIPT)
+
+    def _purge(self):
+        expired_before = (timezone.now() - NOTIFICATION_TTL).timestamp()
+        self._purge_script(keys=[self.ENTRIES_KEY, self.TIMES_KEY], args=[expired_before])
+
+    def add(self, notifications: Iterable[Dict]) -> int:
+        notifications = list(notifications)
+        if not notifications:
+            return 0
+        pipeline = self.redis.pipeline()
+        for notification in notifications:
+            key = str(notification['slot_id'])
+            pipeline.hsetnx(self.ENTRIES_KEY, key, json.dumps(notification))
+            pipeline.zadd(self.TIMES_KEY, {key: _timestamp(notification)}, nx=True)
+        # The whole store lapses once nothing has been added for a TTL
+        ttl_seconds = int(NOTIFICATION_TTL.total_seconds())
+        pipeline.expire(self.ENTRIES_KEY, ttl_seconds)
+        pipeline.expire(self.TIMES_KEY, ttl_seconds)
+        results = pipeline.execute()
+        return sum(results[0:len(notifications) * 2:2])
+
+    def remove(self, slot_ids: Iterable[int]) -> int:
+        keys = [str(slot_id) for slot_id in slot_ids]
+        if not keys:
+            return 0
+        pipeline = self.redis.pipeline()
+        pipeline.hdel(self.ENTRIES_KEY, *keys)
+        pipeline.zrem(self.TIMES_KEY, *keys)
+        return pipeline.execute()[0]
+
+    def range(self, since: Optional[datetime] = None) -> List[Dict]:
+        self._purge()
+        keys = self.redis.zrangebyscore(self.TIMES_KEY, since.timestamp() if since else '-inf', '+inf')
+        if not keys:
+            return []
+        return [json.loads(value) for value in self.redis.hmget(self.ENTRIES_KEY, keys) if value is not None]
+
+    def count(self) -> int:
+        self._purge()
+        return self.redis.zcard(self.TIMES_KEY)
+
+    def clear(self):
+        self.redis.delete(self.ENTRIES_KEY, self.TIMES_KEY)
+
+
+def get_notification_store() -> NotificationStore:
+    """The configured notification store"""
+    return import_string(settings.NOTIFICATION_STORE_BACKEND)()
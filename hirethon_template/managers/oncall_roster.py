@@ -0,0 +1,170 @@
+"""
+Precomputed "who is on call now" roster per team
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, Exists, F, OuterRef, QuerySet, Subquery, Value, When, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from .models import Slot, TeamMember
+
+# Upcoming slots shown per team
+UPCOMING_SLOTS = 3
+# Assigned slots kept per team: the current one, the upcoming ones and spares so
+# the roster keeps answering while a few slot boundaries pass
+ROSTER_DEPTH = 8
+# Entries are dropped when slots or memberships change; the timeout only bounds
+# how long a renamed member's old name can linger
+ROSTER_TIMEOUT = 60 * 10
+
+
+def _roster_key(team_id: int) -> str:
+    return f"oncall_roster:{team_id}"
+
+
+def _slot_payload(slot: Slot) -> Dict:
+    return {
+        'user_id': slot.assigned_member.id,
+        'name': slot.assigned_member.name,
+        'email': slot.assigned_member.email,
+        'start_time': slot.start_time.isoformat(),
+        'end_time': slot.end_time.isoformat(),
+        'date': slot.date.isoformat()
+    }
+
+
+def _build_rosters(team_ids: List[int], now: datetime) -> Dict[int, Dict]:
+    """Roster entries for the teams in two queries, however many slots they have"""
+    member_counts = dict(
+        TeamMember.objects.filter(team_id__in=team_ids, is_active=True)
+        .values('team_id').annotate(count=Count('id')).values_list('team_id', 'count')
+    )
+    rosters = {
+        team_id: {'member_count': member_counts.get(team_id, 0), 'slots': [], 'refresh_at': None}
+        for team_id in team_ids
+    }
+
+    slots = Slot.objects.filter(
+        team_id__in=team_ids,
+        end_time__gte=now,
+        assigned_member__isnull=False
+    ).annotate(
+        position=Window(RowNumber(), partition_by=F('team_id'), order_by=F('start_time').asc())
+    ).filter(position__lte=ROSTER_DEPTH).select_related('assigned_member').order_by('team_id', 'start_time')
+
+    for slot in slots:
+        rosters[slot.team_id]['slots'].append(_slot_payload(slot))
+
+    for roster in rosters.values():
+        # A full roster may be missing later slots: once fewer than UPCOMING_SLOTS
+        # of its slots are still ahead it has to be rebuilt
+        if len(roster['slots']) == ROSTER_DEPTH:
+            roster['refresh_at'] = roster['slots'][ROSTER_DEPTH - UPCOMING_SLOTS]['start_time']
+    return rosters
+
+
+def _view(roster: Dict, now_iso: str) -> Dict:
+    """Current assignee and upcoming slots of a roster entry at now_iso"""
+    current = None
+    upcoming = []
+    for slot in roster['slots']:
+        if slot['end_time'] < now_iso:
+            continue
+        if slot['start_time'] <= now_iso:
+            if current is None:
+                current = {key: slot[key] for key in ('user_id', 'name', 'email', 'start_time', 'end_time')}
+        elif len(upcoming) < UPCOMING_SLOTS:
+            upcoming.append(slot)
+    return {'member_count': roster['member_count'], 'current_oncall': current, 'upcoming_slots': upcoming}
+
+
+def get_oncall_rosters(team_ids: Iterable[int], now: Optional[datetime] = None) -> Dict[int, Dict]:
+    """
+    On-call view per team: member_count, current_oncall and upcoming_slots
+    Entries are read from the cache in one round trip; missing entries, and
+    entries whose stored slots no longer cover the next boundaries, are rebuilt
+    together and cached again
+    """
+    now = now or timezone.now()
+    now_iso = now.isoformat()
+    team_ids = list(team_ids)
+
+    cached = cache.get_many([_roster_key(team_id) for team_id in team_ids])
+    rosters = {}
+    stale = []
+    for team_id in team_ids:
+        roster = cached.get(_roster_key(team_id))
+        if roster is None or (roster['refresh_at'] is not None and roster['refresh_at'] <= now_iso):
+            stale.append(team_id)
+        else:
+            rosters[team_id] = roster
+
+    if stale:
+        rebuilt = _build_rosters(stale, now)
+        cache.set_many({_roster_key(team_id): roster for team_id, roster in rebuilt.items()}, timeout=ROSTER_TIMEOUT)
+        rosters.update(rebuilt)
+
+    return {team_id: _view(rosters[team_id], now_iso) for team_id in team_ids}
+
+
+def invalidate_oncall_rosters(team_ids: Iterable[int]):
+    """
+    Drop the roster entries of teams whose slots or members changed once the
+    current transaction commits, so a roster rebuilt in between is dropped too
+    """
+    keys = [_roster_key(team_id) for team_id in set(team_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# Database-side alternative for deployments without a shared cache
+
+
+def annotate_oncall_teams(queryset: QuerySet, user) -> QuerySet:
+    """Annotate a Team queryset with member_count and is_user_member for user"""
+    active_members = TeamMember.objects.filter(team=OuterRef('pk'), is_active=True)
+    return queryset.annotate(
+        member_count=Coalesce(
+            Subquery(active_members.order_by().values('team').annotate(count=Count('id')).values('count')),
+            0
+        ),
+        is_user_member=Exists(active_members.filter(user=user)),
+    )
+
+
+def query_oncall_slots(team_ids: Iterable[int], now: Optional[datetime] = None) -> Dict[int, Dict]:
+    """
+    current_oncall and upcoming_slots per team in a single query
+    Slots are ranked separately among the team's current and upcoming slots, so one
+    ROW_NUMBER() window picks the first current slot and the next UPCOMING_SLOTS
+    """
+    now = now or timezone.now()
+    team_ids = list(team_ids)
+    rosters = {team_id: {'current_oncall': None, 'upcoming_slots': []} for team_id in team_ids}
+
+    is_current = Case(When(start_time__lte=now, then=Value(True)), default=Value(False), output_field=BooleanField())
+    slots = Slot.objects.filter(
+        team_id__in=team_ids,
+        end_time__gte=now,
+        assigned_member__isnull=False
+    ).annotate(
+        is_current=is_current,
+        position=Window(RowNumber(), partition_by=[F('team_id'), is_current], order_by=F('start_time').asc())
+    ).filter(
+        position__lte=UPCOMING_SLOTS
+    ).select_related('assigned_member').order_by('team_id', 'start_time')
+
+    for slot in slots:
+        payload = _slot_payload(slot)
+        if slot.is_current:
+            if slot.position == 1:
+                rosters[slot.team_id]['current_oncall'] = {
+                    key: payload[key] for key in ('user_id', 'name', 'email', 'start_time', 'end_time')
+                }
+        else:
+            rosters[slot.team_id]['upcoming_slots'].append(payload)
+    return rosters
@@ -0,0 +1,112 @@
+"""
+Per-team, per-ISO-week cache of slot schedule blocks for calendar views
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Slot
+
+# Blocks are invalidated whenever a slot in their week changes; the timeout only
+# bounds how long a renamed member's old name can linger in a block
+SCHEDULE_WEEK_TIMEOUT = 60 * 60 * 24
+
+
+def week_start(day: date) -> date:
+    """Monday of the ISO week containing day"""
+    return day - timedelta(days=day.weekday())
+
+
+def _week_key(team_id: int, monday: date) -> str:
+    return f"schedule_week:{team_id}:{monday.isoformat()}"
+
+
+def serialize_slot(slot: Slot) -> Dict:
+    """Schedule payload for a slot; needs slot.team and slot.assigned_member loaded"""
+    return {
+        'id': slot.id,
+        'team_id': slot.team_id,
+        'team_name': slot.team.name,
+        'start_time': slot.start_time.isoformat(),
+        'end_time': slot.end_time.isoformat(),
+        'date': slot.date.isoformat(),
+        'assigned_member': {
+            'id': slot.assigned_member.id,
+            'name': slot.assigned_member.name,
+            'email': slot.assigned_member.email
+        } if slot.assigned_member else None,
+        'is_covered': slot.is_covered,
+        'is_holiday': slot.is_holiday,
+    }
+
+
+def get_schedule_slots(team_ids: Iterable[int], start_date: date, end_date: date) -> List[Dict]:
+    """
+    Slot payloads for the teams from start_date to end_date (inclusive), ordered by start time
+    Whole weeks are read from the cache in one round trip; weeks that are not cached
+    are loaded with a single query and stored for the next request
+    """
+    weeks = []
+    monday = week_start(start_date)
+    while monday <= end_date:
+        weeks.append(monday)
+        monday += timedelta(days=7)
+
+    keys = {(team_id, monday): _week_key(team_id, monday) for team_id in team_ids for monday in weeks}
+    blocks = cache.get_many(list(keys.values()))
+
+    missing = [week for week, key in keys.items() if key not in blocks]
+    if missing:
+        loaded = {week: [] for week in missing}
+        slots = Slot.objects.filter(
+            team_id__in={team_id for team_id, _ in missing},
+            start_time__date__gte=min(monday for _, monday in missing),
+            start_time__date__lt=max(monday for _, monday in missing) + timedelta(days=7)
+        ).select_related('team', 'assigned_member').order_by('start_time')
+
+        for slot in slots:
+            week = (slot.team_id, week_start(slot.date))
+            if week in loaded:
+                loaded[week].append(serialize_slot(slot))
+
+        new_blocks = {keys[week]: block for week, block in loaded.items()}
+        cache.set_many(new_blocks, timeout=SCHEDULE_WEEK_TIMEOUT)
+        blocks.update(new_blocks)
+
+    start_iso, end_iso = start_date.isoformat(), end_date.isoformat()
+    schedule = [
+        slot for key in keys.values() for slot in blocks[key]
+        if start_iso <= slot['date'] <= end_iso
+    ]
+    schedule.sort(key=lambda slot: slot['start_time'])
+    return schedule
+
+
+def invalidate_schedule_weeks(team_id: int, days: Iterable[date]):
+    """
+    Drop the cached blocks of the team's weeks containing any of days
+    once the current transaction commits, so a read in between cannot
+    cache the weeks as they were before the change
+    """
+    keys = list({_week_key(team_id, week_start(day)) for day in days})
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_schedule_range(team_id: int, start_date: date, end_date: date):
+    """Drop the cached blocks of every team week overlapping the date range"""
+    invalidate_schedule_weeks(
+        team_id, (start_date + timedelta(days=offset) for offset in range(0, (end_date - start_date).days + 1, 7))
+    )
+    invalidate_schedule_weeks(team_id, [end_date])
+
+
+def invalidate_schedule_for_slots(slots: Iterable[Slot]):
+    """Drop the cached blocks of every week containing one of slots"""
+    days_by_team = {}
+    for slot in slots:
+        days_by_team.setdefault(slot.team_id, set()).add(slot.start_time.date())
+    for team_id, days in days_by_team.items():
+        invalidate_schedule_weeks(team_id, days)
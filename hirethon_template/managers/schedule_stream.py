@@ -0,0 +1,94 @@
+"""
+Live slot changes pushed to members over WebSocket
+
+Slot saves, Slot.delete and the scheduler's bulk writes are published to the
+channel layer group of the slot's team once the surrounding transaction commits,
+and ScheduleConsumer forwards them to the members of that team. Queryset deletes
+of past slots (the nightly cleanup) are not published. Changes are compact deltas:
+- schedule.slots: {slot_id, assignee, version} per changed slot ("deleted": True
+  for removed slots), one message per team and write
+- schedule.range: a bulk write that touched every slot of a team in a date range
+  without loading them; "unassigned" clears their assignee, "created" adds new
+  empty slots to it
+
+version is the change time in microseconds, so clients keep the delta with the
+highest version per slot and ignore older ones arriving late.
+"""
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Slot
+
+logger = logging.getLogger(__name__)
+
+
+def team_schedule_group(team_id: int) -> str:
+    """Channel layer group of a team's schedule changes"""
+    return f"schedule_team_{team_id}"
+
+
+def _version(moment: datetime) -> int:
+    return int(moment.timestamp() * 1_000_000)
+
+
+def slot_delta(slot: Slot, deleted: bool = False) -> Dict:
+    """Delta of a saved or deleted slot"""
+    delta = {
+        'slot_id': slot.id,
+        'assignee': slot.assigned_member_id,
+        'version': _version(timezone.now() if deleted or slot.updated_at is None else slot.updated_at),
+    }
+    if deleted:
+        delta['deleted'] = True
+    return delta
+
+
+def _group_send(messages: List[tuple]):
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    async def send_all():
+        for group, message in messages:
+            await channel_layer.group_send(group, message)
+
+    try:
+        async_to_sync(send_all)()
+    except Exception as e:
+        # A lost delta only delays clients until their next full reload
+        logger.error(f"Failed to publish schedule changes: {str(e)}", exc_info=True)
+
+
+def publish_slot_changes(slots: Iterable[Slot], deleted: bool = False):
+    """Publish the deltas of slots, one message per team, after the transaction commits"""
+    deltas_by_team = {}
+    for slot in slots:
+        deltas_by_team.setdefault(slot.team_id, []).append(slot_delta(slot, deleted))
+    if not deltas_by_team:
+        return
+
+    messages = [
+        (team_schedule_group(team_id), {'type': 'schedule.slots', 'team_id': team_id, 'slots': deltas})
+        for team_id, deltas in deltas_by_team.items()
+    ]
+    transaction.on_commit(lambda: _group_send(messages))
+
+
+def publish_range_change(team_id: int, start_date: date, end_date: date, change: str):
+    """Publish a bulk write to every slot of a team in a date range, after the transaction commits"""
+    message = {
+        'type': 'schedule.range',
+        'team_id': team_id,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'change': change,
+        'version': _version(timezone.now()),
+    }
+    transaction.on_commit(lambda: _group_send([(team_schedule_group(team_id), message)]))
@@ -232,7 +232,6 @@ class TeamResponseSerializer(serializers.ModelSerializer):
     slot_duration_seconds = serializers.SerializerMethodField()
     member_count = serializers.SerializerMethodField()
     minimum_required_members = serializers.SerializerMethodField()
-    active_member_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Team
@@ -257,12 +256,9 @@ class TeamResponseSerializer(serializers.ModelSerializer):
         return int(obj.slot_duration.total_seconds())
 
     def get_member_count(self, obj):
-        """Get the number of members in this team"""
-        return obj.members.count()
-    
-    def get_active_member_count(self, obj):
-        """Get the number of active members in this team"""
-        return obj.get_active_member_count()
+        """Get the number of members in this team (annotated as member_count by list views)"""
+        member_count = getattr(obj, 'member_count', None)
+        return obj.members.count() if member_count is None else member_count
     
     def get_minimum_required_members(self, obj):
         """Get the minimum required members for this team"""
@@ -339,7 +335,9 @@ class CreateTeamMemberSerializer(serializers.ModelSerializer):
             inactive_membership = TeamMember.objects.filter(user=user, team=team, is_active=False).first()
             
             if inactive_membership:
-                # Reactivate the existing membership
+                # Reactivate the existing membership; it shares the team instance so the
+                # active member counter adjusted by the signal is the one read below
+                inactive_membership.team = team
                 inactive_membership.is_active = True
                 inactive_membership.is_manager = validated_data.get('is_manager', False)
                 inactive_membership.save()
@@ -353,9 +351,12 @@ class CreateTeamMemberSerializer(serializers.ModelSerializer):
             # Update team active status based on member count
             team_status_changed = team.update_active_status()
             
-            # If team was already active and didn't just become active, reassign slots from tomorrow
-            if team.is_active and not team_status_changed:
-                team.reassign_slots_from_next_day()
+            # If team was already active and didn't just become active, schedule a rebalance giving the
+            # returning member a fair share of slots (new members are handled by the post_save signal)
+            if inactive_membership and team.is_active and not team_status_changed:
+                from .tasks import enqueue_team_rebalance
+                
+                team_member.rebalance_job_id = enqueue_team_rebalance(team.id, added_user_id=user.id)
             
             return team_member
             
@@ -382,6 +383,7 @@ class TeamMemberResponseSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField(source='user.id', read_only=True)
     team_name = serializers.CharField(source='team.name', read_only=True)
     team_id = serializers.IntegerField(source='team.id', read_only=True)
+    rebalance_job_id = serializers.SerializerMethodField()
     
     class Meta:
         model = TeamMember
@@ -393,8 +395,13 @@ class TeamMemberResponseSerializer(serializers.ModelSerializer):
             'team_id',
             'team_name',
             'is_manager',
+            'rebalance_job_id',
         ]
         read_only_fields = fields
+    
+    def get_rebalance_job_id(self, obj):
+        """Id of the slot rebalance job scheduled by this change, if any"""
+        return getattr(obj, 'rebalance_job_id', None)
 
 
 class TeamListSerializer(serializers.ModelSerializer):
@@ -416,7 +423,6 @@ class TeamManagementSerializer(serializers.ModelSerializer):
     Serializer for team management view with member count and status
     """
     member_count = serializers.SerializerMethodField()
-    active_member_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Team
@@ -434,12 +440,9 @@ class TeamManagementSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'member_count', 'active_member_count']
     
     def get_member_count(self, obj):
-        """Get total number of members in this team"""
-        return obj.members.count()
-    
-    def get_active_member_count(self, obj):
-        """Get number of active members in this team"""
-        return obj.members.filter(is_active=True).count()
+        """Get total number of members in this team (annotated as member_count by list views)"""
+        member_count = getattr(obj, 'member_count', None)
+        return obj.members.count() if member_count is None else member_count
 
 
 class UserListSerializer(serializers.ModelSerializer):
@@ -485,8 +488,9 @@ class UserManagementSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined', 'last_login', 'role', 'team_count', 'last_login_display']
     
     def get_team_count(self, obj):
-        """Get number of teams this user belongs to"""
-        return obj.team_memberships.count()
+        """Get number of teams this user belongs to (annotated as team_count by list views)"""
+        team_count = getattr(obj, 'team_count', None)
+        return obj.team_memberships.count() if team_count is None else team_count
     
     def get_last_login_display(self, obj):
         """Get formatted last login date"""
@@ -0,0 +1,90 @@
+"""
+Incremental fairness ranking of team members for slot assignment
+"""
+import heapq
+import itertools
+from datetime import timedelta, date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models import TeamMember
+from .slot_ledger import ScheduleLedger
+
+
+class FairnessQueue:
+    """
+    Priority queue of team members keyed by their composite fairness score
+
+    The score (lower is better) weighs assignments in the 7 days before the
+    slot date and assignments over the trailing 30 days. Scores are computed
+    once per slot date; after an assignment only the assigned member's entry
+    is refreshed. Stale heap entries are skipped lazily on pop.
+    """
+
+    RECENT_WEIGHT = 3  # per assignment in the previous 7 days
+    HISTORY_WEIGHT = 0.5  # per assignment in the last 30 days
+    HISTORY_DAYS = 30
+
+    def __init__(self, ledger: ScheduleLedger, members: List[TeamMember]):
+        self.ledger = ledger
+        self.reference_date: Optional[date] = None
+        self._users = {member.user.id: member.user for member in members}
+        # Ties keep the order members were given in
+        self._order = {member.user.id: index for index, member in enumerate(members)}
+        self._heap: List[Tuple[float, int, int, int]] = []
+        self._versions: Dict[int, int] = {}
+        self._version_counter = itertools.count()
+
+    def score(self, user_id: int) -> float:
+        """Composite fairness score of a member for the current reference date"""
+        history_start = self.reference_date - timedelta(days=self.HISTORY_DAYS)
+        return (
+            self.ledger.recent_assignments(user_id, self.reference_date) * self.RECENT_WEIGHT
+            + self.ledger.assignments_since(user_id, history_start) * self.HISTORY_WEIGHT
+        )
+
+    def advance_to(self, reference_date: date):
+        """Rescore every member when planning moves on to a new date"""
+        if reference_date == self.reference_date:
+            return
+        self.reference_date = reference_date
+        self._heap = []
+        self._versions = {}
+        for user_id in self._users:
+            self._push(user_id)
+
+    def refresh(self, user_id: int):
+        """Re-rank a single member after their assignments changed"""
+        if user_id in self._users:
+            self._push(user_id)
+
+    def select(self, is_eligible: Callable[[int], bool]):
+        """
+        Return the lowest-scored member passing is_eligible, or None
+
+        Members popped on the way are put back; the selected member stays out
+        of the queue until refresh() is called for them.
+        """
+        rejected = []
+        selected = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            user_id, version = entry[2], entry[3]
+            if self._versions.get(user_id) != version:
+                continue  # superseded by a later refresh
+            if is_eligible(user_id):
+                selected = user_id
+                break
+            rejected.append(entry)
+
+        for entry in rejected:
+            heapq.heappush(self._heap, entry)
+
+        if selected is None:
+            return None
+        del self._versions[selected]
+        return self._users[selected]
+
+    def _push(self, user_id: int):
+        version = next(self._version_counter)
+        self._versions[user_id] = version
+        heapq.heappush(self._heap, (self.score(user_id), self._order[user_id], user_id, version))
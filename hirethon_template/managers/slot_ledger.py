@@ -0,0 +1,231 @@
+"""
+In-memory constraint ledger used by the slot scheduler
+"""
+import bisect
+from collections import defaultdict
+from datetime import datetime, timedelta, date, time
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+from django.utils import timezone
+
+from .models import Team, Slot, Availability, Holiday, LeaveRequest
+
+
+def _day_start(day: date) -> datetime:
+    """Aware midnight for a date in the current timezone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class ScheduleLedger:
+    """
+    Preloaded view of a team's schedule for a planning horizon
+
+    All slots, availability, approved leave and holidays needed to plan the
+    horizon are fetched in a few bulk queries. Every constraint and fairness
+    check the scheduler makes is then answered from per-user interval lists,
+    which are updated in memory as assignments are made.
+    """
+
+    # Trailing history needed by the 30-day fairness count
+    HISTORY_DAYS = 30
+    # Window around a slot start in which any other assignment is a conflict
+    CONFLICT_WINDOW = timedelta(hours=1)
+    # How far back the rest check looks for the previous shift
+    REST_LOOKBACK = timedelta(days=2)
+
+    def __init__(self, team: Team, start_date: date, end_date: date, member_ids: Iterable[int]):
+        self.team = team
+        self.start_date = start_date
+        self.end_date = end_date
+        self.member_ids: Set[int] = set(member_ids)
+
+        self.slots: List[Slot] = []
+        self.holidays: Set[date] = set()
+        self._unavailable: Dict[int, Set[date]] = defaultdict(set)
+
+        # Per-user assignments sorted by start time: parallel lists of start
+        # times (for bisect) and (start, end, slot_id, team_id) tuples
+        self._starts: Dict[int, List[datetime]] = defaultdict(list)
+        self._intervals: Dict[int, List[Tuple[datetime, datetime, int, int]]] = defaultdict(list)
+
+    @classmethod
+    def load(cls, team: Team, start_date: date, end_date: date, member_ids: Iterable[int]) -> "ScheduleLedger":
+        """Build a ledger for the team, horizon and members in five queries"""
+        ledger = cls(team, start_date, end_date, member_ids)
+        ledger._load()
+        return ledger
+
+    def _load(self):
+        member_ids = list(self.member_ids)
+
+        self.slots = list(
+            Slot.objects.filter(
+                team=self.team,
+                start_time__date__range=[self.start_date, self.end_date]
+            ).order_by('start_time')
+        )
+        for slot in self.slots:
+            slot.team = self.team
+
+        self.holidays = set(
+            Holiday.objects.filter(
+                team=self.team,
+                date__range=[self.start_date, self.end_date]
+            ).values_list('date', flat=True)
+        )
+
+        if not member_ids:
+            return
+
+        unavailable = Availability.objects.filter(
+            user_id__in=member_ids,
+            date__range=[self.start_date, self.end_date],
+            is_available=False
+        ).values_list('user_id', 'date')
+        on_leave = LeaveRequest.objects.filter(
+            user_id__in=member_ids,
+            team=self.team,
+            date__range=[self.start_date, self.end_date],
+            status='approved'
+        ).values_list('user_id', 'date')
+        for user_id, day in list(unavailable) + list(on_leave):
+            self._unavailable[user_id].add(day)
+
+        # Assignments across all teams: daily/weekly limits and rest are per
+        # person, not per team. The window covers the fairness history and the
+        # full week containing the last day of the horizon.
+        window_start = _day_start(self.start_date - timedelta(days=self.HISTORY_DAYS))
+        window_end = _day_start(self.end_date + timedelta(days=8))
+        assigned = Slot.objects.filter(
+            assigned_member_id__in=member_ids,
+            start_time__gte=window_start,
+            start_time__lt=window_end
+        ).order_by('start_time').values_list('assigned_member_id', 'start_time', 'end_time', 'id', 'team_id')
+        for user_id, start_time, end_time, slot_id, team_id in assigned:
+            self._starts[user_id].append(start_time)
+            self._intervals[user_id].append((start_time, end_time, slot_id, team_id))
+
+    # Bookkeeping
+
+    def unassigned_slots(self) -> List[Slot]:
+        """Team slots in the horizon that have no assignee"""
+        return [slot for slot in self.slots if slot.assigned_member_id is None]
+
+    def assign(self, slot: Slot, user_id: int):
+        """Record that user_id now covers slot"""
+        starts = self._starts[user_id]
+        index = bisect.bisect_right(starts, slot.start_time)
+        starts.insert(index, slot.start_time)
+        self._intervals[user_id].insert(index, (slot.start_time, slot.end_time, slot.id, slot.team_id))
+
+    def release(self, slot: Slot, user_id: int):
+        """Forget that user_id covers slot"""
+        starts = self._starts[user_id]
+        intervals = self._intervals[user_id]
+        index = bisect.bisect_left(starts, slot.start_time)
+        while index < len(starts) and starts[index] == slot.start_time:
+            if intervals[index][2] == slot.id:
+                del starts[index]
+                del intervals[index]
+                return
+            index += 1
+
+    def _between(self, user_id: int, lower: datetime, upper: datetime) -> List[Tuple[datetime, datetime, int, int]]:
+        """Assignments of user_id starting in [lower, upper)"""
+        starts = self._starts.get(user_id)
+        if not starts:
+            return []
+        lo = bisect.bisect_left(starts, lower)
+        hi = bisect.bisect_left(starts, upper)
+        return self._intervals[user_id][lo:hi]
+
+    # Constraint checks
+
+    def is_available(self, user_id: int, check_date: date) -> bool:
+        """False if the user marked the date unavailable or has approved leave"""
+        return check_date not in self._unavailable.get(user_id, ())
+
+    def is_holiday(self, check_date: date) -> bool:
+        return check_date in self.holidays
+
+    def daily_hours(self, user_id: int, check_date: date) -> float:
+        """Total assigned hours for user on a specific date"""
+        start_of_day = _day_start(check_date)
+        return sum(
+            (end - start).total_seconds() / 3600
+            for start, end, _, _ in self._between(user_id, start_of_day, start_of_day + timedelta(days=1))
+        )
+
+    def weekly_hours(self, user_id: int, week_start: date) -> float:
+        """Total assigned hours for user in the week starting on week_start"""
+        start_of_week = _day_start(week_start)
+        return sum(
+            (end - start).total_seconds() / 3600
+            for start, end, _, _ in self._between(user_id, start_of_week, start_of_week + timedelta(days=7))
+        )
+
+    def has_sufficient_rest(self, user_id: int, slot_start: datetime, min_rest_hours: float,
+                            exclude_slot_id: Optional[int] = None) -> bool:
+        """Check the user has no clashing shift and enough rest since the last one"""
+        lower = slot_start - self.REST_LOOKBACK - timedelta(days=1)
+        # Upper bound is inclusive: a shift starting exactly one window after
+        # slot_start still clashes
+        upper = slot_start + self.CONFLICT_WINDOW + timedelta(microseconds=1)
+        last_end = None
+        for start, end, slot_id, _ in self._between(user_id, lower, upper):
+            if slot_id == exclude_slot_id:
+                continue
+            if end >= slot_start - self.CONFLICT_WINDOW:
+                return False
+            if end >= slot_start - self.REST_LOOKBACK and (last_end is None or end > last_end):
+                last_end = end
+
+        if last_end is None:
+            return True
+        return slot_start - last_end >= timedelta(hours=min_rest_hours)
+
+    def has_consecutive_slot_on_date(self, user_id: int, slot: Slot) -> bool:
+        """Check if user already has a back-to-back slot in this team on the same date"""
+        start_of_day = _day_start(slot.start_time.date())
+        for start, end, slot_id, team_id in self._between(user_id, start_of_day, start_of_day + timedelta(days=1)):
+            if slot_id == slot.id or team_id != slot.team_id:
+                continue
+            if end == slot.start_time or slot.end_time == start:
+                return True
+        return False
+
+    def recent_assignments(self, user_id: int, reference_date: date) -> int:
+        """Number of assignments in the 7 days before reference_date"""
+        upper = _day_start(reference_date)
+        return len(self._between(user_id, upper - timedelta(days=7), upper))
+
+    def assignments_since(self, user_id: int, since: date) -> int:
+        """Number of loaded assignments starting on or after since"""
+        starts = self._starts.get(user_id)
+        if not starts:
+            return 0
+        return len(starts) - bisect.bisect_left(starts, _day_start(since))
+
+    def violation_for(self, slot: Slot, user_id: int) -> Optional[str]:
+        """
+        Validate all constraints for assigning slot to user_id
+        Returns violation message if constraints are violated, None if valid
+        """
+        team = self.team
+        slot_date = slot.start_time.date()
+        slot_hours = slot.duration.total_seconds() / 3600
+
+        if not self.is_available(user_id, slot_date):
+            return "User is not available on this date (due to leave or unavailability)"
+
+        if self.daily_hours(user_id, slot_date) + slot_hours > team.max_hours_per_day:
+            return f"Would exceed daily limit ({team.max_hours_per_day}h)"
+
+        week_start = slot_date - timedelta(days=slot_date.weekday())
+        if self.weekly_hours(user_id, week_start) + slot_hours > team.max_hours_per_week:
+            return f"Would exceed weekly limit ({team.max_hours_per_week}h)"
+
+        if not self.has_sufficient_rest(user_id, slot.start_time, team.min_rest_hours, exclude_slot_id=slot.id):
+            return f"Insufficient rest time (minimum {team.min_rest_hours}h required)"
+
+        return None
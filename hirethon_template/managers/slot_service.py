@@ -1,14 +1,23 @@
 """
 Slot creation and management service for fair scheduling with constraints
 """
+import heapq
 import logging
+import time as clock
 from datetime import datetime, timedelta, date, time
 from typing import List, Dict, Optional, Tuple
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
 from django.contrib.auth import get_user_model
 
-from .models import Team, TeamMember, Slot, Availability, Holiday, LeaveRequest
+from .dashboard_stats import invalidate_dashboard_stats
+from .models import Team, TeamMember, Slot, Holiday, LeaveRequest
+from .oncall_roster import invalidate_oncall_rosters
+from .schedule_cache import invalidate_schedule_for_slots, invalidate_schedule_range
+from .schedule_stream import publish_range_change, publish_slot_changes
+from .slot_fairness import FairnessQueue
+from .slot_ledger import ScheduleLedger
+from .slot_solver import OptimalDayAssigner
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -19,8 +28,20 @@ class SlotScheduler:
     Service class for creating and managing on-call slots with constraints
     """
     
-    def __init__(self):
+    # Rows per statement for bulk slot inserts and updates
+    SLOT_BATCH_SIZE = 500
+    
+    # "greedy" assigns slot by slot; "optimal" solves each day as a min-cost flow
+    STRATEGIES = ('greedy', 'optimal')
+    # Wall-clock seconds the optimal strategy may spend before falling back to greedy
+    OPTIMAL_TIME_BUDGET = 10.0
+    
+    def __init__(self, strategy: str = 'greedy', time_budget: Optional[float] = None):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown scheduling strategy '{strategy}', expected one of {self.STRATEGIES}")
         self.logger = logger
+        self.strategy = strategy
+        self.time_budget = self.OPTIMAL_TIME_BUDGET if time_budget is None else time_budget
     
     def create_slots_for_period(self, start_date: date, end_date: date, team: Team = None) -> Dict:
         """
@@ -45,6 +66,7 @@ class SlotScheduler:
                 return {"success": False, "message": "No active teams found"}
             
             total_slots_created = 0
+            total_slots_skipped = 0
             results = []
             
             with transaction.atomic():
@@ -52,11 +74,15 @@ class SlotScheduler:
                     team_result = self._create_team_slots(team, start_date, end_date)
                     results.append(team_result)
                     total_slots_created += team_result.get('slots_created', 0)
+                    total_slots_skipped += team_result.get('slots_skipped', 0)
             
-            self.logger.info(f"Created {total_slots_created} slots for {len(teams)} teams")
+            self.logger.info(
+                f"Created {total_slots_created} slots for {len(teams)} teams ({total_slots_skipped} skipped)"
+            )
             return {
                 "success": True,
                 "total_slots_created": total_slots_created,
+                "total_slots_skipped": total_slots_skipped,
                 "teams_processed": len(teams),
                 "results": results
             }
@@ -65,6 +91,20 @@ class SlotScheduler:
             self.logger.error(f"Error creating slots: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
     
+    def create_slots_for_team(self, team: Team, start_date: date, end_date: date) -> Dict:
+        """
+        Create and assign slots for a single team in its own transaction
+        A failed run is rolled back without affecting any other team
+        
+        Returns:
+            Dict with the team's creation results (see _create_team_slots)
+        """
+        with transaction.atomic():
+            result = self._create_team_slots(team, start_date, end_date)
+            if result.get('error'):
+                transaction.set_rollback(True)
+        return result
+    
     def _create_team_slots(self, team: Team, start_date: date, end_date: date) -> Dict:
         """
         Create slots for a specific team within the date range
@@ -85,53 +125,27 @@ class SlotScheduler:
                     "message": "No active members found"
                 }
             
-            # Convert duration to hours for calculations
-            slot_duration_hours = team.slot_duration.total_seconds() / 3600
-            
-            # Create slots for each day in the period
-            current_date = start_date
-            slots_created = 0
-            
-            while current_date <= end_date:
-                # Skip if it's a team holiday
-                if Holiday.objects.filter(team=team, date=current_date).exists():
-                    current_date += timedelta(days=1)
-                    continue
-                
-                # Calculate number of slots needed for this day (24 hours)
-                slots_per_day = int(24 / slot_duration_hours)
-                
-                for slot_number in range(slots_per_day):
-                    start_time = timezone.make_aware(datetime.combine(
-                        current_date, 
-                        time(hour=int(slot_number * slot_duration_hours))
-                    ))
-                    end_time = start_time + team.slot_duration
-                    
-                    # Check if slot already exists
-                    if Slot.objects.filter(team=team, start_time=start_time).exists():
-                        continue
-                    
-                    # Create the slot (unassigned initially)
-                    slot = Slot.objects.create(
-                        team=team,
-                        start_time=start_time,
-                        end_time=end_time,
-                        is_holiday=False,
-                        is_covered=False
-                    )
-                    slots_created += 1
-                
-                current_date += timedelta(days=1)
+            # Create any missing slots for the period in bulk
+            creation_result = self._materialize_team_slots(team, start_date, end_date)
             
             # Now assign slots fairly
             assignment_result = self._assign_slots_fairly(team, start_date, end_date)
+            if assignment_result.get('error'):
+                # Reported at the top level so create_slots_for_team rolls the new slots back
+                return {
+                    "team_id": team.id,
+                    "team_name": team.name,
+                    "success": False,
+                    "error": f"Slot assignment failed: {assignment_result['error']}",
+                    "assignment_result": assignment_result
+                }
             
             return {
                 "team_id": team.id,
                 "team_name": team.name,
                 "success": True,
-                "slots_created": slots_created,
+                "slots_created": creation_result['slots_created'],
+                "slots_skipped": creation_result['slots_skipped'],
                 "assignment_result": assignment_result
             }
             
@@ -157,307 +171,228 @@ class SlotScheduler:
             if not members:
                 return {"success": False, "message": "No active members"}
             
+            # Preload everything the constraint checks need for the horizon
+            ledger = ScheduleLedger.load(team, start_date, end_date, [member.user_id for member in members])
+            
             # Get unassigned slots for this team and period
-            unassigned_slots = Slot.objects.filter(
-                team=team,
-                start_time__date__range=[start_date, end_date],
-                assigned_member__isnull=True
-            ).order_by('start_time')
+            unassigned_slots = ledger.unassigned_slots()
             
-            assignments_made = 0
+            assigned_slots = []
             violations = []
             
             # Create a set of valid team member user IDs for quick lookup
             valid_team_member_ids = {member.user.id for member in members if member.user and member.user.is_active}
             
+            # Members ranked by fairness, re-ranked one at a time as they are assigned
+            fairness = FairnessQueue(ledger, members)
+            users_by_id = {member.user.id: member.user for member in members}
+            
+            # Slots are planned one day at a time so each day sees the previous days' assignments
+            slots_by_day = {}
             for slot in unassigned_slots:
-                assigned_member = self._find_best_member_for_slot(slot, members)
+                slots_by_day.setdefault(slot.start_time.date(), []).append(slot)
+            
+            solver = None
+            solver_stats = None
+            if self.strategy == 'optimal':
+                solver = OptimalDayAssigner(
+                    team, ledger, fairness, lambda slot, user_id: self._is_member_eligible(slot, user_id, ledger)
+                )
+                solver_stats = {
+                    "strategy": "optimal",
+                    "status": "optimal",
+                    "time_seconds": 0.0,
+                    "iterations": 0,
+                    "objective_value": 0.0,
+                    "days_solved": 0,
+                    "fallback_assignments": 0
+                }
+                started = clock.monotonic()
+                deadline = started + self.time_budget
+            
+            for day, day_slots in slots_by_day.items():
+                fairness.advance_to(day)
                 
-                if assigned_member:
-                    # CRITICAL SAFETY CHECK: Ensure assigned member is actually a team member
-                    if assigned_member.id not in valid_team_member_ids:
-                        violations.append({
-                            "slot_id": slot.id,
-                            "member_id": assigned_member.id,
-                            "violation": f"User {assigned_member.name} is not a member of team {team.name}"
-                        })
-                        continue
+                planned = {}
+                if solver and solver_stats["status"] == "optimal":
+                    plan = solver.solve(day, day_slots, list(users_by_id), deadline)
+                    planned = plan["assignments"]
+                    solver_stats["iterations"] += plan["iterations"]
+                    solver_stats["objective_value"] += plan["cost"]
+                    if plan["completed"]:
+                        solver_stats["days_solved"] += 1
+                    else:
+                        # Out of time: keep the partial plan, greedy covers the rest
+                        solver_stats["status"] = "time_limit"
+                        self.logger.warning(
+                            f"Optimal assignment for team {team.id} hit the {self.time_budget}s budget on {day}, "
+                            f"falling back to greedy"
+                        )
+                
+                for slot in day_slots:
+                    planned_user_id = planned.get(slot.id)
+                    if planned_user_id is not None and self._is_member_eligible(slot, planned_user_id, ledger):
+                        assigned_member = users_by_id[planned_user_id]
+                    else:
+                        assigned_member = self._find_best_member_for_slot(slot, members, ledger, fairness)
+                        if solver and assigned_member:
+                            solver_stats["fallback_assignments"] += 1
                     
-                    # Validate constraints before assignment
-                    violation = self._validate_assignment_constraints(slot, assigned_member)
-                    if not violation:
-                        slot.assigned_member = assigned_member
-                        slot.is_covered = True
-                        slot.save()
-                        assignments_made += 1
+                    if assigned_member:
+                        # CRITICAL SAFETY CHECK: Ensure assigned member is actually a team member
+                        if assigned_member.id not in valid_team_member_ids:
+                            violations.append({
+                                "slot_id": slot.id,
+                                "member_id": assigned_member.id,
+                                "violation": f"User {assigned_member.name} is not a member of team {team.name}"
+                            })
+                            continue
+                        
+                        # Validate constraints before assignment
+                        violation = ledger.violation_for(slot, assigned_member.id)
+                        if not violation:
+                            slot.assigned_member = assigned_member
+                            slot.is_covered = True
+                            ledger.assign(slot, assigned_member.id)
+                            assigned_slots.append(slot)
+                        else:
+                            violations.append({
+                                "slot_id": slot.id,
+                                "member_id": assigned_member.id,
+                                "violation": violation
+                            })
+                        
+                        # Re-rank only the member that was just considered
+                        fairness.refresh(assigned_member.id)
                     else:
                         violations.append({
                             "slot_id": slot.id,
-                            "member_id": assigned_member.id,
-                            "violation": violation
+                            "member_id": None,
+                            "violation": "No suitable member found"
                         })
-                else:
-                    violations.append({
-                        "slot_id": slot.id,
-                        "member_id": None,
-                        "violation": "No suitable member found"
-                    })
             
-            return {
+            # Write all decisions back in batches
+            self._write_assignments(assigned_slots)
+            
+            result = {
                 "success": True,
-                "assignments_made": assignments_made,
-                "total_slots": unassigned_slots.count(),
+                "assignments_made": len(assigned_slots),
+                "total_slots": len(unassigned_slots),
                 "violations": violations
             }
+            if solver_stats:
+                solver_stats["time_seconds"] = round(clock.monotonic() - started, 4)
+                result["solver"] = solver_stats
+            return result
             
         except Exception as e:
             self.logger.error(f"Error assigning slots for team {team.id}: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
     
-    def _find_best_member_for_slot(self, slot: Slot, members: List[TeamMember]) -> Optional[User]:
+    def _write_assignments(self, slots: List[Slot]):
+        """
+        Persist the assigned_member/is_covered decisions on slots with batched UPDATEs
+        """
+        if not slots:
+            return
+        
+        now = timezone.now()
+        for slot in slots:
+            slot.updated_at = now
+        Slot.objects.bulk_update(
+            slots, ['assigned_member', 'is_covered', 'updated_at'], batch_size=self.SLOT_BATCH_SIZE
+        )
+        # bulk_update sends no post_save signals
+        invalidate_schedule_for_slots(slots)
+        invalidate_oncall_rosters(slot.team_id for slot in slots)
+        invalidate_dashboard_stats()
+        publish_slot_changes(slots)
+    
+    def _unassign_team_slots(self, team: Team, start_date: date, end_date: date) -> int:
+        """
+        Clear every assignment for the team in the date range with a single UPDATE
+        Returns the number of slots that were unassigned
+        """
+        unassigned = Slot.objects.filter(
+            team=team,
+            start_time__date__gte=start_date,
+            start_time__date__lte=end_date,
+            assigned_member__isnull=False
+        ).update(assigned_member=None, is_covered=False, updated_at=timezone.now())
+        if unassigned:
+            invalidate_schedule_range(team.id, start_date, end_date)
+            invalidate_oncall_rosters([team.id])
+            invalidate_dashboard_stats()
+            publish_range_change(team.id, start_date, end_date, 'unassigned')
+        return unassigned
+    
+    def _find_best_member_for_slot(self, slot: Slot, members: List[TeamMember],
+                                   ledger: Optional[ScheduleLedger] = None,
+                                   fairness: Optional[FairnessQueue] = None) -> Optional[User]:
         """
         Find the best member to assign to a slot based on constraints and fairness
+        Constraint checks come from the ledger and ranking from the fairness queue;
+        either is built for the slot's date if not given
         """
         slot_date = slot.start_time.date()
-        slot_hours = slot.duration.total_seconds() / 3600
-        
-        # Validate that we only consider actual team members
-        team_users = set()
-        valid_members = []
-        
-        for member in members:
-            # Ensure this is actually a team member
-            if hasattr(member, 'user') and member.user and member.user.is_active:
-                team_users.add(member.user.id)
-                valid_members.append(member)
         
-        if not valid_members:
-            return None
-        
-        # Get member scores (lower is better)
-        member_scores = []
-        
-        for member in valid_members:
-            user = member.user
+        if fairness is None:
+            # Validate that we only consider actual team members
+            valid_members = [
+                member for member in members
+                if hasattr(member, 'user') and member.user and member.user.is_active
+            ]
             
-            # Double-check user is a team member (safety check)
-            if user.id not in team_users:
-                continue
-                
-            score = 0
-            
-            # Check availability (penalty for unavailable)
-            if not self._is_user_available(user, slot_date, slot.team):
-                continue  # Skip unavailable users
-            
-            # Check daily hours constraint (including this slot if assigned) - using team constraints
-            daily_hours = self._get_user_daily_hours(user, slot_date)
-            if daily_hours + slot_hours > slot.team.max_hours_per_day:
-                continue  # Skip if would exceed daily limit
-            
-            # Check weekly hours constraint - using team constraints
-            week_start = slot_date - timedelta(days=slot_date.weekday())
-            weekly_hours = self._get_user_weekly_hours(user, week_start)
-            if weekly_hours + slot_hours > slot.team.max_hours_per_week:
-                continue  # Skip if would exceed weekly limit
-            
-            # Check rest hours constraint - CRITICAL FIX for consecutive slots - using team constraints
-            if not self._has_sufficient_rest(user, slot.start_time, slot.team.min_rest_hours):
-                continue  # Skip if insufficient rest
-            
-            # FIXED: Check for consecutive slots on the same day
-            if self._has_consecutive_slot_on_date(user, slot):
-                continue  # Skip if would create consecutive slots on same day
-            
-            # Calculate fairness score (lower recent assignments = lower score)
-            recent_assignments = self._get_recent_assignments(user, slot_date)
-            score += recent_assignments * 3  # Increased weight for fairness
-            
-            # Check total assignments for rotation
-            total_assignments = Slot.objects.filter(
-                assigned_member=user,
-                start_time__date__gte=slot_date - timedelta(days=30)  # Last 30 days
-            ).count()
-            score += total_assignments * 0.5  # Increased penalty for more assignments
-            
-            member_scores.append((user, score))
-        
-        if not member_scores:
-            return None
+            if not valid_members:
+                return None
+            
+            if ledger is None:
+                ledger = ScheduleLedger.load(
+                    slot.team, slot_date, slot_date, [member.user_id for member in valid_members]
+                )
+            fairness = FairnessQueue(ledger, valid_members)
         
-        # Sort by score and return the best candidate
-        member_scores.sort(key=lambda x: x[1])
-        return member_scores[0][0]
+        fairness.advance_to(slot_date)
+        return fairness.select(lambda user_id: self._is_member_eligible(slot, user_id, fairness.ledger))
     
-    def _is_user_available(self, user: User, check_date: date, team: Team = None) -> bool:
+    def _is_member_eligible(self, slot: Slot, user_id: int, ledger: ScheduleLedger) -> bool:
         """
-        Check if user is available on a given date
-        Considers both Availability model and approved LeaveRequest
+        Check the hard constraints for giving slot to user_id
         """
-        # First check for explicit availability record
-        try:
-            availability = Availability.objects.get(user=user, date=check_date)
-            if not availability.is_available:
-                return False
-        except Availability.DoesNotExist:
-            pass  # No explicit availability record, check leave requests
-        
-        # Check for approved leave requests
-        if team:
-            # If team is specified, check leave requests for that team
-            leave_request = LeaveRequest.objects.filter(
-                user=user,
-                team=team,
-                date=check_date,
-                status='approved'
-            ).first()
-            if leave_request:
-                return False
-        else:
-            # If no team specified, check all approved leave requests for this user on this date
-            leave_requests = LeaveRequest.objects.filter(
-                user=user,
-                date=check_date,
-                status='approved'
-            ).exists()
-            if leave_requests:
-                return False
-        
-        return True  # Available by default if no restrictions found
-    
-    def _get_user_daily_hours(self, user: User, check_date: date) -> float:
-        """Get total assigned hours for user on a specific date"""
-        start_of_day = datetime.combine(check_date, time.min)
-        end_of_day = datetime.combine(check_date, time.max)
-        
-        slots = Slot.objects.filter(
-            assigned_member=user,
-            start_time__gte=start_of_day,
-            start_time__lte=end_of_day
-        )
-        
-        total_hours = sum(
-            slot.duration.total_seconds() / 3600 for slot in slots
-        )
-        return total_hours
-    
-    def _get_user_weekly_hours(self, user: User, week_start: date) -> float:
-        """Get total assigned hours for user in a week"""
-        start_of_week = datetime.combine(week_start, time.min)
-        end_of_week = start_of_week + timedelta(days=7)
-        
-        slots = Slot.objects.filter(
-            assigned_member=user,
-            start_time__gte=start_of_week,
-            start_time__lt=end_of_week
-        )
-        
-        total_hours = sum(
-            slot.duration.total_seconds() / 3600 for slot in slots
-        )
-        return total_hours
-    
-    def _has_sufficient_rest(self, user: User, slot_start: datetime, min_rest_hours: float) -> bool:
-        """Check if user has sufficient rest before the slot"""
-        min_rest_time = timedelta(hours=min_rest_hours)
-        
-        # Check for slots that end close to this slot's start time
-        slot_end_before = slot_start - timedelta(hours=1)  # Check 1 hour before
-        slot_start_after = slot_start + timedelta(hours=1)  # Check 1 hour after
-        
-        conflicting_slots = Slot.objects.filter(
-            assigned_member=user,
-            start_time__lte=slot_start_after,
-            end_time__gte=slot_end_before
-        ).exclude(id=getattr(self, '_current_slot_id', None))  # Exclude current slot being checked
-        
-        if conflicting_slots.exists():
-            return False  # User already has a slot that conflicts
-        
-        # Check for sufficient rest from the last slot
-        last_slot_end = Slot.objects.filter(
-            assigned_member=user,
-            end_time__lt=slot_start,
-            end_time__gte=slot_start - timedelta(days=2)  # Check last 2 days
-        ).order_by('-end_time').first()
-        
-        if not last_slot_end:
-            return True  # No previous slot
-        
-        rest_period = slot_start - last_slot_end.end_time
-        return rest_period >= min_rest_time
-    
-    def _has_consecutive_slot_on_date(self, user: User, slot: Slot) -> bool:
-        """Check if user already has a slot that is consecutive to this one on the same date"""
-        from django.utils import timezone
-        
+        team = slot.team
         slot_date = slot.start_time.date()
+        slot_hours = slot.duration.total_seconds() / 3600
         
-        # Get all slots for this user on this date (excluding the current slot being assigned)
-        start_of_day = timezone.make_aware(datetime.combine(slot_date, time.min))
-        end_of_day = timezone.make_aware(datetime.combine(slot_date, time.max))
-        
-        existing_slots = Slot.objects.filter(
-            assigned_member=user,
-            start_time__gte=start_of_day,
-            start_time__lte=end_of_day,
-            team=slot.team  # Ensure same team
-        ).exclude(id=slot.id).order_by('start_time')  # Exclude the slot being assigned
-        
-        if not existing_slots.exists():
-            return False  # No existing slots on this date
+        # Check availability (skip unavailable users)
+        if not ledger.is_available(user_id, slot_date):
+            return False
         
-        slot_start = slot.start_time
-        slot_end = slot.end_time
+        # Check daily hours constraint (including this slot if assigned) - using team constraints
+        if ledger.daily_hours(user_id, slot_date) + slot_hours > team.max_hours_per_day:
+            return False
         
-        # Check if this slot would be consecutive with any existing slot
-        for existing_slot in existing_slots:
-            # Check if slots are consecutive (start of new slot = end of existing, or vice versa)
-            if (existing_slot.end_time == slot_start or 
-                slot_end == existing_slot.start_time):
-                return True
+        # Check weekly hours constraint - using team constraints
+        week_start = slot_date - timedelta(days=slot_date.weekday())
+        if ledger.weekly_hours(user_id, week_start) + slot_hours > team.max_hours_per_week:
+            return False
         
-        return False
-    
-    def _get_recent_assignments(self, user: User, reference_date: date) -> int:
-        """Get number of recent assignments (for fairness)"""
-        # Count assignments in the last 7 days
-        week_start = reference_date - timedelta(days=7)
+        # Check rest hours constraint - using team constraints
+        if not ledger.has_sufficient_rest(user_id, slot.start_time, team.min_rest_hours, exclude_slot_id=slot.id):
+            return False
         
-        return Slot.objects.filter(
-            assigned_member=user,
-            start_time__date__gte=week_start,
-            start_time__date__lt=reference_date
-        ).count()
+        # Check for consecutive slots on the same day
+        return not ledger.has_consecutive_slot_on_date(user_id, slot)
     
-    def _validate_assignment_constraints(self, slot: Slot, user: User) -> Optional[str]:
+    def _validate_assignment_constraints(self, slot: Slot, user: User,
+                                         ledger: Optional[ScheduleLedger] = None) -> Optional[str]:
         """
         Validate all constraints for a slot assignment
         Returns violation message if constraints are violated, None if valid
         """
-        slot_date = slot.start_time.date()
-        slot_hours = slot.duration.total_seconds() / 3600
-        
-        # Availability check
-        if not self._is_user_available(user, slot_date, slot.team):
-            return "User is not available on this date (due to leave or unavailability)"
-        
-        # Daily hours check - using team constraints
-        daily_hours = self._get_user_daily_hours(user, slot_date)
-        if daily_hours + slot_hours > slot.team.max_hours_per_day:
-            return f"Would exceed daily limit ({slot.team.max_hours_per_day}h)"
-        
-        # Weekly hours check - using team constraints
-        week_start = slot_date - timedelta(days=slot_date.weekday())
-        weekly_hours = self._get_user_weekly_hours(user, week_start)
-        if weekly_hours + slot_hours > slot.team.max_hours_per_week:
-            return f"Would exceed weekly limit ({slot.team.max_hours_per_week}h)"
-        
-        # Rest hours check - using team constraints
-        if not self._has_sufficient_rest(user, slot.start_time, slot.team.min_rest_hours):
-            return f"Insufficient rest time (minimum {slot.team.min_rest_hours}h required)"
-        
-        return None  # No violations
+        if ledger is None:
+            slot_date = slot.start_time.date()
+            ledger = ScheduleLedger.load(slot.team, slot_date, slot_date, [user.id])
+        return ledger.violation_for(slot, user.id)
     
     def revalidate_assignments(self, team: Team = None, start_date: date = None) -> Dict:
         """
@@ -479,30 +414,56 @@ class SlotScheduler:
             
             violations_found = 0
             violations_fixed = 0
-            
-            for slot in slots_query.select_related('assigned_member', 'team'):
-                violation = self._validate_assignment_constraints(slot, slot.assigned_member)
+            fixed_slots = []
+            
+            slots = list(slots_query.select_related('assigned_member', 'team').order_by('start_time'))
+            
+            # Revalidate team by team against one preloaded ledger per team
+            slots_by_team = {}
+            for slot in slots:
+                slots_by_team.setdefault(slot.team_id, []).append(slot)
+            
+            for team_slots in slots_by_team.values():
+                slot_team = team_slots[0].team
+                team_members = list(TeamMember.objects.filter(
+                    team=slot_team,
+                    is_active=True,
+                    user__is_active=True
+                ).select_related('user'))
+                
+                member_ids = {member.user_id for member in team_members}
+                member_ids.update(slot.assigned_member_id for slot in team_slots)
+                ledger = ScheduleLedger.load(
+                    slot_team, team_slots[0].start_time.date(), team_slots[-1].start_time.date(), member_ids
+                )
                 
-                if violation:
-                    violations_found += 1
-                    self.logger.warning(
-                        f"Constraint violation in slot {slot.id}: {violation}"
-                    )
+                for slot in team_slots:
+                    current_member = slot.assigned_member
                     
-                    # Try to find a better assignment
-                    team_members = TeamMember.objects.filter(
-                        team=slot.team,
-                        is_active=True,
-                        user__is_active=True
-                    ).select_related('user')
+                    # Validate the assignment as if the slot were not yet held
+                    ledger.release(slot, current_member.id)
+                    violation = ledger.violation_for(slot, current_member.id)
                     
-                    new_member = self._find_best_member_for_slot(slot, list(team_members))
+                    if violation:
+                        violations_found += 1
+                        self.logger.warning(
+                            f"Constraint violation in slot {slot.id}: {violation}"
+                        )
+                        
+                        # Try to find a better assignment
+                        new_member = self._find_best_member_for_slot(slot, team_members, ledger)
+                        
+                        if new_member and new_member != current_member:
+                            slot.assigned_member = new_member
+                            ledger.assign(slot, new_member.id)
+                            fixed_slots.append(slot)
+                            violations_fixed += 1
+                            self.logger.info(f"Fixed slot {slot.id} assignment")
+                            continue
                     
-                    if new_member and new_member != slot.assigned_member:
-                        slot.assigned_member = new_member
-                        slot.save()
-                        violations_fixed += 1
-                        self.logger.info(f"Fixed slot {slot.id} assignment")
+                    ledger.assign(slot, current_member.id)
+            
+            self._write_assignments(fixed_slots)
             
             return {
                 "success": True,
@@ -519,50 +480,111 @@ class SlotScheduler:
         Ensure slots exist for a team in the given period (create missing ones without assignment)
         """
         try:
-            # Convert duration to hours for calculations
-            slot_duration_hours = team.slot_duration.total_seconds() / 3600
-            slots_created = 0
-            
-            # Create slots for each day in the period if they don't exist
-            current_date = start_date
-            
-            while current_date <= end_date:
-                # Skip if it's a team holiday
-                if Holiday.objects.filter(team=team, date=current_date).exists():
-                    current_date += timedelta(days=1)
-                    continue
-                
-                # Calculate number of slots needed for this day (24 hours)
-                slots_per_day = int(24 / slot_duration_hours)
-                
-                for slot_number in range(slots_per_day):
-                    start_time = timezone.make_aware(datetime.combine(
-                        current_date, 
-                        time(hour=int(slot_number * slot_duration_hours))
-                    ))
-                    end_time = start_time + team.slot_duration
-                    
-                    # Only create if slot doesn't exist
-                    if not Slot.objects.filter(team=team, start_time=start_time).exists():
-                        Slot.objects.create(
-                            team=team,
-                            start_time=start_time,
-                            end_time=end_time,
-                            is_holiday=False,
-                            is_covered=False
-                        )
-                        slots_created += 1
-                
-                current_date += timedelta(days=1)
-            
-            return {
-                "success": True,
-                "slots_created": slots_created
-            }
+            creation_result = self._materialize_team_slots(team, start_date, end_date)
+            return {"success": True, **creation_result}
             
         except Exception as e:
             self.logger.error(f"Error ensuring slots exist for team {team.id}: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
+    
+    def _materialize_team_slots(self, team: Team, start_date: date, end_date: date) -> Dict:
+        """
+        Insert every missing slot for the team in the date range
+        
+        Candidate start times are computed in Python and diffed against the
+        team's holidays and existing slot start times (one query each), then
+        the remainder is inserted in batches, skipping slots a concurrent run
+        inserted in the meantime.
+        
+        Returns:
+            Dict with slots_created and slots_skipped (holidays or already existing)
+        """
+        slots_per_day = int(timedelta(days=1) / team.slot_duration)
+        
+        holidays = set(
+            Holiday.objects.filter(
+                team=team, date__range=[start_date, end_date]
+            ).values_list('date', flat=True)
+        )
+        existing_starts = set(
+            Slot.objects.filter(
+                team=team, start_time__date__range=[start_date, end_date]
+            ).values_list('start_time', flat=True)
+        )
+        
+        missing_slots = []
+        slots_skipped = 0
+        current_date = start_date
+        
+        while current_date <= end_date:
+            day_start = timezone.make_aware(datetime.combine(current_date, time.min))
+            
+            for slot_number in range(slots_per_day):
+                start_time = day_start + slot_number * team.slot_duration
+                
+                if current_date in holidays or start_time in existing_starts:
+                    slots_skipped += 1
+                    continue
+                
+                missing_slots.append(Slot(
+                    team=team,
+                    start_time=start_time,
+                    end_time=start_time + team.slot_duration,
+                    is_holiday=False,
+                    is_covered=False
+                ))
+            
+            current_date += timedelta(days=1)
+        
+        created_slots = self._insert_missing_slots(missing_slots)
+        # Slots a concurrent run inserted first were not created by this one
+        slots_skipped += len(missing_slots) - len(created_slots)
+        invalidate_schedule_for_slots(created_slots)
+        if created_slots:
+            publish_range_change(team.id, start_date, end_date, 'created')
+        
+        return {
+            "slots_created": len(created_slots),
+            "slots_skipped": slots_skipped
+        }
+    
+    def _insert_missing_slots(self, slots: List[Slot]) -> List[Slot]:
+        """
+        Insert slots in batches, skipping any whose (team, start_time) already exists
+        
+        bulk_create(ignore_conflicts=True) cannot tell which rows it inserted, so this
+        uses INSERT ... ON CONFLICT DO NOTHING RETURNING directly. Returns the slots
+        this call inserted, with their ids set.
+        """
+        if not slots:
+            return []
+        
+        now = timezone.now()
+        fields = ['team', 'start_time', 'end_time', 'is_holiday', 'is_covered', 'created_at', 'updated_at']
+        columns = ', '.join(connection.ops.quote_name(Slot._meta.get_field(name).column) for name in fields)
+        table = connection.ops.quote_name(Slot._meta.db_table)
+        slots_by_key = {(slot.team_id, slot.start_time): slot for slot in slots}
+        
+        created = []
+        with connection.cursor() as cursor:
+            for offset in range(0, len(slots), self.SLOT_BATCH_SIZE):
+                batch = slots[offset:offset + self.SLOT_BATCH_SIZE]
+                params = []
+                for slot in batch:
+                    slot.created_at = slot.updated_at = now
+                    params.extend([slot.team_id, slot.start_time, slot.end_time, slot.is_holiday, slot.is_covered, now, now])
+                row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES {', '.join([row] * len(batch))} "
+                    f"ON CONFLICT (team_id, start_time) DO NOTHING RETURNING id, team_id, start_time",
+                    params
+                )
+                for slot_id, team_id, start_time in cursor.fetchall():
+                    slot = slots_by_key[(team_id, start_time)]
+                    slot.id = slot_id
+                    slot._state.adding = False
+                    created.append(slot)
+        return created
 
     def reassign_team_slots(self, team: Team, start_date: date, end_date: date) -> Dict:
         """
@@ -574,6 +596,7 @@ class SlotScheduler:
             # First, ensure slots exist for the date range (create missing ones without assignment)
             creation_result = self._ensure_slots_exist_for_period(team, start_date, end_date)
             slots_created = creation_result.get('slots_created', 0)
+            slots_skipped = creation_result.get('slots_skipped', 0)
             
             # Get all slots in the date range for this team (including newly created ones)
             slots_to_reassign = Slot.objects.filter(
@@ -591,14 +614,8 @@ class SlotScheduler:
                 }
             
             # Unassign all slots in the range to ensure fair redistribution
-            slots_reassigned = 0
             with transaction.atomic():
-                for slot in slots_to_reassign:
-                    if slot.assigned_member:
-                        slot.assigned_member = None
-                        slot.is_covered = False
-                        slot.save()
-                        slots_reassigned += 1
+                slots_reassigned = self._unassign_team_slots(team, start_date, end_date)
                 
                 # Now reassign all slots fairly using the existing logic
                 assignment_result = self._assign_slots_fairly(team, start_date, end_date)
@@ -609,6 +626,7 @@ class SlotScheduler:
                         "success": True,
                         "slots_reassigned": slots_reassigned,
                         "slots_created": slots_created,
+                        "slots_skipped": slots_skipped,
                         "new_assignments": assignment_result.get('assignments_made', 0),
                         "assignment_result": assignment_result
                     }
@@ -681,6 +699,7 @@ class SlotScheduler:
             # Step 3: Ensure all slots exist for the period
             creation_result = self._ensure_slots_exist_for_period(team, start_date, end_date)
             slots_created = creation_result.get('slots_created', 0)
+            slots_skipped = creation_result.get('slots_skipped', 0)
             
             if not creation_result.get('success', False):
                 return {
@@ -708,14 +727,8 @@ class SlotScheduler:
                 }
             
             # Step 5: Unassign all existing slots to start fresh
-            slots_reassigned = 0
             with transaction.atomic():
-                for slot in all_slots:
-                    if slot.assigned_member:
-                        slot.assigned_member = None
-                        slot.is_covered = False
-                        slot.save()
-                        slots_reassigned += 1
+                slots_reassigned = self._unassign_team_slots(team, start_date, end_date)
                 
                 # Step 6: Reassign all slots fairly with comprehensive constraint checking
                 assignment_result = self._assign_slots_fairly_with_leave_check(team, start_date, end_date)
@@ -734,6 +747,7 @@ class SlotScheduler:
                     return {
                         "success": True,
                         "slots_created": slots_created,
+                        "slots_skipped": slots_skipped,
                         "slots_reassigned": slots_reassigned,
                         "new_assignments": new_assignments,
                         "total_slots": total_slots,
@@ -752,6 +766,174 @@ class SlotScheduler:
             self.logger.error(f"Error recalculating slots for new member in team {team.id}: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
     
+    def rebalance_for_new_member(self, team: Team, user: User, start_date: date = None, end_date: date = None) -> Dict:
+        """
+        Minimal-change rebalancing when a member joins an active team
+        Instead of re-planning the whole period, this method:
+        1. Ensures all slots exist and fills any that are empty
+        2. Moves slots from the most loaded members to the newcomer, one at a time,
+           until the newcomer holds their fair share or no further move is allowed
+        Everyone else keeps their shifts, and the work is proportional to the number of moves
+        """
+        try:
+            if not start_date:
+                start_date = timezone.now().date() + timedelta(days=1)  # Start from tomorrow
+            
+            if not end_date:
+                end_date = start_date + timedelta(days=6)  # 7 days total
+            
+            creation_result = self._ensure_slots_exist_for_period(team, start_date, end_date)
+            if not creation_result.get('success', False):
+                return {
+                    "success": False,
+                    "error": f"Failed to create slots: {creation_result.get('error', 'Unknown error')}"
+                }
+            
+            members = list(TeamMember.objects.filter(
+                team=team, is_active=True, user__is_active=True
+            ).select_related('user'))
+            member_ids = {member.user_id for member in members}
+            
+            if user.id not in member_ids:
+                return {"success": False, "error": f"User {user.id} is not an active member of team {team.name}"}
+            
+            ledger = ScheduleLedger.load(team, start_date, end_date, member_ids)
+            fairness = FairnessQueue(ledger, members)
+            changed_slots = []
+            
+            # Step 1: Fill empty slots; the newcomer's clean record ranks them first
+            slots_filled = 0
+            for slot in ledger.unassigned_slots():
+                fairness.advance_to(slot.start_time.date())
+                new_member = self._find_best_member_for_slot(slot, members, ledger, fairness)
+                if new_member:
+                    slot.assigned_member = new_member
+                    slot.is_covered = True
+                    ledger.assign(slot, new_member.id)
+                    fairness.refresh(new_member.id)
+                    changed_slots.append(slot)
+                    slots_filled += 1
+            
+            # Step 2: Hand slots over from the most loaded members
+            holdings = {member_id: [] for member_id in member_ids}
+            for slot in ledger.slots:
+                if slot.assigned_member_id in holdings:
+                    holdings[slot.assigned_member_id].append(slot)
+            
+            fair_share = sum(len(slots) for slots in holdings.values()) // len(members)
+            newcomer_slots = holdings[user.id]
+            donors = [(-len(slots), member_id) for member_id, slots in holdings.items() if member_id != user.id]
+            heapq.heapify(donors)
+            # Slots already rejected for the newcomer stay rejected: taking more
+            # slots only tightens their hours and rest constraints
+            next_candidate = {member_id: 0 for member_id in holdings}
+            
+            slots_handed_over = 0
+            while donors and len(newcomer_slots) < fair_share:
+                donor_count, donor_id = heapq.heappop(donors)
+                donor_slots = holdings[donor_id]
+                if -donor_count <= len(newcomer_slots) + 1:
+                    break  # Moving a slot would not make the split any fairer
+                
+                moved = None
+                while next_candidate[donor_id] < len(donor_slots):
+                    slot = donor_slots[next_candidate[donor_id]]
+                    next_candidate[donor_id] += 1
+                    if self._is_member_eligible(slot, user.id, ledger):
+                        moved = slot
+                        break
+                
+                if moved is None:
+                    continue  # Nothing this donor holds can go to the newcomer
+                
+                ledger.release(moved, donor_id)
+                ledger.assign(moved, user.id)
+                donor_slots.remove(moved)
+                next_candidate[donor_id] -= 1
+                newcomer_slots.append(moved)
+                moved.assigned_member = user
+                moved.is_covered = True
+                if moved not in changed_slots:
+                    changed_slots.append(moved)
+                slots_handed_over += 1
+                heapq.heappush(donors, (-len(donor_slots), donor_id))
+            
+            self._write_assignments(changed_slots)
+            
+            self.logger.info(
+                f"Rebalanced team '{team.name}' for new member {user.id}: {slots_handed_over} slots handed over, "
+                f"{slots_filled} empty slots filled"
+            )
+            return {
+                "success": True,
+                "slots_created": creation_result.get('slots_created', 0),
+                "slots_filled": slots_filled,
+                "slots_handed_over": slots_handed_over,
+                "slots_changed_hands": slots_handed_over,
+                "new_member_slots": len(newcomer_slots),
+                "fair_share": fair_share,
+                "members_count": len(members)
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error rebalancing slots for new member in team {team.id}: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+    
+    def rebalance_for_removed_member(self, team: Team, user_id: int, start_date: date = None,
+                                     end_date: date = None) -> Dict:
+        """
+        Minimal-change rebalancing when a member leaves a team
+        Only the departed member's slots in the period are reassigned; slots nobody
+        can take are left empty
+        """
+        try:
+            if not start_date:
+                start_date = timezone.now().date() + timedelta(days=1)  # Start from tomorrow
+            
+            if not end_date:
+                end_date = start_date + timedelta(days=6)  # 7 days total
+            
+            members = list(TeamMember.objects.filter(
+                team=team, is_active=True, user__is_active=True
+            ).exclude(user_id=user_id).select_related('user'))
+            
+            ledger = ScheduleLedger.load(team, start_date, end_date, [member.user_id for member in members])
+            fairness = FairnessQueue(ledger, members)
+            orphaned_slots = [slot for slot in ledger.slots if slot.assigned_member_id == user_id]
+            
+            slots_changed_hands = 0
+            for slot in orphaned_slots:
+                slot.assigned_member = None
+                slot.is_covered = False
+                
+                fairness.advance_to(slot.start_time.date())
+                new_member = self._find_best_member_for_slot(slot, members, ledger, fairness)
+                if new_member:
+                    slot.assigned_member = new_member
+                    slot.is_covered = True
+                    ledger.assign(slot, new_member.id)
+                    fairness.refresh(new_member.id)
+                    slots_changed_hands += 1
+            
+            self._write_assignments(orphaned_slots)
+            
+            slots_unfilled = len(orphaned_slots) - slots_changed_hands
+            self.logger.info(
+                f"Rebalanced team '{team.name}' after member {user_id} left: {slots_changed_hands} slots reassigned, "
+                f"{slots_unfilled} left empty"
+            )
+            return {
+                "success": True,
+                "slots_released": len(orphaned_slots),
+                "slots_changed_hands": slots_changed_hands,
+                "slots_unfilled": slots_unfilled,
+                "members_count": len(members)
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error rebalancing slots after member left team {team.id}: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+    
     def _assign_slots_fairly_with_leave_check(self, team: Team, start_date: date, end_date: date) -> Dict:
         """
         Enhanced slot assignment that ensures leave requests are properly considered
@@ -0,0 +1,171 @@
+"""
+Min-cost flow model for optimal slot assignment
+"""
+import math
+import time as clock
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, date, time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from .models import Slot, Team
+from .slot_fairness import FairnessQueue
+from .slot_ledger import ScheduleLedger
+
+
+class MinCostFlow:
+    """
+    Successive shortest augmenting paths (SPFA) on a residual graph
+
+    Finds the maximum flow of minimum cost, stopping early once the
+    optional deadline (a time.monotonic() value) has passed.
+    """
+
+    def __init__(self, node_count: int):
+        # Adjacency lists of [to, capacity, cost, index of reverse edge]
+        self.graph: List[List[list]] = [[] for _ in range(node_count)]
+
+    def add_edge(self, source: int, target: int, capacity: int, cost: float) -> Tuple[int, int]:
+        """Add an edge and return its (node, index) handle for reading flow later"""
+        self.graph[source].append([target, capacity, cost, len(self.graph[target])])
+        self.graph[target].append([source, 0, -cost, len(self.graph[source]) - 1])
+        return source, len(self.graph[source]) - 1
+
+    def flow_on(self, handle: Tuple[int, int]) -> int:
+        """Flow pushed through an edge returned by add_edge"""
+        node, index = handle
+        target, _, _, reverse = self.graph[node][index]
+        return self.graph[target][reverse][1]
+
+    def solve(self, source: int, sink: int, deadline: Optional[float] = None) -> Dict:
+        """
+        Push as much flow as possible at minimum cost
+
+        Returns:
+            Dict with flow, cost, iterations (augmenting paths) and completed
+            (False if the deadline cut the search short)
+        """
+        node_count = len(self.graph)
+        flow = 0
+        cost = 0.0
+        iterations = 0
+
+        while True:
+            if deadline is not None and clock.monotonic() > deadline:
+                return {"flow": flow, "cost": cost, "iterations": iterations, "completed": False}
+
+            distance = [math.inf] * node_count
+            previous: List[Optional[Tuple[int, int]]] = [None] * node_count
+            in_queue = [False] * node_count
+            distance[source] = 0
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                in_queue[node] = False
+                for index, (target, capacity, edge_cost, _) in enumerate(self.graph[node]):
+                    if capacity > 0 and distance[node] + edge_cost < distance[target] - 1e-9:
+                        distance[target] = distance[node] + edge_cost
+                        previous[target] = (node, index)
+                        if not in_queue[target]:
+                            in_queue[target] = True
+                            queue.append(target)
+
+            if distance[sink] == math.inf:
+                return {"flow": flow, "cost": cost, "iterations": iterations, "completed": True}
+
+            # Bottleneck along the path, then augment
+            push = math.inf
+            node = sink
+            while node != source:
+                parent, index = previous[node]
+                push = min(push, self.graph[parent][index][1])
+                node = parent
+
+            node = sink
+            while node != source:
+                parent, index = previous[node]
+                edge = self.graph[parent][index]
+                edge[1] -= push
+                self.graph[node][edge[3]][1] += push
+                node = parent
+
+            flow += push
+            cost += push * distance[sink]
+            iterations += 1
+
+
+class OptimalDayAssigner:
+    """
+    Assign one day's slots to members as a min-cost flow problem
+
+    Network: source -> slot -> member rest window -> member -> sink.
+
+    - slot -> window edges exist only for members eligible for the slot given
+      everything already in the ledger, and carry no cost
+    - each member rest window (slot duration + min rest hours long) has
+      capacity 1, so nobody gets two shifts too close within the day
+    - member -> sink is split into unit edges with rising cost (the member's
+      fairness score plus one history weight per extra slot), capped by the
+      member's remaining daily and weekly hours
+
+    Maximum flow covers as many slots as possible; minimum cost spreads them
+    by the fairness weights. Rest windows are fixed blocks, so a pair of
+    shifts straddling two windows is caught by the caller's final check.
+    """
+
+    def __init__(self, team: Team, ledger: ScheduleLedger, fairness: FairnessQueue,
+                 is_eligible: Callable[[Slot, int], bool]):
+        self.team = team
+        self.ledger = ledger
+        self.fairness = fairness
+        self.is_eligible = is_eligible
+
+    def solve(self, day: date, slots: List[Slot], member_ids: List[int], deadline: Optional[float] = None) -> Dict:
+        """
+        Returns:
+            Dict with assignments (slot_id -> user_id) and the solver stats
+        """
+        team = self.team
+        slot_hours = team.slot_duration.total_seconds() / 3600
+        window = team.slot_duration + timedelta(hours=team.min_rest_hours)
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        week_start = day - timedelta(days=day.weekday())
+
+        node_ids = defaultdict(lambda: len(node_ids))
+        source, sink = node_ids['source'], node_ids['sink']
+        edges = []
+
+        # Build edges first so the node count is known
+        for slot in slots:
+            window_index = int((slot.start_time - day_start) / window)
+            for user_id in member_ids:
+                if self.is_eligible(slot, user_id):
+                    edges.append((node_ids[('slot', slot.id)], node_ids[('window', user_id, window_index)], 1, 0,
+                                  (slot.id, user_id)))
+            edges.append((source, node_ids[('slot', slot.id)], 1, 0, None))
+
+        windows = [key for key in list(node_ids) if isinstance(key, tuple) and key[0] == 'window']
+        for key in windows:
+            edges.append((node_ids[key], node_ids[('member', key[1])], 1, 0, None))
+
+        members = [key[1] for key in list(node_ids) if isinstance(key, tuple) and key[0] == 'member']
+        for user_id in members:
+            daily_left = team.max_hours_per_day - self.ledger.daily_hours(user_id, day)
+            weekly_left = team.max_hours_per_week - self.ledger.weekly_hours(user_id, week_start)
+            capacity = max(0, int(min(daily_left, weekly_left) // slot_hours))
+            base = self.fairness.score(user_id)
+            for extra in range(capacity):
+                cost = base + extra * FairnessQueue.HISTORY_WEIGHT
+                edges.append((node_ids[('member', user_id)], sink, 1, cost, None))
+
+        network = MinCostFlow(len(node_ids))
+        choices = []
+        for source_node, target_node, capacity, cost, choice in edges:
+            handle = network.add_edge(source_node, target_node, capacity, cost)
+            if choice:
+                choices.append((handle, choice))
+
+        stats = network.solve(source, sink, deadline)
+        assignments = {slot_id: user_id for handle, (slot_id, user_id) in choices if network.flow_on(handle)}
+        return {"assignments": assignments, **stats}
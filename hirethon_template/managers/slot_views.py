@@ -141,3 +141,37 @@ def revalidate_slots_view(request):
             {'error': {'commonError': 'An error occurred while starting slot revalidation.'}},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_rebalance_job_status_view(request, job_id):
+    """
+    API view to poll a slot rebalance job scheduled by a team membership change
+    """
+    if not (request.user.is_superuser or request.user.is_manager):
+        return Response(
+            {'error': {'commonError': 'Only managers can view rebalance jobs.'}},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    from config import celery_app
+    from .tasks import team_rebalance_job_exists
+    
+    # Celery reports unknown ids as PENDING, same as jobs still waiting out the debounce window
+    job = celery_app.AsyncResult(job_id)
+    if job.state == 'PENDING' and not team_rebalance_job_exists(job_id):
+        return Response(
+            {'error': {'commonError': 'Rebalance job not found.'}},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    response_data = {
+        'job_id': job_id,
+        'status': job.state,
+    }
+    if job.successful():
+        response_data['result'] = job.result
+    elif job.failed():
+        response_data['error'] = str(job.result)
+    
+    return Response(response_data, status=status.HTTP_200_OK)
@@ -1,4 +1,6 @@
 import logging
+import threading
+import weakref
 from datetime import date, timedelta
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -52,29 +54,39 @@ def send_user_credentials_email_task(self, user_email, user_name, password, is_m
 @celery_app.task(bind=True, max_retries=2)
 def create_slots_daily_task(self):
     """
-    Daily task to create and manage slots for the next 7 days
+    Daily coordinator that creates and assigns slots for the next 7 days
+    Dispatches one create_team_slots_task per active team as a chord, so teams run
+    in parallel across workers, each in its own transaction, and results are
+    aggregated by aggregate_slot_creation_results
     """
     logger.info("Starting daily slot creation task")
     
     try:
-        from .slot_service import SlotScheduler
-        
-        scheduler = SlotScheduler()
+        from celery import chord
+        from .models import Team
         
         # Create slots for the next 7 days
         today = timezone.now().date()
         end_date = today + timedelta(days=7)
         
-        logger.info(f"Creating slots from {today} to {end_date}")
+        team_ids = list(Team.objects.filter(is_active=True).values_list('id', flat=True))
         
-        result = scheduler.create_slots_for_period(today, end_date)
+        if not team_ids:
+            logger.warning("No active teams found for slot creation")
+            return {"success": False, "message": "No active teams found"}
         
-        if result.get('success', False):
-            logger.info(f"Successfully created {result.get('total_slots_created', 0)} slots")
-        else:
-            logger.error(f"Slot creation failed: {result.get('error', 'Unknown error')}")
-            
-        return result
+        logger.info(f"Dispatching slot creation from {today} to {end_date} for {len(team_ids)} teams")
+        
+        result = chord(
+            create_team_slots_task.s(team_id, today.isoformat(), end_date.isoformat())
+            for team_id in team_ids
+        )(aggregate_slot_creation_results.s())
+        
+        return {
+            "success": True,
+            "teams_dispatched": len(team_ids),
+            "chord_id": result.id
+        }
         
     except Exception as exc:
         logger.error(f"Daily slot creation task failed: {str(exc)}", exc_info=True)
@@ -88,6 +100,266 @@ def create_slots_daily_task(self):
             raise exc
 
 
+@celery_app.task(bind=True, max_retries=2)
+def create_team_slots_task(self, team_id, start_date, end_date):
+    """
+    Create and assign slots for one team between two ISO dates
+    Failures are retried for this team only; after the last retry the failure is
+    returned rather than raised so the chord still aggregates the other teams
+    """
+    logger.info(f"Starting slot creation for team {team_id}")
+    
+    try:
+        from .slot_service import SlotScheduler
+        from .models import Team
+        
+        try:
+            team = Team.objects.get(id=team_id, is_active=True)
+        except Team.DoesNotExist:
+            logger.warning(f"Team {team_id} not found or inactive, skipping slot creation")
+            return {"team_id": team_id, "success": False, "message": "Team not found or inactive"}
+        
+        result = SlotScheduler().create_slots_for_team(
+            team, date.fromisoformat(start_date), date.fromisoformat(end_date)
+        )
+        
+        if result.get('error'):
+            raise Exception(result['error'])
+        
+        logger.info(f"Created {result.get('slots_created', 0)} slots for team {team_id}")
+        return result
+        
+    except Exception as exc:
+        logger.error(f"Slot creation for team {team_id} failed: {str(exc)}", exc_info=True)
+        
+        if self.request.retries < self.max_retries:
+            logger.info(f"Retrying slot creation for team {team_id} in 5 minutes")
+            raise self.retry(countdown=300, exc=exc)
+        
+        logger.error(f"Slot creation for team {team_id} permanently failed after {self.max_retries} retries")
+        return {"team_id": team_id, "success": False, "error": str(exc)}
+
+
+@celery_app.task
+def aggregate_slot_creation_results(results):
+    """
+    Chord callback summarising the per-team slot creation results
+    """
+    total_slots_created = sum(result.get('slots_created', 0) for result in results)
+    total_slots_skipped = sum(result.get('slots_skipped', 0) for result in results)
+    failed_teams = [result.get('team_id') for result in results if result.get('error')]
+    
+    if failed_teams:
+        logger.error(f"Slot creation failed for teams: {failed_teams}")
+    logger.info(
+        f"Created {total_slots_created} slots for {len(results)} teams ({total_slots_skipped} skipped)"
+    )
+    
+    return {
+        "success": not failed_teams,
+        "total_slots_created": total_slots_created,
+        "total_slots_skipped": total_slots_skipped,
+        "teams_processed": len(results),
+        "failed_teams": failed_teams,
+        "results": results
+    }
+
+
+# Membership changes to one team within this many seconds share a single re-plan
+TEAM_REBALANCE_DEBOUNCE_SECONDS = 15
+
+# Lifetime of a job's cache keys; an id that was never dispatched is reused until then
+TEAM_REBALANCE_JOB_TIMEOUT = 3600
+
+
+def _team_rebalance_job_key(team_id):
+    return f"team_rebalance_job:{team_id}"
+
+
+def _team_rebalance_changes_key(job_id):
+    return f"team_rebalance_changes:{job_id}"
+
+
+def _team_rebalance_first_change_key(job_id):
+    return f"team_rebalance_first_change:{job_id}"
+
+
+class _PendingTeamRebalance:
+    """
+    on_commit callback carrying one atomic block's membership changes to a team
+    Django drops it with the block on rollback, so nothing is recorded for changes that never committed
+    """
+    
+    def __init__(self, team_id, job_id):
+        self.team_id = team_id
+        self.job_id = job_id
+        self.changes = []
+        self.recorded = False
+    
+    def __call__(self):
+        self.recorded = True
+        _record_team_rebalance(self)
+
+
+# Pending rebalances of this thread, keyed by (team_id, savepoint stack) of the atomic block
+# that registered them. The on_commit queue holds the only strong reference, so an entry
+# disappears as soon as its block rolls back
+_pending_team_rebalances = threading.local()
+
+
+def _pending_team_rebalance_key(team_id):
+    from django.db import transaction
+    
+    return team_id, tuple(transaction.get_connection().savepoint_ids)
+
+
+def _pending_team_rebalance(team_id):
+    """The not yet committed changes to team_id of the current atomic block, if any"""
+    pending_by_key = getattr(_pending_team_rebalances, 'by_key', None)
+    if pending_by_key is None:
+        return None
+    pending = pending_by_key.get(_pending_team_rebalance_key(team_id))
+    if pending is None or pending.recorded:
+        return None
+    return pending
+
+
+def _allocate_team_rebalance_job_id(team_id):
+    """
+    The id of the team's job that has not started yet
+    Concurrent callers race on cache.add, so they all get the id the job key actually holds
+    """
+    import uuid
+    from django.core.cache import cache
+    
+    job_key = _team_rebalance_job_key(team_id)
+    job_id = None
+    while job_id is None:
+        cache.add(job_key, str(uuid.uuid4()), timeout=TEAM_REBALANCE_JOB_TIMEOUT)
+        # None when the job started, and dropped the key, in between
+        job_id = cache.get(job_key)
+    return job_id
+
+
+def _record_team_rebalance(pending):
+    """
+    Count committed changes against their job, dispatching it when nothing was waiting for it
+    The counter only holds changes no run has consumed yet: a count of exactly these changes
+    means the job either never ran or has already finished, so it is (re)dispatched
+    """
+    from django.core.cache import cache
+    
+    changes_key = _team_rebalance_changes_key(pending.job_id)
+    cache.add(_team_rebalance_first_change_key(pending.job_id), pending.changes[0], timeout=TEAM_REBALANCE_JOB_TIMEOUT)
+    cache.add(changes_key, 0, timeout=TEAM_REBALANCE_JOB_TIMEOUT)
+    if cache.incr(changes_key, len(pending.changes)) == len(pending.changes):
+        rebalance_team_task.apply_async(
+            args=(pending.team_id, pending.job_id), task_id=pending.job_id, countdown=TEAM_REBALANCE_DEBOUNCE_SECONDS
+        )
+        logger.info(f"Scheduled slot rebalance job {pending.job_id} for team {pending.team_id}")
+
+
+def enqueue_team_rebalance(team_id, added_user_id=None, removed_user_id=None):
+    """
+    Mark a team's schedule as dirty and return the id of the re-plan job it joins
+    Every change before the job starts joins the same id; the changes are counted once
+    the current transaction commits, and the first committed change dispatches
+    rebalance_team_task after the debounce window. A single change is rebalanced
+    incrementally, several trigger a full re-plan. Changes of a rolled back
+    transaction are never counted.
+    """
+    from django.db import transaction
+    
+    pending = _pending_team_rebalance(team_id)
+    is_first_change = pending is None
+    if is_first_change:
+        pending = _PendingTeamRebalance(team_id, _allocate_team_rebalance_job_id(team_id))
+        if not hasattr(_pending_team_rebalances, 'by_key'):
+            _pending_team_rebalances.by_key = weakref.WeakValueDictionary()
+        _pending_team_rebalances.by_key[_pending_team_rebalance_key(team_id)] = pending
+    pending.changes.append({"added_user_id": added_user_id, "removed_user_id": removed_user_id})
+    if is_first_change:
+        # Runs right away outside a transaction
+        transaction.on_commit(pending)
+    
+    return pending.job_id
+
+
+def team_rebalance_job_exists(job_id):
+    """Whether job_id was handed out for changes that committed (and has not expired since)"""
+    from django.core.cache import cache
+    
+    return cache.get(_team_rebalance_changes_key(job_id)) is not None
+
+
+@celery_app.task(bind=True)
+def rebalance_team_task(self, team_id, job_id):
+    """
+    Debounced slot re-plan for a team whose membership changed
+    Changes committed while it runs were handed this job's id before it started, so
+    it re-plans again in full until no unconsumed change is left
+    """
+    from django.core.cache import cache
+    from .models import Team
+    
+    # Changes from here on get a new job
+    job_key = _team_rebalance_job_key(team_id)
+    if cache.get(job_key) == job_id:
+        cache.delete(job_key)
+    changes = cache.get(_team_rebalance_changes_key(job_id), 0)
+    first_change = cache.get(_team_rebalance_first_change_key(job_id)) or {}
+    
+    try:
+        team = Team.objects.get(id=team_id)
+    except Team.DoesNotExist:
+        logger.warning(f"Team {team_id} not found, skipping slot rebalance")
+        return {"team_id": team_id, "success": False, "message": "Team not found"}
+    
+    if not team.is_active:
+        logger.info(f"Team {team_id} is inactive, skipping slot rebalance")
+        _consume_team_rebalance_changes(job_id, changes)
+        return {"team_id": team_id, "success": True, "mode": "skipped", "changes": changes}
+    
+    added_user = None
+    removed_user_id = None
+    if changes == 1:
+        if first_change.get('added_user_id'):
+            added_user = User.objects.filter(id=first_change['added_user_id']).first()
+        removed_user_id = first_change.get('removed_user_id')
+    
+    if added_user is not None:
+        mode = "member_added"
+    elif removed_user_id is not None:
+        mode = "member_removed"
+    else:
+        mode = "full"
+    
+    total_changes = changes
+    while True:
+        logger.info(f"Rebalancing slots for team {team_id} after {changes} membership changes ({mode})")
+        success = team.reassign_slots_from_next_day(added_user=added_user, removed_user_id=removed_user_id)
+        changes = _consume_team_rebalance_changes(job_id, changes)
+        if not changes:
+            break
+        total_changes += changes
+        added_user, removed_user_id, mode = None, None, "full"
+    
+    return {"team_id": team_id, "success": success, "mode": mode, "changes": total_changes}
+
+
+def _consume_team_rebalance_changes(job_id, changes):
+    """Subtract the changes a run handled from the counter and return how many were added meanwhile"""
+    from django.core.cache import cache
+    
+    try:
+        remaining = cache.incr(_team_rebalance_changes_key(job_id), -changes)
+    except ValueError:
+        remaining = 0  # Expired
+    # A first change recorded meanwhile is stale once the next pass re-plans in full
+    cache.delete(_team_rebalance_first_change_key(job_id))
+    return remaining
+
+
 @celery_app.task(bind=True)
 def revalidate_slot_assignments_task(self, team_id=None, days_back=1):
     """
@@ -132,11 +404,16 @@ def revalidate_slot_assignments_task(self, team_id=None, days_back=1):
 def cleanup_old_slots_task(self, days_to_keep=30):
     """
     Task to cleanup old slots that are no longer needed
+    The slots are deleted in bulk, so the cached schedule weeks they fall in are dropped
+    once per team; rosters, dashboard statistics and live clients only cover current slots
     """
     logger.info(f"Starting cleanup of slots older than {days_to_keep} days")
     
     try:
+        from django.db import transaction
+        from django.db.models import Max, Min
         from .models import Slot
+        from .schedule_cache import invalidate_schedule_range
         
         cutoff_date = timezone.now() - timedelta(days=days_to_keep)
         
@@ -146,8 +423,16 @@ def cleanup_old_slots_task(self, days_to_keep=30):
             assigned_member__isnull=True  # Only cleanup unassigned old slots
         )
         
-        count = old_slots.count()
-        old_slots.delete()
+        with transaction.atomic():
+            team_ranges = list(old_slots.values('team_id').annotate(
+                first_start=Min('start_time'), last_start=Max('start_time')
+            ).order_by())
+            count = old_slots.count()
+            old_slots.delete()
+            for team_range in team_ranges:
+                invalidate_schedule_range(
+                    team_range['team_id'], team_range['first_start'].date(), team_range['last_start'].date()
+                )
         
         logger.info(f"Cleaned up {count} old unassigned slots")
         
@@ -166,112 +451,95 @@ def check_empty_slots_notification_function():
     """
     Standalone function to check for empty slots within next 72 hours and send notifications
     This can be called directly without Celery
+    
+    Only slots without an open alert are considered, found with a single anti-join, so a
+    run where nothing changed costs one query. Their alerts are inserted with one
+    bulk_create; the partial unique constraint on open alerts per slot makes an overlapping
+    run fail instead of duplicating them
     """
     logger.info("Starting empty slots check function")
     
     try:
-        from datetime import datetime, timedelta
+        from datetime import timedelta
+        from django.db import IntegrityError, transaction
+        from django.db.models import Exists, OuterRef
         from django.utils import timezone
-        from .models import Slot, Team, Alert
-        from django.contrib.auth import get_user_model
-        
-        User = get_user_model()
+        from .models import Slot, Alert
+        from .notification_store import get_notification_store
         
         # Calculate time window (next 72 hours)
         now = timezone.now()
         end_time = now + timedelta(hours=72)
         
-        # Find empty slots within the next 72 hours
-        empty_slots = Slot.objects.filter(
+        # Empty slots within the next 72 hours that have no open alert yet
+        open_alerts = Alert.objects.filter(slot=OuterRef('pk'), resolved=False)
+        new_empty_slots = list(Slot.objects.filter(
             start_time__gte=now,
             start_time__lte=end_time,
             assigned_member__isnull=True
-        ).select_related('team').order_by('start_time')
+        ).filter(~Exists(open_alerts)).select_related('team').order_by('start_time'))
         
-        if empty_slots.exists():
-            # Get all managers to notify
-            managers = User.objects.filter(is_manager=True, is_active=True)
-            
-            # Group slots by team and time
-            notifications = []
-            for slot in empty_slots:
-                slot_data = {
-                    'slot_id': slot.id,
-                    'team_id': slot.team.id,
-                    'team_name': slot.team.name,
-                    'start_time': slot.start_time.isoformat(),
-                    'end_time': slot.end_time.isoformat(),
-                    'hours_from_now': round((slot.start_time - now).total_seconds() / 3600, 1)
-                }
-                notifications.append(slot_data)
-            
-            # Update the notification status in cache/database
-            # For now, we'll store in cache - later this can be WebSocket
-            from django.core.cache import cache
-            
-            notification_key = "empty_slots_notifications"
-            existing_notifications = cache.get(notification_key, [])
-            
-            # Add new notifications (avoid duplicates)
-            for notification in notifications:
-                if not any(n['slot_id'] == notification['slot_id'] for n in existing_notifications):
-                    existing_notifications.append({
-                        **notification,
-                        'notification_time': now.isoformat(),
-                        'type': 'empty_slot'
-                    })
-            
-            # Store in cache for 24 hours
-            cache.set(notification_key, existing_notifications, 86400)
-            
-            # Create Alert records for each empty slot (avoid duplicates)
-            alerts_created = 0
-            new_alerts = []
-            for slot in empty_slots:
-                # Check if alert already exists for this slot (not resolved)
-                existing_alert = Alert.objects.filter(
-                    slot=slot,
-                    resolved=False
-                ).first()
-                
-                if not existing_alert:
-                    message = f"Empty slot detected: {slot.team.name} on {slot.start_time.strftime('%Y-%m-%d %H:%M')} - {slot.end_time.strftime('%Y-%m-%d %H:%M')} ({round((slot.start_time - now).total_seconds() / 3600, 1)} hours from now)"
-                    
-                    alert = Alert.objects.create(
-                        team=slot.team,
-                        slot=slot,
-                        message=message
-                    )
-                    alerts_created += 1
-                    new_alerts.append(alert)
-            
-            logger.info(f"Found {empty_slots.count()} empty slots in next 72 hours, created {alerts_created} new alerts")
-            
-            # Send WebSocket notifications for new alerts
-            if new_alerts:
-                alert_ids = [alert.id for alert in new_alerts]
-                logger.info(f"Triggering WebSocket notification task for {len(alert_ids)} alerts: {alert_ids}")
-                send_websocket_notifications.delay(alert_ids)
-            else:
-                logger.info("No new alerts created, skipping WebSocket notifications")
-            
+        if not new_empty_slots:
+            logger.info("No new empty slots found in next 72 hours")
             return {
                 "success": True,
-                "empty_slots_count": empty_slots.count(),
-                "notifications_created": len(notifications),
-                "alerts_created": alerts_created,
-                "time_window": {
-                    "from": now.isoformat(),
-                    "to": end_time.isoformat()
-                }
+                "new_empty_slots_count": 0,
+                "message": "No new empty slots found"
             }
-        else:
-            logger.info("No empty slots found in next 72 hours")
+        
+        alerts = []
+        notifications = []
+        for slot in new_empty_slots:
+            hours_from_now = round((slot.start_time - now).total_seconds() / 3600, 1)
+            alerts.append(Alert(
+                team=slot.team,
+                slot=slot,
+                message=f"Empty slot detected: {slot.team.name} on {slot.start_time.strftime('%Y-%m-%d %H:%M')} - {slot.end_time.strftime('%Y-%m-%d %H:%M')} ({hours_from_now} hours from now)"
+            ))
+            notifications.append({
+                'slot_id': slot.id,
+                'team_id': slot.team.id,
+                'team_name': slot.team.name,
+                'start_time': slot.start_time.isoformat(),
+                'end_time': slot.end_time.isoformat(),
+                'hours_from_now': hours_from_now,
+                'notification_time': now.isoformat(),
+                'type': 'empty_slot'
+            })
+        
+        try:
+            with transaction.atomic():
+                new_alerts = Alert.objects.bulk_create(alerts)
+        except IntegrityError:
+            # An overlapping run alerted some of these slots first; the next run picks up the rest
+            logger.info("Open alerts were created concurrently by another run, skipping this one")
             return {
                 "success": True,
-                "empty_slots_count": 0,
-                "message": "No empty slots found"
+                "new_empty_slots_count": len(new_empty_slots),
+                "alerts_created": 0,
+                "message": "Alerts were created concurrently"
             }
+        
+        # Keyed by slot_id, so slots that already have a notification keep it; entries expire after 24 hours
+        get_notification_store().add(notifications)
+        
+        logger.info(f"Found {len(new_empty_slots)} new empty slots in next 72 hours, created {len(new_alerts)} new alerts")
+        
+        # Send WebSocket notifications for new alerts, built here so the task does not reload them
+        payloads = [_alert_payload(alert, alert.slot, alert.team, now) for alert in new_alerts]
+        logger.info(f"Triggering WebSocket notification task for {len(payloads)} alerts")
+        send_websocket_notifications.delay(payloads=payloads)
+        
+        return {
+            "success": True,
+            "new_empty_slots_count": len(new_empty_slots),
+            "notifications_created": len(notifications),
+            "alerts_created": len(new_alerts),
+            "time_window": {
+                "from": now.isoformat(),
+                "to": end_time.isoformat()
+            }
+        }
             
     except Exception as exc:
         logger.error(f"Empty slots check function failed: {str(exc)}", exc_info=True)
@@ -286,63 +554,64 @@ def check_empty_slots_notification_task(self):
     return check_empty_slots_notification_function()
 
 
+def _alert_payload(alert, slot, team, now):
+    """
+    WebSocket payload of an empty slot alert
+    """
+    return {
+        'slot_id': slot.id,
+        'team_id': team.id,
+        'team_name': team.name,
+        'start_time': slot.start_time.isoformat(),
+        'end_time': slot.end_time.isoformat(),
+        'notification_time': alert.created_at.isoformat(),
+        'type': 'empty_slot_alert',
+        'alert_id': alert.id,
+        'message': alert.message,
+        'hours_from_now': round((slot.start_time - now).total_seconds() / 3600, 1),
+        'is_empty': True,
+        'assigned_user': None
+    }
+
+
 @celery_app.task
-def send_websocket_notifications(alert_ids):
+def send_websocket_notifications(alert_ids=None, payloads=None):
     """
     Send WebSocket notifications for new alerts
+    
+    All alerts go out in one 'send_alert_batch' group message. Callers that already built
+    the payloads pass them as payloads and no alerts are loaded; otherwise the alerts of
+    alert_ids are loaded with a single query
     """
     try:
         from channels.layers import get_channel_layer
         from asgiref.sync import async_to_sync
         from .models import Alert
         
-        logger.info(f"WebSocket notification task started with alert_ids: {alert_ids}")
+        if payloads is None:
+            logger.info(f"WebSocket notification task started with alert_ids: {alert_ids}")
+            now = timezone.now()
+            payloads = [
+                _alert_payload(alert, alert.slot, alert.team, now)
+                for alert in Alert.objects.filter(id__in=alert_ids or []).select_related('slot', 'team')
+            ]
         
-        # Get the alerts
-        alerts = Alert.objects.filter(id__in=alert_ids).select_related('slot', 'team')
-        
-        logger.info(f"Found {alerts.count()} alerts to send WebSocket notifications for")
-        
-        if not alerts.exists():
-            logger.warning("No alerts found for the provided IDs")
+        if not payloads:
+            logger.warning("No alerts to send WebSocket notifications for")
             return
         
         channel_layer = get_channel_layer()
-        logger.info(f"Channel layer: {channel_layer}")
         
         if channel_layer:
-            notifications_sent = 0
-            for alert in alerts:
-                hours_from_now = round((alert.slot.start_time - timezone.now()).total_seconds() / 3600, 1)
-                
-                notification_data = {
-                    'slot_id': alert.slot.id,
-                    'team_id': alert.team.id,
-                    'team_name': alert.team.name,
-                    'start_time': alert.slot.start_time.isoformat(),
-                    'end_time': alert.slot.end_time.isoformat(),
-                    'notification_time': alert.created_at.isoformat(),
-                    'type': 'empty_slot_alert',
-                    'alert_id': alert.id,
-                    'message': alert.message,
-                    'hours_from_now': hours_from_now,
-                    'is_empty': True,
-                    'assigned_user': None
+            async_to_sync(channel_layer.group_send)(
+                'admin_notifications',
+                {
+                    'type': 'send_alert_batch',
+                    'alerts': payloads,
+                    'timestamp': timezone.now().isoformat()
                 }
-                
-                logger.info(f"Sending WebSocket notification for alert {alert.id}: {notification_data['team_name']} - {notification_data['message']}")
-                
-                async_to_sync(channel_layer.group_send)(
-                    'admin_notifications',
-                    {
-                        'type': 'send_alert',
-                        'data': notification_data,
-                        'timestamp': alert.created_at.isoformat()
-                    }
-                )
-                notifications_sent += 1
-            
-            logger.info(f"Sent {notifications_sent} WebSocket notifications for {len(alerts)} new alerts")
+            )
+            logger.info(f"Sent {len(payloads)} alerts in one WebSocket notification")
         else:
             logger.error("Channel layer is None - WebSocket notifications cannot be sent")
         
@@ -0,0 +1,159 @@
+"""
+Benchmarks for SlotScheduler over synthetic organisations
+
+Not part of the regular test run (the file name does not match test_*.py);
+run it explicitly:
+
+    python -m pytest hirethon_template/managers/tests/bench_slot_service.py -s
+
+Environment variables:
+- SCHEDULER_BENCH_SCALES: comma separated TEAMSxMEMBERSxDAYS triples,
+  e.g. "10x5x7,100x20x30,1000x80x90" (default "10x5x7,10x20x30")
+- SCHEDULER_BENCH_UPDATE=1: write the results as the new baseline
+- SCHEDULER_BENCH_OUTPUT: where to write this run's results
+  (default benchmarks/scheduler_latest.json)
+
+Each operation records wall time, query count and peak traced memory. Query
+counts are deterministic, so a scale present in the baseline fails if any
+operation issues more queries than it did there; timings are only reported.
+"""
+import json
+import os
+import time as clock
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from hirethon_template.managers.models import Team, TeamMember
+from hirethon_template.managers.slot_service import SlotScheduler
+from .factories import TeamFactory, UserFactory
+
+User = get_user_model()
+
+BENCHMARK_DIR = Path(__file__).parent / "benchmarks"
+BASELINE_PATH = BENCHMARK_DIR / "scheduler_baseline.json"
+DEFAULT_SCALES = "10x5x7,10x20x30"
+
+
+def _parse_scales(value):
+    return [tuple(int(part) for part in scale.lower().split("x")) for scale in value.split(",") if scale.strip()]
+
+
+SCALES = _parse_scales(os.environ.get("SCHEDULER_BENCH_SCALES", DEFAULT_SCALES))
+
+
+def _load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text()).get("scales", {})
+    return {}
+
+
+def _build_organisation(team_count, member_count):
+    """
+    Active teams with members, bulk inserted from factory-built instances so
+    membership signals do not schedule anything while the data is set up
+    """
+    teams = Team.objects.bulk_create(
+        [TeamFactory.build(name=f"Bench team {index}", is_active=True) for index in range(team_count)]
+    )
+    users = User.objects.bulk_create(
+        [UserFactory.build(email=f"bench{index}@example.com") for index in range(team_count * member_count)]
+    )
+    TeamMember.objects.bulk_create([
+        TeamMember(team=team, user=users[team_index * member_count + index])
+        for team_index, team in enumerate(teams)
+        for index in range(member_count)
+    ])
+    return teams
+
+
+def _measure(operation):
+    """
+    Run operation twice: once for wall time and queries (rolled back), then
+    again under tracemalloc for peak memory, keeping that run's writes
+    """
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            started = clock.perf_counter()
+            operation()
+            wall_seconds = clock.perf_counter() - started
+        transaction.set_rollback(True)
+
+    tracemalloc.start()
+    try:
+        operation()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_seconds": round(wall_seconds, 4),
+        "queries": len(queries.captured_queries),
+        "peak_memory_kb": round(peak_bytes / 1024, 1),
+    }
+
+
+@pytest.fixture(scope="module")
+def benchmark_report():
+    """Collects results across scales and writes them once the module finishes"""
+    report = {}
+    yield report
+    if not report:
+        return
+
+    if os.environ.get("SCHEDULER_BENCH_UPDATE") == "1":
+        output_path = BASELINE_PATH
+    else:
+        output_path = Path(os.environ.get("SCHEDULER_BENCH_OUTPUT", BENCHMARK_DIR / "scheduler_latest.json"))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({
+        "generated_at": timezone.now().isoformat(),
+        "scales": report,
+    }, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("team_count,member_count,days", SCALES, ids=[f"{t}x{m}x{d}" for t, m, d in SCALES])
+def test_scheduler_benchmark(team_count, member_count, days, benchmark_report):
+    scale = f"{team_count}x{member_count}x{days}"
+    teams = _build_organisation(team_count, member_count)
+    start_date = timezone.now().date() + timedelta(days=1)
+    end_date = start_date + timedelta(days=days - 1)
+    scheduler = SlotScheduler()
+
+    # A newcomer in the first team for the single-team recalculation
+    newcomer = User.objects.create(email="bench-newcomer@example.com", name="Bench newcomer")
+    results = {
+        "create_slots_for_period": _measure(lambda: scheduler.create_slots_for_period(start_date, end_date)),
+        "revalidate_assignments": _measure(lambda: scheduler.revalidate_assignments(start_date=start_date)),
+    }
+    TeamMember.objects.bulk_create([TeamMember(team=teams[0], user=newcomer)])
+    results["recalculate_slots_for_new_member"] = _measure(
+        lambda: scheduler.recalculate_slots_for_new_member(teams[0], start_date, end_date)
+    )
+    benchmark_report[scale] = results
+
+    baseline = _load_baseline().get(scale, {})
+    for operation, measured in results.items():
+        expected = baseline.get(operation)
+        comparison = ""
+        if expected and expected["wall_seconds"]:
+            comparison = f" ({measured['wall_seconds'] / expected['wall_seconds']:.2f}x baseline time)"
+        print(
+            f"{scale} {operation}: {measured['wall_seconds']}s, {measured['queries']} queries, "
+            f"{measured['peak_memory_kb']} KiB peak{comparison}"
+        )
+
+    if os.environ.get("SCHEDULER_BENCH_UPDATE") != "1":
+        regressions = {
+            operation: (baseline[operation]["queries"], measured["queries"])
+            for operation, measured in results.items()
+            if operation in baseline and measured["queries"] > baseline[operation]["queries"]
+        }
+        assert not regressions, f"Query count above baseline (baseline, measured): {regressions}"
@@ -0,0 +1,25 @@
+"""
+Redis channel layer backed by fakeredis, standing in for the production layer in tests
+
+Layers built with the same server name share one in-memory Redis server, the way
+processes share the real one: a layer standing in for a Celery worker reaches the
+consumers subscribed through another layer standing in for an ASGI worker.
+"""
+import fakeredis
+from channels_redis.core import RedisChannelLayer
+from fakeredis.aioredis import FakeConnection
+
+_servers = {}
+
+
+def fake_redis_server(name="default"):
+    """The in-memory Redis server shared by every layer built with name"""
+    return _servers.setdefault(name, fakeredis.FakeServer())
+
+
+class FakeRedisChannelLayer(RedisChannelLayer):
+    """RedisChannelLayer whose connections go to a shared fakeredis server"""
+
+    def __init__(self, server="default", **kwargs):
+        kwargs["hosts"] = [{"connection_class": FakeConnection, "server": fake_redis_server(server)}]
+        super().__init__(**kwargs)
@@ -0,0 +1,55 @@
+"""
+End to end tests of WebSocket fan-out through the Redis channel layer stand-in
+"""
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+
+from hirethon_template.managers.consumers import NotificationConsumer
+from hirethon_template.managers.tasks import send_websocket_notifications
+from hirethon_template.users.tests.factories import UserFactory
+
+
+@pytest.fixture
+def redis_channel_layers(settings, request):
+    """Point the configured channel layer at a fakeredis server private to the test"""
+    server = request.node.name
+    settings.CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "hirethon_template.managers.tests.channel_layers.FakeRedisChannelLayer",
+            "CONFIG": {"server": server, "group_expiry": 60},
+        }
+    }
+    return server
+
+
+@pytest.mark.django_db
+class TestRedisChannelLayerFanOut:
+    """Test group messages cross process boundaries through Redis"""
+
+    def test_worker_reaches_consumers_of_other_processes(self, redis_channel_layers):
+        """A worker-side layer sends one batch that every connected manager receives"""
+        payloads = [{'alert_id': alert_id, 'slot_id': alert_id} for alert_id in range(3)]
+
+        async def scenario():
+            communicators = []
+            for _ in range(2):
+                communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), "/ws/notifications/")
+                communicator.scope['user'] = UserFactory.build(is_manager=True, is_active=True)
+                connected, _ = await communicator.connect()
+                assert connected
+                communicators.append(communicator)
+
+            # The task builds its own layer, with its own connections, as in a Celery worker
+            await sync_to_async(send_websocket_notifications, thread_sensitive=False)(payloads=payloads)
+
+            frames = [await communicator.receive_json_from(timeout=2) for communicator in communicators]
+            for communicator in communicators:
+                assert await communicator.receive_nothing()
+                await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(scenario)()
+
+        assert [frame['type'] for frame in frames] == ['empty_slot_alert_batch'] * 2
+        assert all(frame['alerts'] == payloads for frame in frames)
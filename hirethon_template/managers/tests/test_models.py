@@ -94,6 +94,37 @@ class TestTeamModel:
         
         assert team.get_active_member_count() == 2
     
+    def test_active_member_count_is_maintained(self, db):
+        """Test the stored active member counter follows membership changes"""
+        team = TeamFactory()
+        members = [TeamMemberFactory(team=team) for _ in range(3)]
+        TeamMemberFactory(team=team, is_active=False)
+        
+        membership = TeamMember.objects.get(pk=members[0].pk)
+        membership.is_active = False
+        membership.save()
+        members[1].delete()
+        TeamMember.objects.get(pk=members[0].pk).save()
+        
+        team.refresh_from_db()
+        assert team.active_member_count == 1 == team.get_active_member_count()
+        
+        # Bulk writes send no signals; recounting repairs the counter
+        TeamMember.objects.filter(team=team).update(is_active=True)
+        team.recount_active_members()
+        team.refresh_from_db()
+        assert team.active_member_count == 3
+    
+    def test_stale_team_instance_reads_the_stored_count(self, db):
+        """Test a counter change on a stale instance picks up concurrent changes"""
+        team = TeamFactory()
+        stale_team = Team.objects.get(pk=team.pk)
+        TeamMemberFactory(team=team)
+        TeamMemberFactory(team=team)
+        
+        stale_team.adjust_active_member_count(1)
+        assert stale_team.active_member_count == 3
+    
     def test_update_active_status_becomes_active(self, db):
         """Test team becomes active when it has enough members"""
         team = TeamFactory(is_active=False)
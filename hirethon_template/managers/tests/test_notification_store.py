@@ -0,0 +1,80 @@
+"""
+Unit tests for the keyed empty slot notification store
+"""
+from datetime import timedelta
+
+import fakeredis
+import pytest
+from django.utils import timezone
+
+from hirethon_template.managers.notification_store import (
+    NOTIFICATION_TTL, LocMemNotificationStore, RedisNotificationStore
+)
+
+
+def _notification(slot_id, minutes_ago=0):
+    return {
+        'slot_id': slot_id,
+        'team_name': 'Team',
+        'notification_time': (timezone.now() - timedelta(minutes=minutes_ago)).isoformat(),
+        'type': 'empty_slot',
+    }
+
+
+@pytest.fixture(params=['locmem', 'redis'])
+def store(request, notification_store):
+    """Each notification store backend, the Redis one on a fakeredis server"""
+    if request.param == 'locmem':
+        return notification_store
+    return RedisNotificationStore(redis=fakeredis.FakeRedis())
+
+
+class TestNotificationStores:
+    """Test the notification store backends against the same interface"""
+
+    def test_add_keeps_the_first_notification_per_slot(self, store):
+        assert store.add([_notification(1, minutes_ago=30), _notification(2)]) == 2
+        assert store.add([_notification(1), _notification(3)]) == 1
+
+        notifications = store.range()
+
+        assert [n['slot_id'] for n in notifications] == [1, 2, 3]
+        assert notifications[0]['notification_time'] < notifications[1]['notification_time']
+
+    def test_remove_and_count(self, store):
+        store.add([_notification(slot_id) for slot_id in (1, 2, 3)])
+
+        assert store.remove([2, '3', 4]) == 2
+        assert store.count() == 1
+
+    def test_range_by_time(self, store):
+        store.add([_notification(1, minutes_ago=90), _notification(2, minutes_ago=10)])
+
+        notifications = store.range(since=timezone.now() - timedelta(hours=1))
+
+        assert [n['slot_id'] for n in notifications] == [2]
+
+    def test_entries_expire(self, store):
+        expired_minutes = int(NOTIFICATION_TTL.total_seconds() // 60) + 1
+        store.add([_notification(1, minutes_ago=expired_minutes), _notification(2)])
+
+        assert [n['slot_id'] for n in store.range()] == [2]
+        assert store.count() == 1
+
+    def test_expired_entries_are_purged_from_both_keys(self):
+        store = RedisNotificationStore(redis=fakeredis.FakeRedis())
+        expired_minutes = int(NOTIFICATION_TTL.total_seconds() // 60) + 1
+        store.add([_notification(1, minutes_ago=expired_minutes), _notification(2)])
+
+        assert store.count() == 1
+        assert store.redis.hkeys(store.ENTRIES_KEY) == [b'2']
+        assert store.redis.zrange(store.TIMES_KEY, 0, -1) == [b'2']
+
+
+class TestLocMemNotificationStore:
+    """Test the process-local notification store"""
+
+    def test_instances_share_entries(self, notification_store):
+        notification_store.add([_notification(1)])
+
+        assert LocMemNotificationStore().count() == 1
@@ -0,0 +1,177 @@
+"""
+Query budget tests for every managers and members API endpoint
+"""
+import logging
+import pytest
+from datetime import datetime, timedelta, time
+from unittest.mock import patch, MagicMock
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from config import celery_app
+from hirethon_template.managers.models import Slot, TeamMember, SwapRequest, Alert, LeaveRequest
+from hirethon_template.managers.urls import app_name as managers_app, urlpatterns as managers_urlpatterns
+from hirethon_template.members.urls import app_name as members_app, urlpatterns as members_urlpatterns
+from hirethon_template.users.tests.factories import UserFactory
+from .factories import TeamFactory
+
+
+@pytest.fixture
+def organisation(db):
+    """
+    Two active teams with four members each, a day of assigned slots, one open
+    slot with an alert, a pending leave request and a pending swap request;
+    memberships are bulk created so no signal reschedules the teams (the active
+    member counters are recounted instead)
+    """
+    manager = UserFactory(is_manager=True, is_staff=True, is_superuser=True)
+    tomorrow = timezone.now().date() + timedelta(days=1)
+    teams = [TeamFactory(is_active=True) for _ in range(2)]
+    members = {team.id: [UserFactory() for _ in range(4)] for team in teams}
+    TeamMember.objects.bulk_create([
+        TeamMember(team=team, user=user) for team in teams for user in members[team.id]
+    ])
+    for team in teams:
+        team.recount_active_members()
+
+    slots = []
+    for team in teams:
+        for hour in range(8):
+            start_time = timezone.make_aware(datetime.combine(tomorrow, time(hour=hour * 3)))
+            user = members[team.id][hour % 4]
+            slots.append(Slot(team=team, start_time=start_time, end_time=start_time + team.slot_duration,
+                              assigned_member=user, is_covered=True))
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    open_slot = Slot(team=teams[0], start_time=now + timedelta(days=2), end_time=now + timedelta(days=2, hours=1))
+    Slot.objects.bulk_create(slots + [open_slot])
+
+    team = teams[0]
+    member, other = members[team.id][0], members[team.id][1]
+    from_slot = Slot.objects.filter(team=team, assigned_member=member).first()
+    to_slot = Slot.objects.filter(team=team, assigned_member=other).first()
+    return {
+        "manager": manager,
+        "member": member,
+        "other": other,
+        "candidate": UserFactory(),
+        "team": team,
+        "day": tomorrow,
+        "from_slot": from_slot,
+        "to_slot": to_slot,
+        "open_slot": open_slot,
+        "alert": Alert.objects.create(team=team, slot=open_slot, message="Slot has no assignee"),
+        "leave_request": LeaveRequest.objects.create(user=member, team=team, date=tomorrow + timedelta(days=3)),
+        "swap_request": SwapRequest.objects.create(from_slot=from_slot, to_slot=to_slot),
+    }
+
+
+# URL name -> (user key, method, kwargs, data); kwargs and data are built from the organisation
+ENDPOINTS = {
+    "managers:create-user": ("manager", "post", None, lambda o: {"name": "Budget User", "email": "budget@example.com"}),
+    "managers:create-team": ("manager", "post", None, lambda o: {"name": "Budget team", "slot_duration": 3600}),
+    "managers:teams-list": ("manager", "get", None, None),
+    "managers:users-list": ("manager", "get", None, None),
+    "managers:create-team-member": ("manager", "post", None,
+                                    lambda o: {"user": o["candidate"].id, "team": o["team"].id}),
+    "managers:teams-management": ("manager", "get", None, None),
+    "managers:toggle-team-status": ("manager", "patch", lambda o: {"team_id": o["team"].id}, None),
+    "managers:add-member-to-team": ("manager", "post", lambda o: {"team_id": o["team"].id},
+                                    lambda o: {"user": o["candidate"].id}),
+    "managers:users-management": ("manager", "get", None, None),
+    "managers:toggle-user-status": ("manager", "patch", lambda o: {"user_id": o["candidate"].id}, None),
+    "managers:create-slots": ("manager", "post", None, lambda o: {}),
+    "managers:revalidate-slots": ("manager", "post", None, lambda o: {}),
+    "managers:rebalance-job-status": ("manager", "get", lambda o: {"job_id": "budget-job"}, None),
+    "managers:get-notifications": ("manager", "get", None, None),
+    "managers:mark-notification-read": ("manager", "post", None, lambda o: {"alert_id": o["alert"].id}),
+    "managers:get-leave-requests": ("manager", "get", None, None),
+    "managers:approve-reject-leave-request": ("manager", "post",
+                                             lambda o: {"leave_request_id": o["leave_request"].id},
+                                             lambda o: {"action": "approve"}),
+    "managers:get-available-users-for-slot": ("manager", "get", lambda o: {"slot_id": o["open_slot"].id}, None),
+    "managers:assign-user-to-slot": ("manager", "post", lambda o: {"slot_id": o["open_slot"].id},
+                                     lambda o: {"user_id": o["other"].id}),
+    "managers:get-team-members-with-schedule": ("manager", "get", lambda o: {"team_id": o["team"].id}, None),
+    "managers:get-dashboard-stats": ("manager", "get", None, None),
+    "managers:get-admin-swap-requests": ("manager", "get", None, None),
+    "managers:admin-reject-swap-request": ("manager", "post",
+                                           lambda o: {"swap_request_id": o["swap_request"].id}, lambda o: {}),
+    "members:user-dashboard": ("member", "get", None, None),
+    "members:user-schedule": ("member", "get", None, None),
+    "members:day-slots": ("member", "get",
+                          lambda o: {"year": o["day"].year, "month": o["day"].month, "day": o["day"].day}, None),
+    "members:request-leave": ("member", "post", None,
+                              lambda o: {"date": (o["day"] + timedelta(days=4)).isoformat(), "reason": "Budget"}),
+    "members:request-swap": ("member", "post", None,
+                             lambda o: {"from_slot_id": o["from_slot"].id, "to_slot_id": o["to_slot"].id}),
+    "members:swap-requests": ("member", "get", None, None),
+    "members:respond-swap-request": ("other", "post", lambda o: {"swap_request_id": o["swap_request"].id},
+                                     lambda o: {"action": "approve"}),
+    "members:user-teams-oncall": ("member", "get", None, None),
+    "members:all-teams-oncall": ("member", "get", None, None),
+}
+
+
+def _url_names():
+    return {f"{managers_app}:{pattern.name}" for pattern in managers_urlpatterns} | {
+        f"{members_app}:{pattern.name}" for pattern in members_urlpatterns
+    }
+
+
+def test_every_endpoint_has_a_budget(settings):
+    """New endpoints must be added to QUERY_BUDGETS and to ENDPOINTS above"""
+    assert set(ENDPOINTS) == _url_names()
+    assert _url_names() <= set(settings.QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("url_name", sorted(ENDPOINTS))
+def test_endpoint_within_query_budget(url_name, organisation, assert_query_budget):
+    user_key, method, build_kwargs, build_data = ENDPOINTS[url_name]
+    client = APIClient()
+    client.force_authenticate(user=organisation[user_key])
+
+    with patch("celery.app.task.Task.apply_async", return_value=MagicMock(id="budget-task")), \
+            patch.object(celery_app, "AsyncResult") as mock_result:
+        mock_result.return_value.state = "PENDING"
+        mock_result.return_value.successful.return_value = False
+        mock_result.return_value.failed.return_value = False
+        assert_query_budget(
+            client, url_name, method=method,
+            kwargs=build_kwargs(organisation) if build_kwargs else None,
+            data=build_data(organisation) if build_data else None
+        )
+
+
+@pytest.mark.django_db
+class TestQueryBudgetMiddleware:
+    """Test the per-request query instrumentation"""
+
+    def test_headers_report_queries_and_db_time(self, settings, organisation):
+        settings.QUERY_BUDGET_HEADERS = True
+        client = APIClient()
+        client.force_authenticate(user=organisation["manager"])
+
+        response = client.get(reverse("managers:teams-list"))
+
+        assert int(response["X-DB-Query-Count"]) > 0
+        assert float(response["X-DB-Time-Ms"]) >= 0
+
+    def test_headers_hidden_when_disabled(self, settings, organisation):
+        settings.QUERY_BUDGET_HEADERS = False
+        client = APIClient()
+        client.force_authenticate(user=organisation["manager"])
+
+        response = client.get(reverse("managers:teams-list"))
+
+        assert "X-DB-Query-Count" not in response
+
+    def test_over_budget_request_is_logged(self, settings, organisation, caplog):
+        settings.QUERY_BUDGETS = {"managers:teams-list": 0}
+        client = APIClient()
+        client.force_authenticate(user=organisation["manager"])
+
+        with caplog.at_level(logging.WARNING, logger="hirethon_template.utils.query_budget"):
+            client.get(reverse("managers:teams-list"))
+
+        assert "Query budget exceeded for managers:teams-list" in caplog.text
@@ -0,0 +1,159 @@
+"""
+Unit tests for the live slot change stream
+"""
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from hirethon_template.managers.consumers import ScheduleConsumer
+from hirethon_template.managers.schedule_stream import team_schedule_group
+from hirethon_template.managers.slot_service import SlotScheduler
+from hirethon_template.managers.tasks import cleanup_old_slots_task
+from hirethon_template.managers.websocket_auth import JWTAuthMiddleware
+from .factories import SlotFactory, TeamFactory, TeamMemberFactory, UserFactory
+
+
+@pytest.fixture
+def channel_layer():
+    channel_layer = get_channel_layer()
+    yield channel_layer
+    async_to_sync(channel_layer.flush)()
+
+
+@pytest.fixture
+def team_channel(channel_layer):
+    """A channel subscribed to the schedule group of a new team"""
+    team = TeamFactory(is_active=True)
+    channel_name = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(team_schedule_group(team.id), channel_name)
+    return team, channel_name
+
+
+@pytest.mark.django_db
+class TestSchedulePublishing:
+    """Test slot writes are published to the team's group once committed"""
+
+    def test_slot_save_publishes_a_delta(self, channel_layer, team_channel, django_capture_on_commit_callbacks):
+        team, channel_name = team_channel
+        member = UserFactory()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            slot = SlotFactory(team=team, start_time=timezone.now() + timedelta(hours=2), assigned_member=member)
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert message['type'] == 'schedule.slots'
+        assert message['slots'] == [{
+            'slot_id': slot.id, 'assignee': member.id, 'version': int(slot.updated_at.timestamp() * 1_000_000)
+        }]
+
+    def test_nothing_is_published_before_commit(self, team_channel, django_capture_on_commit_callbacks):
+        team, _ = team_channel
+
+        with patch('hirethon_template.managers.schedule_stream._group_send') as mock_group_send:
+            with django_capture_on_commit_callbacks() as callbacks:
+                SlotFactory(team=team, start_time=timezone.now() + timedelta(hours=2))
+            mock_group_send.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+
+        mock_group_send.assert_called_once()
+
+    def test_slot_delete_publishes_its_removal(self, channel_layer, team_channel, django_capture_on_commit_callbacks):
+        team, channel_name = team_channel
+        slot = SlotFactory(team=team, start_time=timezone.now() + timedelta(hours=2))
+        slot_id = slot.id
+
+        with django_capture_on_commit_callbacks(execute=True):
+            slot.delete()
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert [(delta['slot_id'], delta.get('deleted')) for delta in message['slots']] == [(slot_id, True)]
+
+    def test_cleanup_of_old_slots_publishes_nothing(self, team_channel, django_capture_on_commit_callbacks):
+        team, _ = team_channel
+        long_ago = timezone.now() - timedelta(days=60)
+        for hour in range(3):
+            SlotFactory(team=team, start_time=long_ago + timedelta(hours=hour),
+                        end_time=long_ago + timedelta(hours=hour + 1))
+
+        with patch('hirethon_template.managers.schedule_stream._group_send') as mock_group_send:
+            with django_capture_on_commit_callbacks(execute=True):
+                result = cleanup_old_slots_task.apply().get()
+
+        assert result['slots_deleted'] == 3
+        mock_group_send.assert_not_called()
+
+    def test_bulk_writes_publish_one_message(self, channel_layer, team_channel, django_capture_on_commit_callbacks):
+        team, channel_name = team_channel
+        member = UserFactory()
+        day = timezone.now().date() + timedelta(days=1)
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        slots = [SlotFactory(team=team, start_time=day_start + timedelta(hours=hour)) for hour in range(3)]
+        for slot in slots:
+            slot.assigned_member = member
+            slot.is_covered = True
+
+        scheduler = SlotScheduler()
+        with django_capture_on_commit_callbacks(execute=True):
+            scheduler._write_assignments(slots)
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert [(delta['slot_id'], delta['assignee']) for delta in message['slots']] == [
+            (slot.id, member.id) for slot in slots
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            scheduler._unassign_team_slots(team, day, day)
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert message['type'] == 'schedule.range'
+        assert (message['start_date'], message['end_date'], message['change']) == (
+            day.isoformat(), day.isoformat(), 'unassigned'
+        )
+
+
+@pytest.mark.django_db
+class TestScheduleConsumer:
+    """Test members are subscribed to their teams' changes"""
+
+    def test_member_receives_changes_of_their_teams(self, channel_layer):
+        member = UserFactory()
+        team = TeamFactory(is_active=True)
+        left_team = TeamFactory(is_active=True)
+        TeamMemberFactory(team=team, user=member)
+        TeamMemberFactory(team=left_team, user=member, is_active=False)
+        application = JWTAuthMiddleware(ScheduleConsumer.as_asgi())
+        delta = {'slot_id': 1, 'assignee': member.id, 'version': 1}
+
+        async def scenario():
+            communicator = WebsocketCommunicator(application, f"/ws/schedule/?token={AccessToken.for_user(member)}")
+            connected, _ = await communicator.connect()
+            assert connected
+            subscribed = await communicator.receive_json_from()
+
+            for team_id in (left_team.id, team.id):
+                await channel_layer.group_send(
+                    team_schedule_group(team_id), {'type': 'schedule.slots', 'team_id': team_id, 'slots': [delta]}
+                )
+            frame = await communicator.receive_json_from()
+            assert await communicator.receive_nothing()
+            await communicator.disconnect()
+            return subscribed, frame
+
+        subscribed, frame = async_to_sync(scenario)()
+
+        assert subscribed == {'type': 'schedule_subscribed', 'team_ids': [team.id]}
+        assert frame == {'type': 'schedule_delta', 'team_id': team.id, 'slots': [delta]}
+
+    def test_anonymous_connection_is_rejected(self):
+        async def connect():
+            communicator = WebsocketCommunicator(ScheduleConsumer.as_asgi(), "/ws/schedule/")
+            connected, _ = await communicator.connect()
+            return connected
+
+        assert async_to_sync(connect)() is False
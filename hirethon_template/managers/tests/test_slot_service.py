@@ -2,12 +2,14 @@
 Unit tests for slot service functionality
 """
 import pytest
-from datetime import timedelta, date, time
+from datetime import datetime, timedelta, date, time
 from unittest.mock import patch, MagicMock
 from django.utils import timezone
 from django.db import transaction
 
 from hirethon_template.managers.models import Team, TeamMember, Slot, Availability, Holiday, LeaveRequest
+from hirethon_template.managers.slot_fairness import FairnessQueue
+from hirethon_template.managers.slot_ledger import ScheduleLedger
 from hirethon_template.managers.slot_service import SlotScheduler
 from hirethon_template.users.models import User
 from .factories import (
@@ -96,15 +98,21 @@ class TestSlotScheduler:
         assert result['success'] is False
         assert 'No active members found' in result['message']
     
-    def test_is_user_available_no_availability_record(self, scheduler, db):
+    def _is_available(self, user, team, check_date):
+        """Answer availability the way the scheduler does, from a preloaded ledger"""
+        ledger = ScheduleLedger.load(team, check_date, check_date, [user.id])
+        return ledger.is_available(user.id, check_date)
+    
+    def test_is_user_available_no_availability_record(self, db):
         """Test user availability when no availability record exists"""
         user = UserFactory()
+        team = TeamFactory()
         check_date = timezone.now().date()
         
         # Should be available by default
-        assert scheduler._is_user_available(user, check_date) is True
+        assert self._is_available(user, team, check_date) is True
     
-    def test_is_user_available_explicit_availability(self, scheduler, db):
+    def test_is_user_available_explicit_availability(self, db):
         """Test user availability with explicit availability record"""
         user = UserFactory()
         team = TeamFactory()
@@ -113,16 +121,16 @@ class TestSlotScheduler:
         # Create availability record marking user as unavailable
         AvailabilityFactory(user=user, date=check_date, is_available=False)
         
-        assert scheduler._is_user_available(user, check_date, team) is False
+        assert self._is_available(user, team, check_date) is False
         
         # Mark as available
         availability = Availability.objects.get(user=user, date=check_date)
         availability.is_available = True
         availability.save()
         
-        assert scheduler._is_user_available(user, check_date, team) is True
+        assert self._is_available(user, team, check_date) is True
     
-    def test_is_user_available_with_approved_leave(self, scheduler, db):
+    def test_is_user_available_with_approved_leave(self, db):
         """Test user availability with approved leave request"""
         user = UserFactory()
         team = TeamFactory()
@@ -136,9 +144,9 @@ class TestSlotScheduler:
             status='approved'
         )
         
-        assert scheduler._is_user_available(user, check_date, team) is False
+        assert self._is_available(user, team, check_date) is False
     
-    def test_is_user_available_with_pending_leave(self, scheduler, db):
+    def test_is_user_available_with_pending_leave(self, db):
         """Test user availability with pending leave request"""
         user = UserFactory()
         team = TeamFactory()
@@ -152,7 +160,7 @@ class TestSlotScheduler:
             status='pending'
         )
         
-        assert scheduler._is_user_available(user, check_date, team) is True
+        assert self._is_available(user, team, check_date) is True
     
     def test_assign_slots_fairly_basic(self, scheduler, active_team_with_members):
         """Test basic fair slot assignment"""
@@ -276,3 +284,266 @@ class TestSlotScheduler:
         
         # Should handle gracefully
         assert 'success' in result
+
+
+@pytest.mark.django_db
+class TestScheduleLedger:
+    """Test the preloaded constraint ledger used by the scheduler"""
+    
+    @pytest.fixture
+    def team_with_members(self, db):
+        """Create a team with three members without triggering slot creation"""
+        team = TeamFactory(is_active=False)
+        users = [UserFactory() for _ in range(3)]
+        for user in users:
+            TeamMember.objects.bulk_create([TeamMember(team=team, user=user, is_active=True)])
+        return team, users
+    
+    def _slot(self, team, day, hour, user=None):
+        start_time = timezone.make_aware(datetime.combine(day, time(hour=hour)))
+        return SlotFactory(team=team, start_time=start_time, assigned_member=user, is_covered=user is not None)
+    
+    def test_ledger_answers_constraints_from_memory(self, team_with_members, django_assert_num_queries):
+        """Test the ledger loads in a fixed number of queries and needs none afterwards"""
+        team, users = team_with_members
+        day = timezone.now().date() + timedelta(days=1)
+        held = self._slot(team, day, 8, users[0])
+        candidate = self._slot(team, day, 10)
+        LeaveRequestFactory(user=users[1], team=team, date=day, status='approved')
+        
+        with django_assert_num_queries(5):
+            ledger = ScheduleLedger.load(team, day, day, [user.id for user in users])
+        
+        with django_assert_num_queries(0):
+            assert ledger.unassigned_slots() == [candidate]
+            assert ledger.daily_hours(users[0].id, day) == 1
+            assert ledger.is_available(users[1].id, day) is False
+            assert ledger.is_available(users[2].id, day) is True
+            assert 'rest' in ledger.violation_for(candidate, users[0].id).lower()
+            assert ledger.violation_for(candidate, users[2].id) is None
+            
+            ledger.release(held, users[0].id)
+            assert ledger.daily_hours(users[0].id, day) == 0
+            assert ledger.violation_for(candidate, users[0].id) is None
+    
+    def test_assign_slots_fairly_query_count_independent_of_members(self, team_with_members, django_assert_num_queries,
+                                                                   django_assert_max_num_queries):
+        """Test constraint checks and write-back do not issue per-slot or per-member queries"""
+        team, users = team_with_members
+        day = timezone.now().date() + timedelta(days=1)
+        slots = [self._slot(team, day, hour) for hour in (0, 12)]
+        
+        scheduler = SlotScheduler()
+        # members + ledger load + one batched write
+        with django_assert_max_num_queries(1 + 5 + 1):
+            result = scheduler._assign_slots_fairly(team, day, day)
+        
+        assert result['success'] is True
+        assert result['assignments_made'] == len(slots)
+        assigned = set(Slot.objects.filter(team=team).values_list('assigned_member_id', flat=True))
+        assert len(assigned) == len(slots)
+        
+        # Clearing the range is a single UPDATE
+        with django_assert_num_queries(1):
+            assert scheduler._unassign_team_slots(team, day, day) == len(slots)
+        assert not Slot.objects.filter(team=team, assigned_member__isnull=False).exists()
+
+
+@pytest.mark.django_db
+class TestSlotMaterialization:
+    """Test bulk creation of missing slots"""
+    
+    def test_materialize_skips_holidays_and_existing_slots(self, django_assert_num_queries):
+        """Test missing slots are diffed and inserted in a fixed number of queries"""
+        team = TeamFactory(slot_duration=timedelta(minutes=30))
+        start_date = timezone.now().date() + timedelta(days=1)
+        end_date = start_date + timedelta(days=2)
+        HolidayFactory(team=team, date=start_date + timedelta(days=1))
+        SlotFactory(team=team, start_time=timezone.make_aware(datetime.combine(start_date, time(hour=9, minute=30))))
+        
+        scheduler = SlotScheduler()
+        with django_assert_num_queries(3):
+            result = scheduler._materialize_team_slots(team, start_date, end_date)
+        
+        assert result == {"slots_created": 48 * 2 - 1, "slots_skipped": 48 + 1}
+        assert Slot.objects.filter(team=team).count() == 48 * 2
+        assert Slot.objects.filter(team=team, start_time__date=start_date + timedelta(days=1)).count() == 0
+        
+        # A second run has nothing left to create
+        result = scheduler._ensure_slots_exist_for_period(team, start_date, end_date)
+        assert result == {"success": True, "slots_created": 0, "slots_skipped": 48 * 3}
+    
+    def test_slots_inserted_concurrently_are_not_counted_as_created(self):
+        """Test slots a concurrent run inserted after the diff count as skipped"""
+        team = TeamFactory(slot_duration=timedelta(hours=6))
+        start_date = timezone.now().date() + timedelta(days=1)
+        concurrent_start = timezone.make_aware(datetime.combine(start_date, time(hour=6)))
+        
+        scheduler = SlotScheduler()
+        original_insert = scheduler._insert_missing_slots
+        
+        def insert_after_concurrent_run(slots):
+            SlotFactory(team=team, start_time=concurrent_start)
+            return original_insert(slots)
+        
+        with patch.object(scheduler, '_insert_missing_slots', side_effect=insert_after_concurrent_run):
+            result = scheduler._materialize_team_slots(team, start_date, start_date)
+        
+        assert result == {"slots_created": 3, "slots_skipped": 1}
+        assert Slot.objects.filter(team=team).count() == 4
+
+
+@pytest.mark.django_db
+class TestFairnessQueue:
+    """Test incremental fairness ranking"""
+    
+    def test_select_ranks_by_score_and_refreshes_one_member(self):
+        """Test the least loaded eligible member is chosen and only they are re-ranked"""
+        team = TeamFactory()
+        members = [TeamMemberFactory(team=team) for _ in range(3)]
+        user_ids = [member.user.id for member in members]
+        day = timezone.now().date() + timedelta(days=1)
+        
+        ledger = ScheduleLedger.load(team, day, day, user_ids)
+        # The first member already worked yesterday
+        yesterday = timezone.make_aware(datetime.combine(day - timedelta(days=1), time(hour=9)))
+        ledger.assign(Slot(id=-1, team=team, start_time=yesterday, end_time=yesterday + timedelta(hours=1)), user_ids[0])
+        
+        fairness = FairnessQueue(ledger, members)
+        fairness.advance_to(day)
+        
+        # Ineligible members are skipped and kept in the queue
+        chosen = fairness.select(lambda user_id: user_id != user_ids[1])
+        assert chosen == members[2].user
+        
+        slot_time = timezone.make_aware(datetime.combine(day, time(hour=9)))
+        ledger.assign(Slot(id=-2, team=team, start_time=slot_time, end_time=slot_time + timedelta(hours=1)), user_ids[2])
+        fairness.refresh(user_ids[2])
+        
+        assert fairness.select(lambda user_id: True) == members[1].user
+        assert fairness.select(lambda user_id: True) == members[2].user
+        assert fairness.select(lambda user_id: True) == members[0].user
+        assert fairness.select(lambda user_id: True) is None
+
+
+@pytest.mark.django_db
+class TestIncrementalRebalance:
+    """Test minimal-change rebalancing when membership changes"""
+    
+    @pytest.fixture
+    def staffed_day(self, db):
+        """
+        A full day of three-hour slots alternating between two members;
+        memberships are bulk created so no signal reschedules the team
+        """
+        team = TeamFactory(is_active=False, slot_duration=timedelta(hours=3), max_hours_per_day=12, min_rest_hours=2)
+        first, second, newcomer = UserFactory(), UserFactory(), UserFactory()
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=first), TeamMember(team=team, user=second)])
+        day = timezone.now().date() + timedelta(days=1)
+        slots = []
+        for index, hour in enumerate(range(0, 24, 3)):
+            user = first if index % 2 == 0 else second
+            start_time = timezone.make_aware(datetime.combine(day, time(hour=hour)))
+            slots.append(SlotFactory(team=team, start_time=start_time, end_time=start_time + timedelta(hours=3),
+                                     assigned_member=user, is_covered=True))
+        return team, day, slots, first, second, newcomer
+    
+    def _owners(self, slots):
+        return {slot.id: slot.assigned_member_id for slot in Slot.objects.filter(id__in=[s.id for s in slots])}
+    
+    def test_new_member_gets_fair_share_with_minimal_moves(self, staffed_day):
+        team, day, slots, first, second, newcomer = staffed_day
+        before = self._owners(slots)
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=newcomer)])
+        
+        result = SlotScheduler().rebalance_for_new_member(team, newcomer, day, day)
+        
+        after = self._owners(slots)
+        changed = [slot_id for slot_id in before if before[slot_id] != after[slot_id]]
+        assert result['success'] is True
+        assert result['slots_changed_hands'] == 2
+        assert result['fair_share'] == 2
+        assert len(changed) == 2
+        assert all(after[slot_id] == newcomer.id for slot_id in changed)
+        assert sorted(list(after.values()).count(user.id) for user in (first, second, newcomer)) == [2, 3, 3]
+    
+    def test_removed_member_only_their_slots_change(self, staffed_day):
+        team, day, slots, first, second, newcomer = staffed_day
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=newcomer)])
+        TeamMember.objects.filter(team=team, user=first).update(is_active=False)
+        before = self._owners(slots)
+        
+        result = SlotScheduler().rebalance_for_removed_member(team, first.id, day, day)
+        
+        after = self._owners(slots)
+        assert result['success'] is True
+        assert result['slots_released'] == 4
+        assert result['slots_changed_hands'] + result['slots_unfilled'] == 4
+        assert first.id not in after.values()
+        for slot_id, owner in before.items():
+            if owner != first.id:
+                assert after[slot_id] == owner
+        assert list(after.values()).count(None) == result['slots_unfilled']
+
+
+@pytest.mark.django_db
+class TestOptimalStrategy:
+    """Test the min-cost flow assignment strategy"""
+    
+    @pytest.fixture
+    def contested_day(self, db):
+        """
+        Two slots where the greedy pick for the first makes the second unfillable:
+        the fairer member can take either slot, the other member is busy elsewhere
+        just after the second one
+        """
+        team = TeamFactory()
+        fair_member = TeamMemberFactory(team=team)
+        busy_member = TeamMemberFactory(team=team)
+        day = timezone.now().date() + timedelta(days=1)
+        
+        def at(hour, minute=0):
+            return timezone.make_aware(datetime.combine(day, time(hour=hour, minute=minute)))
+        
+        SlotFactory(team=TeamFactory(), start_time=at(12, 30), assigned_member=busy_member.user)
+        slots = [SlotFactory(team=team, start_time=at(9)), SlotFactory(team=team, start_time=at(12))]
+        return team, day, slots, fair_member.user, busy_member.user
+    
+    def test_greedy_leaves_slot_empty(self, contested_day):
+        team, day, slots, fair_user, busy_user = contested_day
+        
+        result = SlotScheduler()._assign_slots_fairly(team, day, day)
+        
+        assert result['assignments_made'] == 1
+        assert 'solver' not in result
+    
+    def test_optimal_covers_every_slot(self, contested_day):
+        team, day, slots, fair_user, busy_user = contested_day
+        
+        result = SlotScheduler(strategy='optimal')._assign_slots_fairly(team, day, day)
+        
+        assert result['success'] is True
+        assert result['assignments_made'] == 2
+        assert result['violations'] == []
+        assert result['solver']['status'] == 'optimal'
+        assert result['solver']['iterations'] == 2
+        assert result['solver']['fallback_assignments'] == 0
+        assert {'time_seconds', 'objective_value'} <= set(result['solver'])
+        
+        slots[0].refresh_from_db()
+        slots[1].refresh_from_db()
+        assert slots[0].assigned_member == busy_user
+        assert slots[1].assigned_member == fair_user
+    
+    def test_optimal_falls_back_to_greedy_without_budget(self, contested_day):
+        team, day, slots, fair_user, busy_user = contested_day
+        
+        result = SlotScheduler(strategy='optimal', time_budget=0)._assign_slots_fairly(team, day, day)
+        
+        assert result['solver']['status'] == 'time_limit'
+        assert result['assignments_made'] == 1
+        assert result['solver']['fallback_assignments'] == 1
+    
+    def test_unknown_strategy_rejected(self):
+        with pytest.raises(ValueError):
+            SlotScheduler(strategy='random')
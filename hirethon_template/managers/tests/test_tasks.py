@@ -0,0 +1,360 @@
+"""
+Unit tests for managers Celery tasks
+"""
+import json
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+from asgiref.sync import async_to_sync
+from celery.exceptions import Retry
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from config import celery_app
+from hirethon_template.managers.consumers import NotificationConsumer
+from hirethon_template.managers.models import Alert, Slot, Team, TeamMember
+from hirethon_template.managers.tasks import (
+    create_slots_daily_task, create_team_slots_task, aggregate_slot_creation_results,
+    enqueue_team_rebalance, rebalance_team_task, check_empty_slots_notification_function,
+    send_websocket_notifications
+)
+from .factories import AlertFactory, SlotFactory, TeamFactory, TeamMemberFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestDailySlotCreationFanOut:
+    """Test the per-team fan-out of the daily slot creation run"""
+
+    def test_coordinator_dispatches_one_task_per_active_team(self):
+        """Test the daily task builds a chord with one header task per active team"""
+        active_teams = [TeamFactory(is_active=True) for _ in range(2)]
+        TeamFactory(is_active=False)
+
+        with patch('celery.chord') as mock_chord:
+            result = create_slots_daily_task.apply().get()
+
+        header = list(mock_chord.call_args.args[0])
+        assert result['success'] is True
+        assert result['teams_dispatched'] == 2
+        assert sorted(signature.args[0] for signature in header) == sorted(team.id for team in active_teams)
+        assert all(signature.task == create_team_slots_task.name for signature in header)
+        callback = mock_chord.return_value.call_args.args[0]
+        assert callback.task == aggregate_slot_creation_results.name
+
+    def test_team_task_creates_slots_for_its_team(self):
+        """Test a per-team task creates slots only for its own team"""
+        team = TeamFactory(is_active=True)
+        other_team = TeamFactory(is_active=True)
+        # bulk_create skips the membership signals that would re-check team activity
+        TeamMember.objects.bulk_create([
+            TeamMember(team=team, user=UserFactory()),
+            TeamMember(team=other_team, user=UserFactory()),
+        ])
+        start_date = timezone.now().date() + timedelta(days=1)
+
+        result = create_team_slots_task.apply(
+            args=(team.id, start_date.isoformat(), start_date.isoformat())
+        ).get()
+
+        assert result['success'] is True
+        assert result['slots_created'] == 24
+        assert Slot.objects.filter(team=team).count() == 24
+        assert not Slot.objects.filter(team=other_team).exists()
+
+    def test_failed_assignment_rolls_back_and_retries(self):
+        """Test an assignment error discards the team's new slots and retries the task"""
+        team = TeamFactory(is_active=True)
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=UserFactory())])
+        start_date = (timezone.now().date() + timedelta(days=1)).isoformat()
+
+        with patch('hirethon_template.managers.slot_service.SlotScheduler._assign_slots_fairly',
+                   return_value={"success": False, "error": "solver crashed"}), \
+                patch.object(create_team_slots_task, 'retry', side_effect=Retry) as mock_retry:
+            with pytest.raises(Retry):
+                create_team_slots_task.apply(args=(team.id, start_date, start_date), throw=True)
+
+        assert 'solver crashed' in str(mock_retry.call_args.kwargs['exc'])
+        assert not Slot.objects.filter(team=team).exists()
+
+    def test_team_task_returns_failure_after_retries(self):
+        """Test a failing team reports its error instead of breaking the chord"""
+        team = TeamFactory(is_active=True)
+        start_date = timezone.now().date().isoformat()
+
+        with patch('hirethon_template.managers.slot_service.SlotScheduler.create_slots_for_team',
+                   return_value={"team_id": team.id, "success": False, "error": "boom"}):
+            result = create_team_slots_task.apply(args=(team.id, start_date, start_date), retries=2).get()
+
+        assert result == {"team_id": team.id, "success": False, "error": "boom"}
+
+    def test_aggregate_results(self):
+        """Test the chord callback sums results and lists failed teams"""
+        summary = aggregate_slot_creation_results([
+            {"team_id": 1, "success": True, "slots_created": 24, "slots_skipped": 2},
+            {"team_id": 2, "success": False, "error": "boom"},
+            {"team_id": 3, "success": False, "message": "No active members found"},
+        ])
+
+        assert summary['success'] is False
+        assert summary['total_slots_created'] == 24
+        assert summary['total_slots_skipped'] == 2
+        assert summary['teams_processed'] == 3
+        assert summary['failed_teams'] == [2]
+
+
+@pytest.mark.django_db
+class TestTeamRebalanceDebounce:
+    """Test membership changes are coalesced into one asynchronous re-plan per team"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+    
+    @pytest.fixture
+    def active_team(self):
+        """An active team already staffed to its minimum, created without signals"""
+        team = TeamFactory(is_active=True)
+        TeamMember.objects.bulk_create([
+            TeamMember(team=team, user=UserFactory()) for _ in range(team.calculate_minimum_members())
+        ])
+        team.recount_active_members()
+        return team
+    
+    def test_burst_of_additions_schedules_one_job(self, active_team, django_capture_on_commit_callbacks):
+        with patch.object(rebalance_team_task, 'apply_async') as mock_apply_async, \
+                patch.object(Team, 'reassign_slots_from_next_day') as mock_reassign:
+            with django_capture_on_commit_callbacks(execute=True):
+                members = [TeamMemberFactory(team=active_team) for _ in range(3)]
+        
+        job_ids = {member.rebalance_job_id for member in members}
+        assert len(job_ids) == 1
+        assert mock_apply_async.call_count == 1
+        assert mock_apply_async.call_args.kwargs['task_id'] in job_ids
+        mock_reassign.assert_not_called()
+    
+    @pytest.fixture
+    def enqueue_committed(self, django_capture_on_commit_callbacks):
+        """Enqueue a change in a transaction that commits; returns its job id and the dispatch mock"""
+        def _enqueue_committed(team, **change):
+            with patch.object(rebalance_team_task, 'apply_async') as mock_apply_async:
+                with django_capture_on_commit_callbacks(execute=True):
+                    job_id = enqueue_team_rebalance(team.id, **change)
+            return job_id, mock_apply_async
+        return _enqueue_committed
+    
+    def test_single_addition_rebalances_incrementally(self, active_team, enqueue_committed):
+        user = UserFactory()
+        job_id, _ = enqueue_committed(active_team, added_user_id=user.id)
+        
+        with patch.object(Team, 'reassign_slots_from_next_day', return_value=True) as mock_reassign:
+            result = rebalance_team_task.apply(args=(active_team.id, job_id)).get()
+        
+        assert result == {"team_id": active_team.id, "success": True, "mode": "member_added", "changes": 1}
+        mock_reassign.assert_called_once_with(added_user=user, removed_user_id=None)
+    
+    def test_several_changes_trigger_one_full_replan(self, active_team, enqueue_committed):
+        job_id, _ = enqueue_committed(active_team, added_user_id=UserFactory().id)
+        assert enqueue_committed(active_team, removed_user_id=UserFactory().id)[0] == job_id
+        
+        with patch.object(Team, 'reassign_slots_from_next_day', return_value=True) as mock_reassign:
+            result = rebalance_team_task.apply(args=(active_team.id, job_id)).get()
+        
+        assert result['mode'] == 'full'
+        assert result['changes'] == 2
+        mock_reassign.assert_called_once_with(added_user=None, removed_user_id=None)
+        # The next change starts a new job
+        assert enqueue_committed(active_team, added_user_id=UserFactory().id)[0] != job_id
+    
+    def test_rolled_back_change_schedules_nothing(self, active_team, enqueue_committed):
+        """Test a change whose transaction rolls back is never counted by the job later changes join"""
+        with patch.object(rebalance_team_task, 'apply_async') as mock_apply_async:
+            with pytest.raises(IntegrityError):
+                with transaction.atomic():
+                    enqueue_team_rebalance(active_team.id, removed_user_id=UserFactory().id)
+                    raise IntegrityError("request failed")
+        mock_apply_async.assert_not_called()
+        
+        user = UserFactory()
+        job_id, mock_apply_async = enqueue_committed(active_team, added_user_id=user.id)
+        mock_apply_async.assert_called_once()
+        assert mock_apply_async.call_args.kwargs['task_id'] == job_id
+        
+        with patch.object(Team, 'reassign_slots_from_next_day', return_value=True) as mock_reassign:
+            result = rebalance_team_task.apply(args=(active_team.id, job_id)).get()
+        
+        assert (result['mode'], result['changes']) == ('member_added', 1)
+        mock_reassign.assert_called_once_with(added_user=user, removed_user_id=None)
+    
+    def test_change_joins_the_job_another_request_allocated(self, active_team, enqueue_committed):
+        """Test a request losing the race for the job key returns the id of the job that runs its change"""
+        cache.set(f"team_rebalance_job:{active_team.id}", 'other-job')
+        
+        job_id, mock_apply_async = enqueue_committed(active_team, added_user_id=UserFactory().id)
+        
+        assert job_id == 'other-job'
+        assert mock_apply_async.call_args.kwargs['task_id'] == 'other-job'
+    
+    def test_changes_committed_while_the_job_runs_get_a_full_replan(
+            self, active_team, enqueue_committed, django_capture_on_commit_callbacks):
+        """Test a change handed the job's id before it started is re-planned when it commits mid-run"""
+        user = UserFactory()
+        job_id, _ = enqueue_committed(active_team, added_user_id=user.id)
+        with django_capture_on_commit_callbacks() as late_commit:
+            assert enqueue_team_rebalance(active_team.id, removed_user_id=UserFactory().id) == job_id
+        
+        def reassign(**kwargs):
+            for callback in late_commit:
+                callback()
+            late_commit.clear()
+            return True
+        
+        with patch.object(rebalance_team_task, 'apply_async') as mock_apply_async, \
+                patch.object(Team, 'reassign_slots_from_next_day', side_effect=reassign) as mock_reassign:
+            result = rebalance_team_task.apply(args=(active_team.id, job_id)).get()
+        
+        mock_apply_async.assert_not_called()
+        assert [call.kwargs for call in mock_reassign.call_args_list] == [
+            {'added_user': user, 'removed_user_id': None}, {'added_user': None, 'removed_user_id': None}
+        ]
+        assert (result['mode'], result['changes']) == ('full', 2)
+    
+    def test_job_status_of_unknown_id_is_not_found(self, active_team, enqueue_committed):
+        api_client = APIClient()
+        api_client.force_authenticate(user=UserFactory(is_manager=True))
+        job_id, _ = enqueue_committed(active_team, added_user_id=UserFactory().id)
+        
+        with patch.object(celery_app, 'AsyncResult') as mock_result:
+            mock_result.return_value.state = 'PENDING'
+            mock_result.return_value.successful.return_value = False
+            mock_result.return_value.failed.return_value = False
+            response = api_client.get(reverse('managers:rebalance-job-status', kwargs={'job_id': job_id}))
+            unknown_response = api_client.get(reverse('managers:rebalance-job-status', kwargs={'job_id': 'never-issued'}))
+        
+        assert (response.status_code, response.data['status']) == (200, 'PENDING')
+        assert unknown_response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestEmptySlotScan:
+    """Test the per-minute scan alerting on upcoming empty slots"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+    
+    @pytest.fixture
+    def empty_slots(self):
+        """Three empty slots in the next 72 hours, one far ahead and one assigned slot"""
+        team = TeamFactory(is_active=True)
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        slots = [SlotFactory(team=team, start_time=hour + timedelta(hours=offset)) for offset in (2, 5, 30)]
+        SlotFactory(team=team, start_time=hour + timedelta(hours=100))
+        SlotFactory(team=team, start_time=hour + timedelta(hours=3), assigned_member=UserFactory(), is_covered=True)
+        return slots
+    
+    def test_alerts_only_slots_without_open_alert(self, empty_slots, notification_store, django_assert_num_queries):
+        AlertFactory(team=empty_slots[0].team, slot=empty_slots[0])
+        
+        with patch.object(send_websocket_notifications, 'delay') as mock_delay:
+            result = check_empty_slots_notification_function()
+        
+        assert result['alerts_created'] == 2
+        new_alert_ids = {payload['alert_id'] for payload in mock_delay.call_args.kwargs['payloads']}
+        assert set(Alert.objects.filter(id__in=new_alert_ids).values_list('slot_id', flat=True)) == {
+            empty_slots[1].id, empty_slots[2].id
+        }
+        assert {n['slot_id'] for n in notification_store.range()} == {empty_slots[1].id, empty_slots[2].id}
+        
+        # Nothing changed: a single anti-join query and no new alerts
+        with patch.object(send_websocket_notifications, 'delay') as mock_delay:
+            with django_assert_num_queries(1):
+                result = check_empty_slots_notification_function()
+        assert result['new_empty_slots_count'] == 0
+        mock_delay.assert_not_called()
+    
+    def test_resolved_alert_allows_a_new_one(self, empty_slots):
+        AlertFactory(team=empty_slots[0].team, slot=empty_slots[0], resolved=True)
+        
+        with patch.object(send_websocket_notifications, 'delay'):
+            result = check_empty_slots_notification_function()
+        
+        assert result['alerts_created'] == 3
+    
+    def test_one_open_alert_per_slot(self, empty_slots):
+        AlertFactory(team=empty_slots[0].team, slot=empty_slots[0])
+        
+        with pytest.raises(IntegrityError):
+            AlertFactory(team=empty_slots[0].team, slot=empty_slots[0])
+    
+    def test_overlapping_run_creates_no_duplicates(self, empty_slots):
+        """A run whose slots were alerted concurrently, after its scan, backs off"""
+        original_bulk_create = Alert.objects.bulk_create
+        
+        def alert_concurrently(alerts):
+            Alert.objects.create(team=empty_slots[0].team, slot=empty_slots[0], message='Concurrent run')
+            return original_bulk_create(alerts)
+        
+        with patch.object(send_websocket_notifications, 'delay') as mock_delay, \
+                patch.object(Alert.objects, 'bulk_create', side_effect=alert_concurrently):
+            result = check_empty_slots_notification_function()
+        
+        assert result['alerts_created'] == 0
+        mock_delay.assert_not_called()
+        # The conflicting batch is rolled back as a whole
+        assert not Alert.objects.exclude(message='Concurrent run').exists()
+
+
+@pytest.mark.django_db
+class TestWebSocketAlertBatch:
+    """Test the batched WebSocket delivery of new alerts"""
+    
+    @pytest.fixture(autouse=True)
+    def flush_channel_layer(self):
+        yield
+        async_to_sync(get_channel_layer().flush)()
+    
+    def _join_admin_group(self):
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('admin_notifications', channel_name)
+        return channel_layer, channel_name
+    
+    def test_prebuilt_payloads_are_sent_in_one_message(self, django_assert_num_queries):
+        channel_layer, channel_name = self._join_admin_group()
+        payloads = [{'alert_id': alert_id, 'slot_id': alert_id, 'type': 'empty_slot_alert'} for alert_id in range(24)]
+        
+        with django_assert_num_queries(0):
+            send_websocket_notifications(payloads=payloads)
+        
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert message['type'] == 'send_alert_batch'
+        assert message['alerts'] == payloads
+    
+    def test_alert_ids_are_loaded_in_one_query(self, django_assert_num_queries):
+        channel_layer, channel_name = self._join_admin_group()
+        alerts = [AlertFactory() for _ in range(3)]
+        
+        with django_assert_num_queries(1):
+            send_websocket_notifications(alert_ids=[alert.id for alert in alerts])
+        
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert sorted(payload['alert_id'] for payload in message['alerts']) == sorted(alert.id for alert in alerts)
+    
+    def test_consumer_forwards_batch_as_one_frame(self):
+        consumer = NotificationConsumer()
+        consumer.send = AsyncMock()
+        alerts = [{'alert_id': 1}, {'alert_id': 2}]
+        
+        async_to_sync(consumer.send_alert_batch)({'type': 'send_alert_batch', 'alerts': alerts, 'timestamp': 'now'})
+        
+        consumer.send.assert_awaited_once()
+        frame = json.loads(consumer.send.call_args.kwargs['text_data'])
+        assert frame == {'type': 'empty_slot_alert_batch', 'alerts': alerts, 'count': 2, 'timestamp': 'now'}
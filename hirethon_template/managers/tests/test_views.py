@@ -5,15 +5,18 @@ import pytest
 import json
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta, date
+from datetime import datetime, time, timedelta, date
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from hirethon_template.users.models import User
-from hirethon_template.managers.models import Team, TeamMember, Slot, Alert
+from hirethon_template.managers.models import Team, TeamMember, Slot, Alert, LeaveRequest
+from hirethon_template.managers.oncall_roster import get_oncall_rosters
+from hirethon_template.managers.slot_service import SlotScheduler
 from hirethon_template.users.tests.factories import UserFactory
 from .factories import (
-    TeamFactory, TeamMemberFactory, SlotFactory, AlertFactory
+    TeamFactory, TeamMemberFactory, SlotFactory, AlertFactory, AvailabilityFactory
 )
 
 
@@ -169,3 +172,472 @@ class TestPermissionsAndAuthentication:
         url = reverse('managers:teams-list')
         response = api_client.get(url)
         assert response.status_code in [status.HTTP_200_OK, status.HTTP_403_FORBIDDEN]
+
+
+@pytest.mark.django_db
+class TestUserScheduleView:
+    """Test the date-windowed, cached calendar schedule"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+    
+    @pytest.fixture
+    def member_schedule(self):
+        """A member with slots and availability spread over three weeks"""
+        team = TeamFactory()
+        member = UserFactory()
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=member)])
+        monday = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
+        slots = [
+            SlotFactory(team=team, start_time=timezone.make_aware(datetime.combine(monday + timedelta(days=offset), time(9))),
+                        assigned_member=member if offset % 2 == 0 else None)
+            for offset in (0, 3, 8, 15)
+        ]
+        for offset in (0, 8):
+            AvailabilityFactory(user=member, date=monday + timedelta(days=offset), is_available=False)
+        return team, member, monday, slots
+    
+    def _get(self, api_client, member, start, end):
+        api_client.force_authenticate(user=member)
+        return api_client.get(reverse('members:user-schedule'), {'start': start.isoformat(), 'end': end.isoformat()})
+    
+    def test_window_limits_slots_and_availability(self, api_client, member_schedule):
+        team, member, monday, slots = member_schedule
+        
+        response = self._get(api_client, member, monday + timedelta(days=3), monday + timedelta(days=9))
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [slot['id'] for slot in response.data['slots']] == [slots[1].id, slots[2].id]
+        assert [slot['is_mine'] for slot in response.data['slots']] == [False, True]
+        assert [avail['date'] for avail in response.data['availability']] == [(monday + timedelta(days=8)).isoformat()]
+    
+    def test_repeat_requests_are_served_from_cache(self, api_client, member_schedule, django_assert_max_num_queries):
+        team, member, monday, slots = member_schedule
+        window = (monday, monday + timedelta(days=20))
+        self._get(api_client, member, *window)
+        
+        with django_assert_max_num_queries(4):
+            # Savepoint pair, teams and availability; no slot query
+            response = self._get(api_client, member, *window)
+        
+        assert len(response.data['slots']) == 4
+    
+    def test_slot_changes_invalidate_their_week(self, api_client, member_schedule, django_capture_on_commit_callbacks):
+        team, member, monday, slots = member_schedule
+        window = (monday, monday + timedelta(days=20))
+        self._get(api_client, member, *window)
+        
+        with django_capture_on_commit_callbacks() as callbacks:
+            slots[1].assigned_member = member
+            slots[1].save()
+            SlotScheduler()._write_assignments([_unassigned(slots[2])])
+        
+        # Until the change commits the cached weeks are kept, so a read in between
+        # cannot cache them as they were before the change
+        response = self._get(api_client, member, *window)
+        assert [slot['is_mine'] for slot in response.data['slots']] == [True, False, True, False]
+        
+        for callback in callbacks:
+            callback()
+        response = self._get(api_client, member, *window)
+        
+        assert [slot['is_mine'] for slot in response.data['slots']] == [True, True, False, False]
+    
+    def test_invalid_window_rejected(self, api_client, member_schedule):
+        team, member, monday, slots = member_schedule
+        api_client.force_authenticate(user=member)
+        url = reverse('members:user-schedule')
+        
+        assert api_client.get(url, {'start': 'not-a-date'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert self._get(api_client, member, monday, monday - timedelta(days=1)).status_code == status.HTTP_400_BAD_REQUEST
+        assert self._get(api_client, member, monday, monday + timedelta(days=365)).status_code == status.HTTP_400_BAD_REQUEST
+
+
+
+@pytest.mark.django_db
+class TestOncallRoster:
+    """Test the precomputed on-call roster behind the on-call views"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+    
+    @pytest.fixture
+    def staffed_team(self):
+        """An active team with ten hourly slots from the current hour, alternating between two members"""
+        team = TeamFactory(is_active=True)
+        users = [UserFactory(), UserFactory()]
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=user) for user in users])
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        slots = [
+            SlotFactory(team=team, start_time=hour + timedelta(hours=offset), assigned_member=users[offset % 2],
+                        is_covered=True)
+            for offset in range(10)
+        ]
+        return team, users, slots
+    
+    def test_roster_matches_slots(self, staffed_team):
+        team, users, slots = staffed_team
+        
+        roster = get_oncall_rosters([team.id])[team.id]
+        
+        assert roster['member_count'] == 2
+        assert roster['current_oncall']['user_id'] == users[0].id
+        assert [slot['start_time'] for slot in roster['upcoming_slots']] == [
+            slot.start_time.isoformat() for slot in slots[1:4]
+        ]
+    
+    def test_roster_is_rebuilt_only_when_boundaries_run_out(self, staffed_team, django_assert_num_queries):
+        team, users, slots = staffed_team
+        get_oncall_rosters([team.id])
+        
+        with django_assert_num_queries(0):
+            roster = get_oncall_rosters([team.id], now=slots[2].start_time + timedelta(minutes=30))[team.id]
+        assert roster['current_oncall']['start_time'] == slots[2].start_time.isoformat()
+        
+        with django_assert_num_queries(2):
+            roster = get_oncall_rosters([team.id], now=slots[5].start_time + timedelta(minutes=30))[team.id]
+        assert [slot['start_time'] for slot in roster['upcoming_slots']] == [
+            slot.start_time.isoformat() for slot in slots[6:9]
+        ]
+    
+    def test_oncall_views_read_roster(self, api_client, staffed_team, django_assert_max_num_queries,
+                                      django_capture_on_commit_callbacks):
+        team, users, slots = staffed_team
+        api_client.force_authenticate(user=users[0])
+        api_client.get(reverse('members:all-teams-oncall'))
+        
+        with django_capture_on_commit_callbacks() as callbacks:
+            slots[0].assigned_member = users[1]
+            slots[0].save()
+        
+        # A roster read before the change commits is dropped once it does
+        response = api_client.get(reverse('members:user-teams-oncall'))
+        assert response.data['teams'][0]['current_oncall']['user_id'] != users[1].id
+        for callback in callbacks:
+            callback()
+        
+        response = api_client.get(reverse('members:user-teams-oncall'))
+        assert response.data['teams'][0]['current_oncall']['user_id'] == users[1].id
+        
+        with django_assert_max_num_queries(6):
+            # Savepoint pair, team count, team page and membership check; no per-team queries
+            response = api_client.get(reverse('members:all-teams-oncall'))
+        
+        team_data = next(data for data in response.data['teams'] if data['id'] == team.id)
+        assert team_data['is_user_member'] is True
+        assert team_data['member_count'] == 2
+        assert team_data['current_oncall']['user_id'] == users[1].id
+    
+    def test_database_source_matches_cached_roster(self, api_client, settings, staffed_team,
+                                                   django_assert_max_num_queries):
+        team, users, slots = staffed_team
+        # Teams with no slots, only a future slot, or overlapping current slots
+        other_teams = [TeamFactory(is_active=True) for _ in range(3)]
+        TeamMember.objects.bulk_create([TeamMember(team=other, user=users[1]) for other in other_teams])
+        SlotFactory(team=other_teams[1], start_time=slots[5].start_time, assigned_member=users[1], is_covered=True)
+        SlotFactory(team=other_teams[2], start_time=slots[0].start_time - timedelta(minutes=30),
+                    end_time=slots[0].end_time, assigned_member=users[1], is_covered=True)
+        SlotFactory(team=other_teams[2], start_time=slots[0].start_time, assigned_member=users[0], is_covered=True)
+        api_client.force_authenticate(user=users[0])
+        
+        settings.ONCALL_ROSTER_SOURCE = 'cache'
+        cached = api_client.get(reverse('members:all-teams-oncall'), {'page_size': 50})
+        
+        settings.ONCALL_ROSTER_SOURCE = 'database'
+        with django_assert_max_num_queries(5):
+            # Savepoint pair, team count, annotated team page and one windowed slot query
+            response = api_client.get(reverse('members:all-teams-oncall'), {'page_size': 50})
+        
+        assert response.data['teams'] == cached.data['teams']
+        assert response.data['pagination'] == cached.data['pagination']
+        team_data = {data['id']: data for data in response.data['teams']}
+        assert team_data[team.id]['is_user_member'] is True
+        assert team_data[other_teams[0].id]['is_user_member'] is False
+        assert team_data[other_teams[0].id]['current_oncall'] is None
+        assert team_data[other_teams[1].id]['current_oncall'] is None
+        assert len(team_data[other_teams[1].id]['upcoming_slots']) == 1
+        assert team_data[other_teams[2].id]['current_oncall']['user_id'] == users[1].id
+        assert team_data[other_teams[2].id]['member_count'] == 1
+
+
+
+@pytest.mark.django_db
+class TestDashboardStats:
+    """Test the aggregated, cached manager dashboard statistics"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+    
+    def test_stats_are_aggregated(self, api_client, admin_user):
+        team = TeamFactory(is_active=True, slot_duration=timedelta(hours=3))
+        TeamFactory(is_active=False)
+        members = [UserFactory(), UserFactory(is_active=False)]
+        today_nine = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        SlotFactory(team=team, start_time=today_nine, assigned_member=members[0], is_covered=True)
+        SlotFactory(team=team, start_time=today_nine + timedelta(hours=3), assigned_member=members[1],
+                    is_covered=True)
+        SlotFactory(team=team, start_time=today_nine + timedelta(hours=6))
+        api_client.force_authenticate(user=admin_user)
+        
+        response = api_client.get(reverse('managers:get-dashboard-stats'))
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['stats'] == {
+            'total_users': 3,
+            'active_users': 2,
+            'total_teams': 2,
+            'active_teams': 1,
+            'total_managers': 1,
+            'active_managers': 1,
+            'avg_hours_per_week': 6.0,
+        }
+        assert {activity['type'] for activity in response.data['recent_activities']} == {
+            'team_created', 'user_created'
+        }
+        assert all('time_ago' in activity for activity in response.data['recent_activities'])
+    
+    def test_stats_are_cached_until_data_changes(self, api_client, admin_user, django_assert_max_num_queries,
+                                                 django_capture_on_commit_callbacks):
+        team = TeamFactory(is_active=True)
+        api_client.force_authenticate(user=admin_user)
+        api_client.get(reverse('managers:get-dashboard-stats'))
+        
+        with django_assert_max_num_queries(2):
+            # Savepoint pair only
+            response = api_client.get(reverse('managers:get-dashboard-stats'))
+        assert response.data['stats']['avg_hours_per_week'] == 0
+        
+        with django_capture_on_commit_callbacks() as callbacks:
+            SlotFactory(team=team, assigned_member=admin_user, is_covered=True)
+        
+        # Statistics read before the change commits are dropped once it does
+        response = api_client.get(reverse('managers:get-dashboard-stats'))
+        assert response.data['stats']['avg_hours_per_week'] == 0
+        for callback in callbacks:
+            callback()
+        
+        response = api_client.get(reverse('managers:get-dashboard-stats'))
+        assert response.data['stats']['avg_hours_per_week'] == 1.0
+
+
+@pytest.mark.django_db
+class TestTeamMembersWithSchedule:
+    """Test the bulk-loaded team schedule view"""
+    
+    @pytest.fixture
+    def scheduled_team(self):
+        """An active team whose members each hold a slot today and in ten days, and one day off"""
+        team = TeamFactory(is_active=True)
+        members = [UserFactory() for _ in range(4)]
+        TeamMember.objects.bulk_create([TeamMember(team=team, user=member) for member in members])
+        today_nine = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        for index, member in enumerate(members):
+            for days in (0, 10):
+                SlotFactory(team=team, start_time=today_nine + timedelta(days=days, hours=index),
+                            assigned_member=member, is_covered=True)
+            AvailabilityFactory(user=member, date=today_nine.date() + timedelta(days=index + 1),
+                                is_available=False, reason='Day off')
+        return team, members
+    
+    def test_schedule_window_in_weeks(self, api_client, admin_user, scheduled_team):
+        team, members = scheduled_team
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('managers:get-team-members-with-schedule', kwargs={'team_id': team.id})
+        
+        response = api_client.get(url)
+        assert [member['total_slots'] for member in response.data['members']] == [1, 1, 1, 1]
+        assert len(response.data['members'][0]['availability']) == 7
+        
+        response = api_client.get(url, {'weeks': 3})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['date_range']['weeks'] == 3
+        member_data = {member['id']: member for member in response.data['members']}
+        for index, member in enumerate(members):
+            availability = member_data[member.id]['availability']
+            assert member_data[member.id]['total_slots'] == 2
+            assert len(availability) == 21
+            assert [day['is_available'] for day in availability].count(False) == 1
+            assert availability[index + 1] == {
+                'date': (timezone.now().date() + timedelta(days=index + 1)).isoformat(),
+                'is_available': False,
+                'reason': 'Day off'
+            }
+    
+    def test_query_count_does_not_grow_with_page_size(self, api_client, admin_user, scheduled_team,
+                                                      django_assert_max_num_queries):
+        team, members = scheduled_team
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('managers:get-team-members-with-schedule', kwargs={'team_id': team.id})
+        
+        with django_assert_max_num_queries(7):
+            # Savepoint pair, team, member count, member page, slots and availability
+            response = api_client.get(url, {'page_size': 10, 'weeks': 6})
+        assert len(response.data['members']) == 4
+    
+    @pytest.mark.parametrize('weeks', ['0', '7', 'two'])
+    def test_invalid_weeks(self, api_client, admin_user, scheduled_team, weeks):
+        team, members = scheduled_team
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('managers:get-team-members-with-schedule', kwargs={'team_id': team.id})
+        
+        response = api_client.get(url, {'weeks': weeks})
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestLeaveRequestsView:
+    """Test the leave request approval queue"""
+    
+    @pytest.fixture
+    def leave_requests(self):
+        """Pending requests from three members of two teams; each member holds two slots on the requested day"""
+        teams = [TeamFactory(is_active=True), TeamFactory(is_active=True)]
+        users = [UserFactory() for _ in range(3)]
+        day = timezone.now().date() + timedelta(days=5)
+        requests = []
+        for index, user in enumerate(users):
+            team = teams[index % 2]
+            start_time = timezone.make_aware(datetime.combine(day, time(hour=index * 4)))
+            for offset in range(2):
+                SlotFactory(team=team, start_time=start_time + timedelta(hours=offset), assigned_member=user,
+                            is_covered=True)
+            requests.append(LeaveRequest.objects.create(user=user, team=team, date=day))
+        requests.append(LeaveRequest.objects.create(user=users[0], team=teams[0], date=day + timedelta(days=3)))
+        return teams, users, day, requests
+    
+    def test_slots_count_is_annotated(self, api_client, admin_user, leave_requests, django_assert_max_num_queries):
+        teams, users, day, requests = leave_requests
+        api_client.force_authenticate(user=admin_user)
+        
+        with django_assert_max_num_queries(4):
+            # Savepoint pair, count and the annotated page
+            response = api_client.get(reverse('managers:get-leave-requests'), {'page_size': 50})
+        
+        counts = {data['id']: data['slots_count'] for data in response.data['leave_requests']}
+        assert counts == {requests[0].id: 2, requests[1].id: 2, requests[2].id: 2, requests[3].id: 0}
+    
+    def test_filters(self, api_client, admin_user, leave_requests):
+        teams, users, day, requests = leave_requests
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('managers:get-leave-requests')
+        
+        def ids(**params):
+            response = api_client.get(url, params)
+            assert response.status_code == status.HTTP_200_OK
+            return {data['id'] for data in response.data['leave_requests']}
+        
+        assert ids(team=teams[0].id) == {requests[0].id, requests[2].id, requests[3].id}
+        assert ids(user=users[0].id) == {requests[0].id, requests[3].id}
+        assert ids(team=teams[0].id, date_from=(day + timedelta(days=1)).isoformat()) == {requests[3].id}
+        assert ids(date_to=day.isoformat()) == {requests[0].id, requests[1].id, requests[2].id}
+        assert api_client.get(url, {'date_from': '17/10/2026'}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestUserDashboardView:
+    """Test the member dashboard loads memberships, teams and counts in one prefetch"""
+    
+    def test_dashboard_teams_and_constraints(self, api_client, django_assert_max_num_queries):
+        user = UserFactory()
+        primary = TeamFactory(max_hours_per_day=6, max_hours_per_week=30, min_rest_hours=10)
+        secondary = TeamFactory()
+        former = TeamFactory()
+        TeamMember.objects.bulk_create([
+            TeamMember(team=primary, user=user),
+            TeamMember(team=secondary, user=user),
+            TeamMember(team=former, user=user, is_active=False),
+            TeamMember(team=primary, user=UserFactory()),
+            TeamMember(team=primary, user=UserFactory(), is_active=False),
+        ])
+        api_client.force_authenticate(user=user)
+        
+        with django_assert_max_num_queries(4):
+            # Savepoint pair, the membership prefetch and the leave day count
+            response = api_client.get(reverse('members:user-dashboard'))
+        
+        data = response.data['user']
+        assert [(team['id'], team['member_count']) for team in data['teams']] == [(primary.id, 3), (secondary.id, 1)]
+        assert (data['max_hours_per_day'], data['max_hours_per_week'], data['min_rest_hours']) == (6, 30, 10)
+    
+    def test_dashboard_defaults_without_teams(self, api_client, regular_user):
+        api_client.force_authenticate(user=regular_user)
+        
+        data = api_client.get(reverse('members:user-dashboard')).data['user']
+        
+        assert data['teams'] == []
+        assert (data['max_hours_per_day'], data['max_hours_per_week'], data['min_rest_hours']) == (8, 40, 8)
+
+
+@pytest.mark.django_db
+class TestEmptySlotNotifications:
+    """Test the notification views read and update the keyed notification store"""
+    
+    def test_notifications_follow_slot_changes(self, api_client, admin_user, notification_store):
+        team = TeamFactory(is_active=True)
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        slots = [SlotFactory(team=team, start_time=hour + timedelta(hours=offset)) for offset in (2, 3, 4)]
+        notification_store.add([
+            {'slot_id': slot.id, 'team_name': team.name, 'notification_time': timezone.now().isoformat()}
+            for slot in slots
+        ])
+        api_client.force_authenticate(user=admin_user)
+        
+        # Filled elsewhere: dropped when the notifications are next read
+        slots[0].assigned_member = UserFactory()
+        slots[0].save()
+        response = api_client.get(reverse('managers:get-notifications'))
+        assert response.data['cache_notifications'] == 2
+        assert {n['slot_id'] for n in notification_store.range()} == {slots[1].id, slots[2].id}
+        
+        response = api_client.post(
+            reverse('managers:mark-notification-read'), {'notification_id': slots[1].id}, format='json'
+        )
+        assert response.data['remaining_cache_count'] == 1
+        
+        member = UserFactory()
+        TeamMember.objects.create(team=team, user=member)
+        api_client.post(
+            reverse('managers:assign-user-to-slot', kwargs={'slot_id': slots[2].id}), {'user_id': member.id},
+            format='json'
+        )
+        assert notification_store.count() == 0
+    
+    def test_polling_cost_is_independent_of_notification_count(self, api_client, admin_user, notification_store,
+                                                              django_assert_max_num_queries):
+        team = TeamFactory(is_active=True)
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        slots = [SlotFactory(team=team, start_time=hour + timedelta(hours=offset)) for offset in range(1, 21)]
+        notification_store.add([
+            {'slot_id': slot.id, 'team_name': team.name, 'notification_time': timezone.now().isoformat()}
+            for slot in slots
+        ])
+        alerts = [AlertFactory(team=team, slot=slot) for slot in slots[:10]]
+        for slot in slots[:5]:
+            slot.assigned_member = admin_user
+            slot.save()
+        api_client.force_authenticate(user=admin_user)
+        
+        with django_assert_max_num_queries(5):
+            # Savepoint pair, the stale alert UPDATE, open alerts and the notified slot check
+            response = api_client.get(reverse('managers:get-notifications'))
+        
+        assert response.data['alert_notifications'] == 5
+        assert response.data['cache_notifications'] == 15
+        assert Alert.objects.filter(id__in=[alert.id for alert in alerts[:5]], resolved=True).count() == 5
+
+
+def _unassigned(slot):
+    slot.assigned_member = None
+    slot.is_covered = False
+    return slot
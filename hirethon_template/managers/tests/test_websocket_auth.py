@@ -0,0 +1,80 @@
+"""
+Unit tests for the JWT authentication of WebSocket connections
+"""
+import pytest
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+from hirethon_template.managers.consumers import NotificationConsumer
+from hirethon_template.managers.websocket_auth import JWTAuthMiddleware, get_websocket_user
+from hirethon_template.users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestWebSocketAuth:
+    """Test token validation and the cached user flags"""
+
+    def test_reconnects_are_served_from_the_cache(self, django_assert_num_queries):
+        manager = UserFactory(is_manager=True)
+        token = str(AccessToken.for_user(manager))
+
+        with django_assert_num_queries(1):
+            user = async_to_sync(get_websocket_user)(token)
+        with django_assert_num_queries(0):
+            for _ in range(5):
+                cached_user = async_to_sync(get_websocket_user)(token)
+
+        assert (user.id, user.is_manager, user.is_active) == (manager.id, True, True)
+        assert (cached_user.id, cached_user.name) == (manager.id, manager.name)
+
+    def test_user_save_invalidates_the_cached_flags(self, django_capture_on_commit_callbacks):
+        manager = UserFactory(is_manager=True)
+        token = str(AccessToken.for_user(manager))
+        async_to_sync(get_websocket_user)(token)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            manager.is_active = False
+            manager.save()
+            # Not committed yet, so the flags as they were stay cached
+            assert async_to_sync(get_websocket_user)(token).is_active is True
+
+        assert async_to_sync(get_websocket_user)(token).is_active is False
+
+    def test_invalid_token_is_rejected(self, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert async_to_sync(get_websocket_user)('not-a-token') is None
+
+    @pytest.mark.parametrize('is_manager, expected_connected', [(True, True), (False, False)])
+    def test_middleware_authenticates_the_consumer(self, is_manager, expected_connected):
+        user = UserFactory(is_manager=is_manager)
+        application = JWTAuthMiddleware(NotificationConsumer.as_asgi())
+
+        async def connect():
+            communicator = WebsocketCommunicator(application, f"/ws/notifications/?token={AccessToken.for_user(user)}")
+            connected, _ = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+
+        assert async_to_sync(connect)() is expected_connected
+
+    def test_session_user_takes_precedence_over_the_token(self):
+        session_user = UserFactory(is_manager=True)
+        token_user = UserFactory(is_manager=True)
+        scopes = []
+
+        async def inner(scope, receive, send):
+            scopes.append(scope)
+
+        application = JWTAuthMiddleware(inner)
+        scope = {
+            'type': 'websocket',
+            'user': session_user,
+            'query_string': f"token={AccessToken.for_user(token_user)}".encode(),
+        }
+        async_to_sync(application)(scope, None, None)
+        async_to_sync(application)(dict(scope, user=AnonymousUser()), None, None)
+
+        assert scopes[0]['user'] is session_user
+        assert scopes[1]['user'].id == token_user.id
@@ -11,7 +11,7 @@ from hirethon_template.managers.views import (
     get_admin_swap_requests_view, admin_reject_swap_request_view
 )
 from hirethon_template.managers.slot_views import (
-    create_slots_manually_view, revalidate_slots_view
+    create_slots_manually_view, revalidate_slots_view, get_rebalance_job_status_view
 )
 
 
@@ -29,6 +29,7 @@ urlpatterns = [
     path("toggle-user-status/<int:user_id>/", toggle_user_status_view, name="toggle-user-status"),
     path("create-slots/", create_slots_manually_view, name="create-slots"),
     path("revalidate-slots/", revalidate_slots_view, name="revalidate-slots"),
+    path("rebalance-jobs/<str:job_id>/", get_rebalance_job_status_view, name="rebalance-job-status"),
     path("notifications/", get_empty_slots_notifications_view, name="get-notifications"),
     path("mark-notification-read/", mark_notification_read_view, name="mark-notification-read"),
     path("leave-requests/", get_leave_requests_view, name="get-leave-requests"),
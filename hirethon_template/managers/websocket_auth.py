@@ -0,0 +1,91 @@
+"""
+JWT authentication of WebSocket connections
+
+JWTAuthMiddleware validates the access token in the connection's query string
+(?token=...) without touching the database, then resolves the user's flags from
+the default cache. They are cached per user until the token expires, so a
+reconnect storm costs one async query per user, not one per connection. The
+entry is dropped once a transaction saving or deleting the User commits.
+A user authenticated by the session (AuthMiddlewareStack) takes precedence
+over the token.
+"""
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+WEBSOCKET_USER_KEY = "websocket_user:{user_id}"
+
+
+class WebSocketUser:
+    """The cached flags of a user authenticated by token, in place of a User instance"""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id: int, name: str, is_active: bool, is_manager: bool):
+        self.id = self.pk = id
+        self.name = name
+        self.is_active = is_active
+        self.is_manager = is_manager
+
+
+def invalidate_websocket_user(user_id: int):
+    """
+    Drop the cached flags of a user once the current transaction commits, so a
+    connection in between cannot cache the flags as they were before the change
+    """
+    key = WEBSOCKET_USER_KEY.format(user_id=user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+async def get_websocket_user(token: str) -> Optional[WebSocketUser]:
+    """The user of a valid access token, or None"""
+    try:
+        access_token = AccessToken(token)
+    except TokenError:
+        return None
+
+    user_id = access_token.get('user_id')
+    if user_id is None:
+        return None
+
+    key = WEBSOCKET_USER_KEY.format(user_id=user_id)
+    flags: Optional[Dict] = await cache.aget(key)
+    if flags is None:
+        flags = await User.objects.filter(id=user_id).values('id', 'name', 'is_active', 'is_manager').afirst()
+        if flags is None:
+            return None
+        # Cached no longer than this token is valid
+        timeout = int(access_token['exp'] - timezone.now().timestamp())
+        if timeout > 0:
+            await cache.aset(key, flags, timeout)
+
+    return WebSocketUser(**flags)
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Set scope["user"] from the token query parameter, when one is given and valid
+    and the session has not authenticated the connection already
+    """
+
+    async def __call__(self, scope, receive, send):
+        session_user = scope.get('user')
+        if session_user is not None and session_user.is_authenticated:
+            return await super().__call__(scope, receive, send)
+
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if token:
+            user = await get_websocket_user(token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
@@ -1,11 +1,26 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Prefetch, prefetch_related_objects
 from hirethon_template.managers.models import Team, TeamMember, Availability
 from datetime import datetime
 
 User = get_user_model()
 
 
+def active_memberships_prefetch():
+    """
+    Prefetch of a user's active memberships (as active_memberships), with their teams and
+    each team's member count, in a single query
+    """
+    return Prefetch(
+        'team_memberships',
+        queryset=TeamMember.objects.filter(is_active=True).select_related('team').annotate(
+            team_member_count=Count('team__members')
+        ).order_by('id'),
+        to_attr='active_memberships'
+    )
+
+
 class UserDashboardTeamSerializer(serializers.ModelSerializer):
     """
     Serializer for teams in user dashboard
@@ -24,8 +39,9 @@ class UserDashboardTeamSerializer(serializers.ModelSerializer):
         read_only_fields = fields
     
     def get_member_count(self, obj):
-        """Get total number of members in this team"""
-        return obj.members.count()
+        """Get total number of members in this team (set as member_count by the dashboard prefetch)"""
+        member_count = getattr(obj, 'member_count', None)
+        return obj.members.count() if member_count is None else member_count
 
 
 class UserDashboardSerializer(serializers.ModelSerializer):
@@ -56,10 +72,23 @@ class UserDashboardSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
     
+    def _active_memberships(self, obj):
+        """User's active memberships, loaded once per user with active_memberships_prefetch"""
+        if not hasattr(obj, 'active_memberships'):
+            prefetch_related_objects([obj], active_memberships_prefetch())
+        return obj.active_memberships
+    
+    def _primary_team(self, obj):
+        """The team of the user's earliest active membership, which sets the schedule constraints"""
+        memberships = self._active_memberships(obj)
+        return memberships[0].team if memberships else None
+    
     def get_teams(self, obj):
         """Get user's teams"""
-        team_memberships = obj.team_memberships.filter(is_active=True)
-        teams = [membership.team for membership in team_memberships]
+        teams = []
+        for membership in self._active_memberships(obj):
+            membership.team.member_count = membership.team_member_count
+            teams.append(membership.team)
         return UserDashboardTeamSerializer(teams, many=True).data
     
     def get_total_availability_hours(self, obj):
@@ -85,21 +114,21 @@ class UserDashboardSerializer(serializers.ModelSerializer):
     
     def get_max_hours_per_day(self, obj):
         """Get max hours per day from user's primary team"""
-        team_membership = obj.team_memberships.filter(is_active=True).first()
-        if team_membership:
-            return team_membership.team.max_hours_per_day
+        team = self._primary_team(obj)
+        if team:
+            return team.max_hours_per_day
         return 8  # Default value
     
     def get_max_hours_per_week(self, obj):
         """Get max hours per week from user's primary team"""
-        team_membership = obj.team_memberships.filter(is_active=True).first()
-        if team_membership:
-            return team_membership.team.max_hours_per_week
+        team = self._primary_team(obj)
+        if team:
+            return team.max_hours_per_week
         return 40  # Default value
     
     def get_min_rest_hours(self, obj):
         """Get min rest hours from user's primary team"""
-        team_membership = obj.team_memberships.filter(is_active=True).first()
-        if team_membership:
-            return team_membership.team.min_rest_hours
+        team = self._primary_team(obj)
+        if team:
+            return team.min_rest_hours
         return 8  # Default value
@@ -2,16 +2,25 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.core.paginator import Paginator
-from datetime import datetime, date
+from django.utils import timezone
+from datetime import datetime, date, timedelta
 
 from .serializers import UserDashboardSerializer
 from hirethon_template.managers.models import Team, Slot, Availability, TeamMember, SwapRequest, LeaveRequest
+from hirethon_template.managers.oncall_roster import annotate_oncall_teams, get_oncall_rosters, query_oncall_slots
+from hirethon_template.managers.schedule_cache import get_schedule_slots
 
 User = get_user_model()
 
+# Default and maximum date windows of the calendar schedule API
+SCHEDULE_DEFAULT_DAYS_BACK = 7
+SCHEDULE_DEFAULT_DAYS_AHEAD = 28
+SCHEDULE_MAX_WINDOW_DAYS = 92
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -39,6 +48,8 @@ def get_user_dashboard_view(request):
 def get_user_schedule_view(request):
     """
     API view to get user's schedule data for calendar view
+    Optional start/end query parameters (YYYY-MM-DD) select the date window; by default
+    it covers the week before today through SCHEDULE_DEFAULT_DAYS_AHEAD days ahead
     """
     if not request.user.is_active:
         return Response(
@@ -46,31 +57,60 @@ def get_user_schedule_view(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
+    today = timezone.now().date()
+    try:
+        start_date = date.fromisoformat(request.GET['start']) if request.GET.get('start') else (
+            today - timedelta(days=SCHEDULE_DEFAULT_DAYS_BACK)
+        )
+        end_date = date.fromisoformat(request.GET['end']) if request.GET.get('end') else (
+            start_date + timedelta(days=SCHEDULE_DEFAULT_DAYS_BACK + SCHEDULE_DEFAULT_DAYS_AHEAD)
+        )
+    except ValueError:
+        return Response(
+            {'error': {'commonError': 'start and end must be dates in YYYY-MM-DD format.'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end_date < start_date:
+        return Response(
+            {'error': {'commonError': 'end must not be before start.'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if (end_date - start_date).days + 1 > SCHEDULE_MAX_WINDOW_DAYS:
+        return Response(
+            {'error': {'commonError': f'The schedule window cannot exceed {SCHEDULE_MAX_WINDOW_DAYS} days.'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     # Get user's teams
-    user_teams = Team.objects.filter(
+    user_teams = list(Team.objects.filter(
         members__user=request.user, 
         members__is_active=True
-    ).distinct()
+    ).distinct())
     
-    if not user_teams.exists():
+    if not user_teams:
         return Response({
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
             'teams': [],
             'slots': [],
             'availability': []
         }, status=status.HTTP_200_OK)
     
-    # Get slots for user's teams
-    slots = Slot.objects.filter(
-        team__in=user_teams
-    ).select_related('team', 'assigned_member').order_by('start_time')
+    # Slots come from the per-team weekly schedule cache
+    slots = get_schedule_slots([team.id for team in user_teams], start_date, end_date)
     
     # Get user's availability
     availability = Availability.objects.filter(
-        user=request.user
+        user=request.user,
+        date__range=[start_date, end_date]
     ).order_by('date')
     
     # Serialize data
     schedule_data = {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
         'teams': [
             {
                 'id': team.id,
@@ -81,20 +121,8 @@ def get_user_schedule_view(request):
         ],
         'slots': [
             {
-                'id': slot.id,
-                'team_id': slot.team.id,
-                'team_name': slot.team.name,
-                'start_time': slot.start_time.isoformat(),
-                'end_time': slot.end_time.isoformat(),
-                'date': slot.date.isoformat(),
-                'assigned_member': {
-                    'id': slot.assigned_member.id,
-                    'name': slot.assigned_member.name,
-                    'email': slot.assigned_member.email
-                } if slot.assigned_member else None,
-                'is_covered': slot.is_covered,
-                'is_holiday': slot.is_holiday,
-                'is_mine': slot.assigned_member == request.user if slot.assigned_member else False
+                **slot,
+                'is_mine': bool(slot['assigned_member']) and slot['assigned_member']['id'] == request.user.id
             }
             for slot in slots
         ],
@@ -620,64 +648,32 @@ def get_user_teams_oncall_view(request):
         )
     
     # Get user's teams
-    user_teams = Team.objects.filter(
+    user_teams = list(Team.objects.filter(
         members__user=request.user, 
         members__is_active=True,
         is_active=True
-    ).distinct()
+    ).distinct())
     
-    if not user_teams.exists():
+    if not user_teams:
         return Response({
             'teams': [],
             'message': 'You are not a member of any active teams.'
         }, status=status.HTTP_200_OK)
     
-    from django.utils import timezone
-    
     teams_data = []
     current_time = timezone.now()
+    rosters = get_oncall_rosters([team.id for team in user_teams], current_time)
     
     for team in user_teams:
-        # Find current on-call person for this team
-        current_slot = Slot.objects.filter(
-            team=team,
-            start_time__lte=current_time,
-            end_time__gte=current_time,
-            assigned_member__isnull=False
-        ).select_related('assigned_member').first()
-        
-        # Get next upcoming slots for this team (next 3 slots)
-        upcoming_slots = Slot.objects.filter(
-            team=team,
-            start_time__gt=current_time,
-            assigned_member__isnull=False
-        ).select_related('assigned_member').order_by('start_time')[:3]
-        
-        # Get team member count
-        member_count = team.members.filter(is_active=True).count()
+        # Current on-call person, next 3 slots and member count from the precomputed roster
+        roster = rosters[team.id]
         
         team_data = {
             'id': team.id,
             'name': team.name,
-            'member_count': member_count,
-            'current_oncall': {
-                'user_id': current_slot.assigned_member.id,
-                'name': current_slot.assigned_member.name,
-                'email': current_slot.assigned_member.email,
-                'start_time': current_slot.start_time.isoformat(),
-                'end_time': current_slot.end_time.isoformat()
-            } if current_slot else None,
-            'upcoming_slots': [
-                {
-                    'user_id': slot.assigned_member.id,
-                    'name': slot.assigned_member.name,
-                    'email': slot.assigned_member.email,
-                    'start_time': slot.start_time.isoformat(),
-                    'end_time': slot.end_time.isoformat(),
-                    'date': slot.date.isoformat()
-                }
-                for slot in upcoming_slots
-            ],
+            'member_count': roster['member_count'],
+            'current_oncall': roster['current_oncall'],
+            'upcoming_slots': roster['upcoming_slots'],
             'team_schedule_constraints': {
                 'max_hours_per_day': team.max_hours_per_day,
                 'max_hours_per_week': team.max_hours_per_week,
@@ -722,8 +718,15 @@ def get_all_teams_oncall_view(request):
     
     # Get ALL active teams (not just user's teams)
     teams_queryset = Team.objects.filter(is_active=True).order_by('name')
+    from_database = settings.ONCALL_ROSTER_SOURCE == 'database'
+    if from_database:
+        # member_count and is_user_member come with the page query
+        teams_queryset = annotate_oncall_teams(teams_queryset, request.user)
     
-    if not teams_queryset.exists():
+    # Apply pagination
+    paginator = Paginator(teams_queryset, page_size)
+    
+    if paginator.count == 0:
         return Response({
             'teams': [],
             'message': 'No active teams found.',
@@ -737,65 +740,40 @@ def get_all_teams_oncall_view(request):
             }
         }, status=status.HTTP_200_OK)
     
-    # Apply pagination
-    paginator = Paginator(teams_queryset, page_size)
-    
     try:
         teams_page = paginator.page(page)
     except:
         # If page is out of range, return the last page
         teams_page = paginator.page(paginator.num_pages)
     
-    from django.utils import timezone
-    
     teams_data = []
     current_time = timezone.now()
+    page_team_ids = [team.id for team in teams_page]
+    
+    if from_database:
+        # Current and next 3 slots of every team on the page in one windowed query
+        rosters = query_oncall_slots(page_team_ids, current_time)
+        for team in teams_page:
+            rosters[team.id]['member_count'] = team.member_count
+        member_team_ids = {team.id for team in teams_page if team.is_user_member}
+    else:
+        rosters = get_oncall_rosters(page_team_ids, current_time)
+        # Teams on this page the current user is an active member of
+        member_team_ids = set(TeamMember.objects.filter(
+            user=request.user, is_active=True, team_id__in=page_team_ids
+        ).values_list('team_id', flat=True))
     
     for team in teams_page:
-        # Find current on-call person for this team
-        current_slot = Slot.objects.filter(
-            team=team,
-            start_time__lte=current_time,
-            end_time__gte=current_time,
-            assigned_member__isnull=False
-        ).select_related('assigned_member').first()
-        
-        # Get next upcoming slots for this team (next 3 slots)
-        upcoming_slots = Slot.objects.filter(
-            team=team,
-            start_time__gt=current_time,
-            assigned_member__isnull=False
-        ).select_related('assigned_member').order_by('start_time')[:3]
-        
-        # Get team member count
-        member_count = team.members.filter(is_active=True).count()
-        
-        # Check if current user is a member of this team
-        is_user_member = team.members.filter(user=request.user, is_active=True).exists()
+        # Current on-call person, next 3 slots and member count for the team
+        roster = rosters[team.id]
         
         team_data = {
             'id': team.id,
             'name': team.name,
-            'member_count': member_count,
-            'is_user_member': is_user_member,
-            'current_oncall': {
-                'user_id': current_slot.assigned_member.id,
-                'name': current_slot.assigned_member.name,
-                'email': current_slot.assigned_member.email,
-                'start_time': current_slot.start_time.isoformat(),
-                'end_time': current_slot.end_time.isoformat()
-            } if current_slot else None,
-            'upcoming_slots': [
-                {
-                    'user_id': slot.assigned_member.id,
-                    'name': slot.assigned_member.name,
-                    'email': slot.assigned_member.email,
-                    'start_time': slot.start_time.isoformat(),
-                    'end_time': slot.end_time.isoformat(),
-                    'date': slot.date.isoformat()
-                }
-                for slot in upcoming_slots
-            ],
+            'member_count': roster['member_count'],
+            'is_user_member': team.id in member_team_ids,
+            'current_oncall': roster['current_oncall'],
+            'upcoming_slots': roster['upcoming_slots'],
             'team_schedule_constraints': {
                 'max_hours_per_day': team.max_hours_per_day,
                 'max_hours_per_week': team.max_hours_per_week,
@@ -0,0 +1,69 @@
+"""
+Per-request SQL query count and database time instrumentation
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def get_query_budget(url_name):
+    """
+    Query budget for a namespaced URL name (e.g. "managers:teams-list")
+    Falls back to QUERY_BUDGET_DEFAULT for views without their own entry
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting queries and the time spent running them
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL queries and database time of every request
+    - Adds X-DB-Query-Count and X-DB-Time-Ms headers when QUERY_BUDGET_HEADERS is on
+    - Logs a warning when a view runs more queries than its budget
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        db_time_ms = round(counter.duration * 1000, 2)
+        if getattr(settings, 'QUERY_BUDGET_HEADERS', False):
+            response['X-DB-Query-Count'] = str(counter.count)
+            response['X-DB-Time-Ms'] = str(db_time_ms)
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None:
+            budget = get_query_budget(resolver_match.view_name)
+            if budget is not None and counter.count > budget:
+                logger.warning(
+                    f"Query budget exceeded for {resolver_match.view_name}: {counter.count} queries "
+                    f"(budget {budget}), {db_time_ms}ms in database - {request.method} {request.path}"
+                )
+
+        return response